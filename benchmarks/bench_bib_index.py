@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Race number index benchmark
+
+Times building a bib_index.BibIndex and classifying every prefix of the race
+numbers (what the type-ahead check does on each key press), against a scan
+of all race numbers with str.startswith per lookup.
+
+Usage:
+    python3 benchmarks/bench_bib_index.py [--runners 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bib_index import BibIndex  # noqa: E402
+
+
+def scan_match(bibs, prefix):
+    """(count, only race number) by checking every race number."""
+    count = 0
+    first = None
+    for bib in bibs:
+        if bib.startswith(prefix):
+            count += 1
+            if first is None:
+                first = bib
+    return count, first if count == 1 else None
+
+
+def _timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the race number prefix index")
+    parser.add_argument("--runners", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=2_000, help="Typed prefixes timed")
+    parser.add_argument("--scan-lookups", type=int, default=200, help="Prefixes timed with the scan")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    bibs = [str(n) for n in rng.sample(range(1, args.runners * 4), args.runners)]
+    build_s = _timed(lambda: BibIndex(bibs))
+    index = BibIndex(bibs)
+    print(f"{args.runners} race numbers: index built in {build_s * 1000:.1f} ms "
+          f"({build_s / args.runners * 1e9:.0f} ns/runner)")
+
+    typed = [bib[:end] for bib in rng.sample(bibs, args.lookups) for end in range(1, len(bib) + 1)]
+    typed_scan = typed[:args.scan_lookups]
+    for prefix in typed_scan:
+        m = index.match(prefix)
+        assert (m.count, m.bib) == scan_match(bibs, prefix), prefix
+
+    index_s = _timed(lambda: [index.match(p) for p in typed])
+    scan_s = _timed(lambda: [scan_match(bibs, p) for p in typed_scan], repeat=1)
+    index_ns = index_s / len(typed) * 1e9
+    scan_ns = scan_s / len(typed_scan) * 1e9
+    print(f"{'index match':16} {index_ns:12.0f} ns/key")
+    print(f"{'startswith scan':16} {scan_ns:12.0f} ns/key  ({scan_ns / index_ns:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Lap capture micro-benchmark
+
+Compares the per-lap cost of turning "now" into elapsed race milliseconds:
+- datetime: datetime.now() - race_start, via timedelta.total_seconds()
+- clock:    RaceClock.elapsed_ms(now_ns()) on the monotonic counter
+
+Usage:
+    python3 benchmarks/bench_lap_capture.py [--laps 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from race_clock import RaceClock, now_ns  # noqa: E402
+
+
+def capture_datetime(start, laps):
+    for _ in range(laps):
+        int((datetime.now() - start).total_seconds() * 1000)
+
+
+def capture_clock(clock, laps):
+    elapsed_ms = clock.elapsed_ms
+    for _ in range(laps):
+        elapsed_ms(now_ns())
+
+
+def run(name, fn, laps, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn(laps)
+        dt = time.perf_counter_ns() - t0
+        best = dt if best is None else min(best, dt)
+    print(f"{name:10} {best / laps:8.1f} ns/lap")
+    return best / laps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lap capture micro-benchmark")
+    parser.add_argument("--laps", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    start = datetime.now()
+    clock = RaceClock()
+    clock.start()
+
+    old = run("datetime", lambda n: capture_datetime(start, n), args.laps)
+    new = run("clock", lambda n: capture_clock(clock, n), args.laps)
+    print(f"speedup    {old / new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
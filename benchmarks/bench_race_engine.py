@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Race engine throughput benchmark
+
+Replays a synthetic race through race_engine.RaceEngine, without a display,
+with the real LapWriter, journal, CSV and incremental backups in a temporary
+directory. Runners run in packs at a shared pace, so laps arrive in bursts;
+a burst is every lap within --burst-gap-ms of the previous one (at most
+--max-burst laps, what an operator can type in one go).
+
+- single: one RaceEngine.record() call per lap
+- burst:  one RaceEngine.record_many() call per burst
+
+Reports laps per second (until the writer has flushed everything), p50/p99
+latency of the record calls and the bytes written. With --metrics the writer
+also records its metrics (metrics.py), which are printed after each run.
+
+Usage:
+    python3 benchmarks/bench_race_engine.py [--runners 10000] [--laps 20] [--mode both]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Metrics  # noqa: E402
+from race_engine import RaceEngine  # noqa: E402
+from race_store import Runner  # noqa: E402
+
+
+def make_runners(count):
+    return {str(1000 + i): Runner(str(1000 + i), f"Hallway {i % 8}", 'MF'[i % 2]) for i in range(count)}
+
+
+def make_laps(numbers, laps, seed=1):
+    """(elapsed_ms, race_number) of every lap, in arrival order."""
+    rng = random.Random(seed)
+    events = []
+    i = 0
+    while i < len(numbers):
+        pack = numbers[i:i + rng.randint(1, 40)]
+        i += len(pack)
+        pace_ms = rng.randint(240_000, 480_000)
+        for number in pack:
+            own_pace = pace_ms + rng.randint(-2_000, 2_000)
+            t = rng.randint(0, 30_000)
+            for _ in range(laps):
+                t += own_pace + rng.randint(-1_500, 1_500)
+                events.append((t, number))
+    events.sort()
+    return events
+
+
+def make_bursts(events, gap_ms, max_burst):
+    bursts = []
+    burst = []
+    last = None
+    for elapsed_ms, number in events:
+        if burst and (elapsed_ms - last > gap_ms or len(burst) >= max_burst):
+            bursts.append(burst)
+            burst = []
+        burst.append((number, elapsed_ms))
+        last = elapsed_ms
+    if burst:
+        bursts.append(burst)
+    return bursts
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def directory_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run(mode, runner_count, laps, bursts, fsync_interval, metrics=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = RaceEngine(make_runners(runner_count), backup_dir=os.path.join(tmp, 'backups'),
+                            fsync_interval=fsync_interval, metrics=metrics)
+        engine.start(laps, 1.0, tmp)
+        latencies = []
+        t0 = time.perf_counter_ns()
+        if mode == 'single':
+            record = engine.record
+            for burst in bursts:
+                for number, elapsed_ms in burst:
+                    t = time.perf_counter_ns()
+                    record(number, elapsed_ms)
+                    latencies.append(time.perf_counter_ns() - t)
+        else:
+            record_many = engine.record_many
+            for burst in bursts:
+                t = time.perf_counter_ns()
+                record_many(burst)
+                latencies.append(time.perf_counter_ns() - t)
+        submitted_ns = time.perf_counter_ns() - t0
+        engine.stop()
+        total_ns = time.perf_counter_ns() - t0
+        recorded = engine.counts.get('ok', 0)
+        written = directory_bytes(tmp)
+
+    latencies.sort()
+    print(f"{mode:7} {recorded / (total_ns / 1e9):10.0f} laps/s  "
+          f"(submit {submitted_ns / 1e6:7.1f} ms, total {total_ns / 1e6:7.1f} ms)  "
+          f"record p50 {percentile(latencies, 0.50) / 1000:7.1f} us  "
+          f"p99 {percentile(latencies, 0.99) / 1000:8.1f} us  "
+          f"{written / 1e6:6.1f} MB written  {engine.counts}")
+    if metrics:
+        for line in metrics.format_lines():
+            print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race engine throughput benchmark")
+    parser.add_argument("--runners", type=int, default=10_000)
+    parser.add_argument("--laps", type=int, default=20)
+    parser.add_argument("--mode", choices=("single", "burst", "both"), default="both")
+    parser.add_argument("--burst-gap-ms", type=int, default=1000)
+    parser.add_argument("--max-burst", type=int, default=10)
+    parser.add_argument("--fsync-interval", type=float, default=1.0,
+                        help="Journal fsync interval in seconds (0 = every write)")
+    parser.add_argument("--metrics", action="store_true", help="Record and print the writer's metrics")
+    args = parser.parse_args()
+
+    numbers = list(make_runners(args.runners))
+    events = make_laps(numbers, args.laps)
+    bursts = make_bursts(events, args.burst_gap_ms, args.max_burst)
+    print(f"{args.runners} runners x {args.laps} laps = {len(events)} laps in {len(bursts)} bursts "
+          f"(mean {len(events) / len(bursts):.1f}, max {max(map(len, bursts))})")
+
+    for mode in (("single", "burst") if args.mode == "both" else (args.mode,)):
+        run(mode, args.runners, args.laps, bursts, args.fsync_interval, Metrics() if args.metrics else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+
+Starts each entry point in a fresh interpreter and reports the best wall
+time of --repeat runs, plus the import time measured with -X importtime
+and the slowest top-level imports. Everything runs in a temporary
+directory with a synthetic race, so the race archive and the stats
+answer start empty.
+
+- python:          an empty interpreter, for reference
+- gui import:      import lap_time_control
+- gui window:      build the window and draw it once (skipped without a display)
+- stats --help
+- stats no cache:  calculate_race_stats.py --no-cache (parse the CSV)
+- stats archive:   answered from the stats stored in the race archive (answer removed first)
+- stats answer:    answered from the stats text of the previous run
+
+Usage:
+    python3 benchmarks/bench_startup.py [--repeat 5] [--runners 2000] [--top 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bench_stats_backends import write_synthetic_csv  # noqa: E402
+
+STATS = os.path.join(REPO, "calculate_race_stats.py")
+CSV_NAME = "lap_times_20260205_182602.csv"
+GUI_WINDOW = ("import tkinter as tk\n"
+              "import lap_time_control\n"
+              "root = tk.Tk()\n"
+              "app = lap_time_control.LapTimeControl(root)\n"
+              "root.update()\n"
+              "root.destroy()\n")
+
+
+def import_times(argv, cwd, env):
+    """(total import ms, [(cumulative ms, module)] of the top-level imports)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=cwd, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total_us = 0
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit() or name[1:2] == " ":
+            continue  # header, or imported by another module
+        total_us += int(cumulative)
+        modules.append((int(cumulative) / 1000, name.strip()))
+    modules.sort(reverse=True)
+    return total_us / 1000, modules
+
+
+def best_wall_ms(argv, cwd, env, repeat, before=None):
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, *argv], cwd=cwd, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1:] or ["failed"]
+        best = elapsed if best is None else min(best, elapsed)
+    return best, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time cold start of the GUI and the stats CLI")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--runners", type=int, default=2000, help="Runners in the synthetic race")
+    parser.add_argument("--laps", type=int, default=10)
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports shown per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_synthetic_csv(os.path.join(tmp, CSV_NAME), args.runners, args.laps)
+        env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+        answer = os.path.join(tmp, "race_archive_answer.txt")
+
+        def drop_answer():
+            if os.path.exists(answer):
+                os.remove(answer)
+
+        stats = [STATS, "--csv", CSV_NAME, "--out", "stats.txt"]
+        cases = [
+            ("python", ["-c", "pass"], None),
+            ("gui import", ["-c", "import lap_time_control"], None),
+            ("gui window", ["-c", GUI_WINDOW], None),
+            ("stats --help", [STATS, "--help"], None),
+            ("stats no cache", stats + ["--no-cache"], None),
+            ("stats archive", stats, drop_answer),
+            ("stats answer", stats, None),
+        ]
+        # Fill the race archive, so the archive case times the stored-stats lookup
+        subprocess.run([sys.executable, *stats], cwd=tmp, env=env, stdout=subprocess.DEVNULL, check=True)
+        print(f"{args.runners} runners x {args.laps} laps, best of {args.repeat} runs")
+        print(f"{'case':16} {'wall ms':>9} {'import ms':>10}  slowest imports (cumulative ms)")
+        for name, argv, before in cases:
+            wall_ms, error = best_wall_ms(argv, tmp, env, args.repeat, before)
+            if wall_ms is None:
+                print(f"{name:16} {'-':>9} {'-':>10}  skipped: {error[0]}")
+                continue
+            if before:
+                before()
+            import_ms, modules = import_times(argv, tmp, env)
+            slowest = ", ".join(f"{module} {ms:.1f}" for ms, module in modules[:args.top])
+            print(f"{name:16} {wall_ms:9.1f} {import_ms:10.1f}  {slowest}")
+
+
+if __name__ == "__main__":
+    main()
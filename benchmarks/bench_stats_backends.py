@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Stats backend benchmark
+
+Generates synthetic lap_times CSVs and times the pure-Python streaming
+backend against the NumPy backend, then both again on the same race
+converted to a memory-mapped .lapcol file, checking that all give the same
+stats.
+
+Usage:
+    python3 benchmarks/bench_stats_backends.py [--sizes 1000 100000 1000000] [--laps 10]
+"""
+
+import argparse
+import csv
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculate_race_stats import compute_stats, compute_stats_columns, iter_rows  # noqa: E402
+from lap_journal import results_header  # noqa: E402
+from race_columns import csv_to_columns  # noqa: E402
+from timecodec import format_ms  # noqa: E402
+
+HALLWAYS = ["Nybrogård A", "Nybrogård B", "Nybrogård C", "Nybrogård D"]
+GENDERS = ["M", "F"]
+
+
+def write_synthetic_csv(path, runners, laps, seed=1):
+    """Write a race where most runners finish and some drop out early."""
+    rnd = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(results_header(laps))
+        for number in range(1, runners + 1):
+            done = laps if rnd.random() < 0.8 else rnd.randint(0, laps - 1)
+            elapsed = 0
+            cells = []
+            for _ in range(done):
+                elapsed += rnd.randint(480_000, 900_000)
+                cells.append(format_ms(elapsed))
+            cells += [""] * (laps - done)
+            finish = cells[-1] if done == laps else ""
+            writer.writerow(["2026-02-05 18:26:02.578", str(number), rnd.choice(HALLWAYS),
+                             rnd.choice(GENDERS)] + cells + [finish])
+
+
+def time_python(path, lap_length):
+    t0 = time.perf_counter()
+    rows, lap_cols = iter_rows(path)
+    stats = compute_stats(rows, lap_cols, lap_length)
+    return time.perf_counter() - t0, stats
+
+
+def time_numpy(path, lap_length):
+    from race_stats_numpy import compute_stats_numpy
+    t0 = time.perf_counter()
+    stats = compute_stats_numpy(path, lap_length)
+    return time.perf_counter() - t0, stats
+
+
+def time_columns(path, lap_length, backend):
+    t0 = time.perf_counter()
+    stats = compute_stats_columns(path, lap_length, backend)
+    return time.perf_counter() - t0, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stats backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--laps", type=int, default=10)
+    parser.add_argument("--lap-length", type=float, default=2.5)
+    args = parser.parse_args()
+
+    have_numpy = importlib.util.find_spec("numpy") is not None
+    if not have_numpy:
+        print("numpy not installed - timing the Python backend only")
+
+    print(f"{'runners':>10} {'python s':>10} {'numpy s':>10} {'speedup':>8} "
+          f"{'lapcol py':>10} {'lapcol np':>10}  same")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"lap_times_{size}.csv")
+            columns_path = os.path.join(tmp, f"lap_times_{size}.lapcol")
+            write_synthetic_csv(path, size, args.laps)
+            csv_to_columns(path, columns_path, args.lap_length)
+            py_s, py_stats = time_python(path, args.lap_length)
+            col_s, col_stats = time_columns(columns_path, args.lap_length, "python")
+            results = [py_stats, col_stats]
+            if have_numpy:
+                np_s, np_stats = time_numpy(path, args.lap_length)
+                col_np_s, col_np_stats = time_columns(columns_path, args.lap_length, "numpy")
+                results += [np_stats, col_np_stats]
+                timings = f"{np_s:>10.3f} {py_s / np_s:>7.1f}x {col_s:>10.3f} {col_np_s:>10.3f}"
+            else:
+                timings = f"{'-':>10} {'-':>8} {col_s:>10.3f} {'-':>10}"
+            same = "yes" if all(stats == py_stats for stats in results) else "NO"
+            print(f"{size:>10} {py_s:>10.3f} {timings}  {same}")
+            os.remove(path)
+            os.remove(columns_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Time codec benchmark
+
+Compares timecodec.parse_ms / format_ms and the bulk column functions with
+the timedelta-based functions they replaced (copied below for reference).
+
+Usage:
+    python3 benchmarks/bench_timecodec.py [--values 500000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timecodec import decode_column, encode_column, format_ms, parse_ms  # noqa: E402
+
+
+# -- Previous implementations (calculate_race_stats / LapTimeControl) ---
+
+def old_parse_elapsed(s):
+    if not s:
+        return None
+    s = s.strip()
+    if not s:
+        return None
+    try:
+        hh, mm, rest = s.split(":")
+        ss, ms = rest.split(".")
+        return timedelta(hours=int(hh), minutes=int(mm), seconds=int(ss), milliseconds=int(ms))
+    except Exception:
+        return None
+
+
+def old_format_td(td):
+    total_ms = int(td.total_seconds() * 1000)
+    hours = total_ms // (3600 * 1000)
+    minutes = (total_ms // (60 * 1000)) % 60
+    seconds = (total_ms // 1000) % 60
+    ms = total_ms % 1000
+    return f"{hours:02}:{minutes:02}:{seconds:02}.{ms:03}"
+
+
+def bench(name, fn, count, repeat=5):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:34} {best / count * 1e9:8.1f} ns/value")
+    return best
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time codec benchmark")
+    parser.add_argument("--values", type=int, default=500_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    # Lap times of a half marathon: mostly within the first few hours
+    values = [rnd.randint(0, 4 * 3600 * 1000) for _ in range(args.values)]
+    deltas = [timedelta(milliseconds=v) for v in values]
+    cells = encode_column(values)
+    n = len(values)
+
+    assert [parse_ms(c) for c in cells] == values
+    assert [old_parse_elapsed(c) for c in cells] == deltas
+
+    old = bench("parse: parse_elapsed (timedelta)", lambda: [old_parse_elapsed(c) for c in cells], n)
+    new = bench("parse: parse_ms", lambda: [parse_ms(c) for c in cells], n)
+    bulk = bench("parse: decode_column", lambda: decode_column(cells), n)
+    print(f"{'':34} {old / new:8.2f}x (single), {old / bulk:.2f}x (bulk)")
+
+    old = bench("format: format_td (timedelta)", lambda: [old_format_td(td) for td in deltas], n)
+    new = bench("format: format_ms", lambda: [format_ms(v) for v in values], n)
+    bulk = bench("format: encode_column", lambda: encode_column(values), n)
+    print(f"{'':34} {old / new:8.2f}x (single), {old / bulk:.2f}x (bulk)")
+
+
+if __name__ == "__main__":
+    main()
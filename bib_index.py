@@ -0,0 +1,83 @@
+"""
+Race Number Prefix Index
+
+Type-ahead check of the race number being entered. Every prefix of every
+race number is a key in one dict (a trie flattened into a hash table), so a
+lookup costs one hash of the typed text, O(len(prefix)), however many
+runners there are. Each prefix maps to how many race numbers start with it
+and the first of them, which is the only one when the count is 1.
+
+match() tells whether the typed text can still become a race number:
+    empty       nothing typed
+    unique      exactly one race number starts with it
+    ambiguous   several race numbers start with it
+    impossible  no race number starts with it
+and whether the text is itself a complete race number (exact).
+"""
+
+from typing import Dict, Iterable, NamedTuple, Optional
+
+
+EMPTY = 'empty'
+UNIQUE = 'unique'
+AMBIGUOUS = 'ambiguous'
+IMPOSSIBLE = 'impossible'
+
+
+class BibMatch(NamedTuple):
+    status: str
+    prefix: str
+    count: int  # race numbers starting with prefix
+    bib: Optional[str]  # the only such race number (unique), else None
+    exact: bool  # prefix is itself a race number
+
+    @property
+    def complete(self) -> bool:
+        """The prefix is a race number and no other one starts with it."""
+        return self.status == UNIQUE and self.exact
+
+
+class BibIndex:
+    """Prefix counts of a set of race numbers."""
+
+    def __init__(self, bibs: Iterable[str] = ()):
+        self._count: Dict[str, int] = {}
+        self._first: Dict[str, str] = {}
+        self._bibs = set()
+        for bib in bibs:
+            self.add(bib)
+
+    def __len__(self):
+        return len(self._bibs)
+
+    def __contains__(self, bib: str) -> bool:
+        return bib in self._bibs
+
+    def add(self, bib: str):
+        """Index one race number (ignored if blank or already indexed)."""
+        if not bib or bib in self._bibs:
+            return
+        self._bibs.add(bib)
+        count = self._count
+        first = self._first
+        for end in range(1, len(bib) + 1):
+            prefix = bib[:end]
+            n = count.get(prefix)
+            if n is None:
+                count[prefix] = 1
+                first[prefix] = bib
+            else:
+                count[prefix] = n + 1
+
+    def match(self, prefix: str) -> BibMatch:
+        """Classify typed text; surrounding whitespace is ignored."""
+        prefix = prefix.strip()
+        if not prefix:
+            return BibMatch(EMPTY, prefix, 0, None, False)
+        n = self._count.get(prefix, 0)
+        exact = prefix in self._bibs
+        if n == 0:
+            return BibMatch(IMPOSSIBLE, prefix, 0, None, False)
+        if n == 1:
+            return BibMatch(UNIQUE, prefix, 1, self._first[prefix], exact)
+        return BibMatch(AMBIGUOUS, prefix, n, None, exact)
@@ -13,27 +13,85 @@ and outputs fun stats:
 Usage:
     python3 calculate_race_stats.py --csv path/to/lap_times_*.csv --lap-length 2.5 --out stats.txt
 
-If --csv is omitted, the script will use the latest lap_times_*.csv in the current directory.
+Use --backend numpy for the vectorized engine in race_stats_numpy.py (requires numpy).
+
+Season mode combines many races, one worker process per file; backup copies
+of the same race are skipped in favour of the most complete file:
+    python3 calculate_race_stats.py --dir season_2026 --lap-length 2.5
+    python3 calculate_race_stats.py --glob 'archive/**/*.csv' --jobs 4
+
+If --csv is omitted, the script will use the latest race registered in the race
+archive (see race_archive.py), else the latest lap_times_*.csv in the current directory.
+Parsed files and their stats are cached in race_archive.sqlite; --no-cache skips it.
 If --out is omitted, it writes stats_<timestamp>.txt in the current directory and also prints to stdout.
+
+Live mode keeps the stats of a running race up to date, rewriting --out
+(default live_stats.txt) every --interval seconds from the laps added since
+the last update (see race_follow.py); --csv may also name the lap journal:
+    python3 calculate_race_stats.py --follow --interval 5 --out hall_screen.txt
+
+--csv also accepts a binary .lapcol file (see race_columns.py), which is
+memory-mapped and read without parsing, with either backend.
+
+--profile reads the file from scratch (without the race archive) and prints
+how long each phase took: load, parse, aggregate and write.
+
+The stats text of the last single-file run is kept next to the race archive
+(race_archive_answer.txt), keyed by the file's path, size and mtime. Running
+again on the same, unchanged --csv prints it before the archive is opened.
+Modules only some modes need (the archive, numpy, glob, metrics) are imported
+when used, so --help and repeated runs start quickly (see
+benchmarks/bench_startup.py).
 """
 
 import argparse
 import csv
-import glob
+import heapq
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+
+from timecodec import MISSING, format_ms, parse_ms
+
+
+# Number of finish times listed per gender
+TOP_N = 10
+# The stats text of the last run is kept in <archive>_answer.txt
+ANSWER_SUFFIX = "_answer.txt"
+# Bump when format_stats_text() changes, so an older answer is not reused
+ANSWER_VERSION = 1
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Calculate race stats from lap_times CSV")
-    parser.add_argument("--csv", dest="csv_path", default=None, help="Path to lap_times CSV (default: latest lap_times_*.csv)")
+    parser.add_argument("--csv", dest="csv_path", default=None,
+                        help="Path to lap_times CSV or .lapcol file (default: latest lap_times_*.csv)")
     parser.add_argument("--lap-length", dest="lap_length", type=float, default=2.5, help="Lap length in km (default: 2.5)")
     parser.add_argument("--out", dest="out_path", default=None, help="Output stats file path (default: stats_<timestamp>.txt)")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python",
+                        help="Stats engine: pure Python streaming (default) or vectorized NumPy")
+    parser.add_argument("--archive", default="race_archive.sqlite",
+                        help="Index of parsed CSVs and their stats (default: race_archive.sqlite)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Parse the CSV from scratch without the race archive")
+    parser.add_argument("--glob", dest="glob_pattern", default=None,
+                        help="Combine all CSVs matching this pattern, e.g. 'season/**/*.csv'")
+    parser.add_argument("--dir", dest="directory", default=None,
+                        help="Combine all *lap_times_*.csv files under this directory (recursive)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for --glob/--dir (default: CPU count; always the Python backend)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep updating the stats of a running race from its lap journal")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Seconds between --follow updates (default: 5)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-phase timings (load, parse, aggregate, write); bypasses the race archive")
     return parser.parse_args()
 
 
 def latest_lap_times_csv() -> Optional[str]:
+    import glob
     candidates = glob.glob("lap_times_*.csv")
     if not candidates:
         return None
@@ -41,93 +99,325 @@ def latest_lap_times_csv() -> Optional[str]:
     return candidates[0]
 
 
-def parse_elapsed(s: str) -> Optional[timedelta]:
-    """Parse 'HH:MM:SS.mmm' to timedelta. Returns None if blank/invalid."""
-    if not s:
-        return None
-    s = s.strip()
-    if not s:
-        return None
-    try:
-        # Expect HH:MM:SS.mmm
-        hh, mm, rest = s.split(":")
-        ss, ms = rest.split(".")
-        return timedelta(hours=int(hh), minutes=int(mm), seconds=int(ss), milliseconds=int(ms))
-    except Exception:
-        return None
+def iter_rows(csv_path: str) -> Tuple[Iterator[Dict[str, str]], List[str]]:
+    """Open a lap_times CSV and return (rows, lap_cols).
+
+    rows is a generator that reads the file lazily, one row at a time.
+    """
+    f = open(csv_path, "r", encoding="utf-8", newline="")
+    reader = csv.DictReader(f)
+    # Identify lap columns ordered numerically
+    lap_cols = [c for c in (reader.fieldnames or []) if c.startswith("lap")]
+    lap_cols.sort(key=lambda x: int(x.replace("lap", "")))
+
+    def rows() -> Iterator[Dict[str, str]]:
+        with f:
+            yield from reader
+
+    return rows(), lap_cols
+
+
+class StatsAccumulator:
+    """Single-pass race statistics.
+
+    Rows are added one at a time. Memory is O(groups + top_n): distances are
+    kept as lap counts per group, the fastest split per gender as a single
+    tuple, and the best finish times per gender in a bounded heap.
+
+    Accumulators of different files can be combined with merge(). seq_base
+    offsets the row order used to break ties so it stays unique across files,
+    and race_label (if given) is appended to race numbers in the results.
+    """
+
+    def __init__(self, lap_cols: List[str], lap_length_km: float, top_n: int = TOP_N,
+                 seq_base: int = 0, race_label: Optional[str] = None):
+        self.lap_cols = lap_cols
+        self.lap_length_km = lap_length_km
+        self.top_n = top_n
+        self.seq_base = seq_base
+        self.race_label = race_label
+        self.laps_by_hallway: Dict[str, int] = {}
+        self.laps_by_gender: Dict[str, int] = {}
+        self.fastest_lap_by_gender: Dict[str, Tuple[int, str, str, int]] = {}  # gender -> (split_ms, race_number, hallway, lap_index)
+        # gender -> heap of (-finish_time, -seq, race_number, hallway); heap[0] is the slowest kept
+        self.finish_heaps: Dict[str, List[Tuple[int, int, str, str]]] = {}
+        self.rows_seen = 0
+
+    def add_row(self, row: Dict[str, str]):
+        self.add_parsed(*self.parse_row(row))
+
+    def parse_row(self, row: Dict[str, str]) -> tuple:
+        """add_parsed() arguments for a CSV row."""
+        finish_ms = parse_ms(row.get("finish_time"))
+        return (
+            (row.get("race_number") or "").strip() or "?",
+            (row.get("hallway") or "").strip() or "Unknown",
+            (row.get("gender") or "").strip() or "Unknown",
+            [parse_ms(row.get(lap_col)) for lap_col in self.lap_cols],
+            MISSING if finish_ms is None else finish_ms,
+        )
+
+    def add_parsed(self, race_number: str, hallway: str, gender: str,
+                   lap_ms: Iterable[Optional[int]], finish_ms: int):
+        """Add a row whose times are already in ms (None or MISSING for blanks)."""
+        seq = self.seq_base + self.rows_seen
+        self.rows_seen += 1
+        if self.race_label:
+            race_number = f"{race_number} ({self.race_label})"
+
+        # Compute per-lap splits and track fastest split by gender
+        lap_count = 0
+        prev = 0
+        fastest = self.fastest_lap_by_gender.get(gender)
+        for ms in lap_ms:
+            if ms is None or ms < 0:
+                continue
+            lap_count += 1
+            split = ms - prev
+            prev = ms
+            if fastest is None or split < fastest[0]:
+                fastest = (split, race_number, hallway, lap_count)
+        if fastest is not None:
+            self.fastest_lap_by_gender[gender] = fastest
+
+        self.laps_by_hallway[hallway] = self.laps_by_hallway.get(hallway, 0) + lap_count
+        self.laps_by_gender[gender] = self.laps_by_gender.get(gender, 0) + lap_count
+
+        if finish_ms >= 0:
+            self.add_finish(gender, finish_ms, seq, race_number, hallway)
+
+    def add_finish(self, gender: str, finish_ms: int, seq: int, race_number: str, hallway: str):
+        """Keep only the top_n fastest finishes per gender (ties keep row order seq)."""
+        heap = self.finish_heaps.setdefault(gender, [])
+        entry = (-finish_ms, -seq, race_number, hallway)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+
+    def merge(self, other: "StatsAccumulator"):
+        """Fold another accumulator into this one.
+
+        other must cover rows that come after this accumulator's rows (e.g. the
+        next file), so that ties on the fastest split keep the earlier row.
+        """
+        for hallway, n in other.laps_by_hallway.items():
+            self.laps_by_hallway[hallway] = self.laps_by_hallway.get(hallway, 0) + n
+        for gender, n in other.laps_by_gender.items():
+            self.laps_by_gender[gender] = self.laps_by_gender.get(gender, 0) + n
+        for gender, fastest in other.fastest_lap_by_gender.items():
+            mine = self.fastest_lap_by_gender.get(gender)
+            if mine is None or fastest[0] < mine[0]:
+                self.fastest_lap_by_gender[gender] = fastest
+        for gender, other_heap in other.finish_heaps.items():
+            heap = self.finish_heaps.setdefault(gender, [])
+            for entry in other_heap:
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heappushpop(heap, entry)
+        self.rows_seen += other.rows_seen
+        return self
+
+    def to_state(self) -> dict:
+        """Aggregates as plain JSON-compatible data (independent of lap length)."""
+        return {
+            "lap_cols": self.lap_cols,
+            "laps_by_hallway": self.laps_by_hallway,
+            "laps_by_gender": self.laps_by_gender,
+            "fastest_lap_by_gender": self.fastest_lap_by_gender,
+            "finish_heaps": self.finish_heaps,
+            "rows_seen": self.rows_seen,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, lap_length_km: float, top_n: int = TOP_N) -> "StatsAccumulator":
+        acc = cls(state["lap_cols"], lap_length_km, top_n)
+        acc.laps_by_hallway = dict(state["laps_by_hallway"])
+        acc.laps_by_gender = dict(state["laps_by_gender"])
+        acc.fastest_lap_by_gender = {g: tuple(v) for g, v in state["fastest_lap_by_gender"].items()}
+        acc.finish_heaps = {g: [tuple(e) for e in heap] for g, heap in state["finish_heaps"].items()}
+        acc.rows_seen = state["rows_seen"]
+        return acc
+
+    def result(self):
+        top_finish_by_gender: Dict[str, List[Tuple[int, str, str]]] = {}
+        for gender, heap in self.finish_heaps.items():
+            ordered = sorted(heap, reverse=True)
+            top_finish_by_gender[gender] = [(-neg_ms, race_number, hallway)
+                                            for neg_ms, _, race_number, hallway in ordered]
+        return {
+            "by_hallway_distance": {h: n * self.lap_length_km for h, n in self.laps_by_hallway.items()},
+            "by_gender_distance": {g: n * self.lap_length_km for g, n in self.laps_by_gender.items()},
+            "fastest_lap_by_gender": dict(self.fastest_lap_by_gender),
+            "top10_finish_by_gender": top_finish_by_gender,
+        }
+
+
+def compute_stats(rows: Iterable[Dict[str, str]], lap_cols: List[str], lap_length_km: float):
+    """Compute stats from an iterable of rows in a single streaming pass."""
+    acc = StatsAccumulator(lap_cols, lap_length_km)
+    for row in rows:
+        acc.add_row(row)
+    return acc.result()
 
 
-def format_td(td: timedelta) -> str:
-    total_ms = int(td.total_seconds() * 1000)
-    hours = total_ms // (3600 * 1000)
-    minutes = (total_ms // (60 * 1000)) % 60
-    seconds = (total_ms // 1000) % 60
-    ms = total_ms % 1000
-    return f"{hours:02}:{minutes:02}:{seconds:02}.{ms:03}"
+# -- Season archives: many CSVs, one worker process per file ----------------
 
+# Race start stamp in file names: lap_times_20260205_182602.csv,
+# backups/backup_3_lap_times_20260205_182602.csv, restored_lap_times_... etc.
+RACE_STAMP_RE = re.compile(r"(\d{8})_(\d{6})")
 
-def load_rows(csv_path: str) -> Tuple[List[Dict[str, str]], List[str]]:
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        # Identify lap columns ordered numerically
-        lap_cols = [c for c in reader.fieldnames if c.startswith("lap")]
-        lap_cols.sort(key=lambda x: int(x.replace("lap", "")))
-        return rows, lap_cols
+
+def find_lap_times_csvs(pattern: Optional[str] = None, directory: Optional[str] = None) -> List[str]:
+    """List CSVs matching a glob pattern (** allowed) or all *lap_times_*.csv under a directory."""
+    import glob
+    paths = set()
+    if pattern:
+        paths.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    if directory:
+        for dirpath, _, filenames in os.walk(directory):
+            paths.update(os.path.join(dirpath, name) for name in filenames
+                         if "lap_times_" in name and name.endswith(".csv"))
+    return sorted(paths)
 
 
-def compute_stats(rows: List[Dict[str, str]], lap_cols: List[str], lap_length_km: float):
-    by_hallway_distance: Dict[str, float] = {}
-    by_gender_distance: Dict[str, float] = {}
-    fastest_lap_by_gender: Dict[str, Tuple[timedelta, str, str, int]] = {}  # gender -> (split_time, race_number, hallway, lap_index)
-    finish_times_by_gender: Dict[str, List[Tuple[timedelta, str, str]]] = {}
+def race_key(csv_path: str) -> str:
+    """Identify the race a CSV belongs to, so backup copies map to the same key.
 
+    Uses the start stamp in the file name, else the timestamp column of the
+    first row, else the path itself.
+    """
+    match = RACE_STAMP_RE.search(os.path.basename(csv_path))
+    if match:
+        d, t = match.groups()
+        return f"{d[:4]}-{d[4:6]}-{d[6:]} {t[:2]}:{t[2:4]}:{t[4:]}"
+    try:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                stamp = (row.get("timestamp") or "").strip()
+                if stamp:
+                    return stamp[:19]
+    except (OSError, csv.Error):
+        pass
+    return os.path.abspath(csv_path)
+
+
+def dedupe_races(paths: Iterable[str]) -> Dict[str, str]:
+    """Keep one CSV per race: the largest (most laps), newest on a tie."""
+    best: Dict[str, Tuple[Tuple[int, float], str]] = {}
+    for path in paths:
+        st = os.stat(path)
+        rank = (st.st_size, st.st_mtime)
+        key = race_key(path)
+        if key not in best or rank > best[key][0]:
+            best[key] = (rank, path)
+    return {key: path for key, (_, path) in sorted(best.items())}
+
+
+def accumulate_csv(csv_path: str, lap_length_km: float, seq_base: int = 0,
+                   race_label: Optional[str] = None) -> StatsAccumulator:
+    """Stream one CSV into a StatsAccumulator (runs in a worker process)."""
+    rows, lap_cols = iter_rows(csv_path)
+    acc = StatsAccumulator(lap_cols, lap_length_km, seq_base=seq_base, race_label=race_label)
     for row in rows:
-        hallway = (row.get("hallway") or "").strip() or "Unknown"
-        gender = (row.get("gender") or "").strip() or "Unknown"
-        race_number = (row.get("race_number") or "").strip() or "?"
+        acc.add_row(row)
+    return acc
+
+
+def compute_stats_many(races: Dict[str, str], lap_length_km: float, jobs: Optional[int] = None):
+    """Compute combined stats of several races ({race_key: csv_path}).
+
+    Each file is aggregated in its own worker process and the partial results
+    are merged in race order, so the output does not depend on the job count.
+    Race numbers are labelled with their race start.
+    """
+    items = list(races.items())
+    if not items:
+        return StatsAccumulator([], lap_length_km).result()
+    # Row order across files for tie-breaking: file index in the high bits
+    args = [(path, lap_length_km, i << 40, key[:16]) for i, (key, path) in enumerate(items)]
+    if jobs == 1 or len(items) == 1:
+        partials = [accumulate_csv(*a) for a in args]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            partials = list(pool.map(accumulate_csv, *zip(*args)))
+    total = partials[0]
+    for partial in partials[1:]:
+        total.merge(partial)
+    return total.result()
+
+
+def compute_stats_columns(path: str, lap_length_km: float, backend: str = "python"):
+    """Stats of a memory-mapped .lapcol file."""
+    from race_columns import RaceColumns
+    with RaceColumns(path) as columns:
+        if backend == "numpy":
+            try:
+                from race_stats_numpy import compute_stats_matrix
+            except ImportError:
+                raise SystemExit("The numpy backend requires numpy (pip install numpy).")
+            return compute_stats_matrix(columns.matrix(), lap_length_km)
+        return columns.accumulator(lap_length_km).result()
+
+
+def compute_stats_profiled(path: str, lap_length_km: float, backend: str, metrics):
+    """compute stats with the load, parse and aggregate phases timed separately in metrics.
+
+    The CSV is read into memory before it is parsed, and all rows are parsed
+    before any is aggregated, so each phase is measured on its own. The numpy
+    backend reads and parses in one pass (reported as parse); a .lapcol file
+    needs no parsing.
+    """
+    if backend == "numpy":
+        try:
+            from race_stats_numpy import compute_stats_matrix, load_matrix
+        except ImportError:
+            raise SystemExit("The numpy backend requires numpy (pip install numpy).")
+    if path.endswith(".lapcol"):
+        from race_columns import RaceColumns
+        with metrics.timer("load"):
+            columns = RaceColumns(path)
+        with columns, metrics.timer("aggregate"):
+            metrics.count("rows", len(columns))
+            if backend == "numpy":
+                return compute_stats_matrix(columns.matrix(), lap_length_km)
+            return columns.accumulator(lap_length_km).result()
+    if backend == "numpy":
+        with metrics.timer("parse"):
+            matrix = load_matrix(path)
+        metrics.count("rows", len(matrix.race_numbers))
+        with metrics.timer("aggregate"):
+            return compute_stats_matrix(matrix, lap_length_km)
+
+    import io
+    with metrics.timer("load"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+    with metrics.timer("parse"):
+        reader = csv.DictReader(io.StringIO(text, newline=""))
+        lap_cols = [c for c in (reader.fieldnames or []) if c.startswith("lap")]
+        lap_cols.sort(key=lambda x: int(x.replace("lap", "")))
+        acc = StatsAccumulator(lap_cols, lap_length_km)
+        parsed = [acc.parse_row(row) for row in reader]
+    metrics.count("rows", len(parsed))
+    with metrics.timer("aggregate"):
+        for row in parsed:
+            acc.add_parsed(*row)
+        return acc.result()
 
-        # Parse laps for this runner
-        laps_td: List[timedelta] = []
-        for i, lap_col in enumerate(lap_cols, start=1):
-            td = parse_elapsed(row.get(lap_col, ""))
-            if td is not None:
-                laps_td.append(td)
 
-        # Compute per-lap splits and track fastest split by gender
-        prev = timedelta(0)
-        for i, td in enumerate(laps_td, start=1):
-            split = td - prev
-            prev = td
-            current = fastest_lap_by_gender.get(gender)
-            if current is None or split < current[0]:
-                fastest_lap_by_gender[gender] = (split, race_number, hallway, i)
-
-        lap_count = len(laps_td)
-        distance = lap_count * lap_length_km
-        by_hallway_distance[hallway] = by_hallway_distance.get(hallway, 0.0) + distance
-        by_gender_distance[gender] = by_gender_distance.get(gender, 0.0) + distance
-
-        # Finish time
-        finish_td = parse_elapsed(row.get("finish_time", ""))
-        if finish_td is not None:
-            finish_times_by_gender.setdefault(gender, []).append((finish_td, race_number, hallway))
-
-    # Sort top 10 finish per gender
-    top10_finish_by_gender: Dict[str, List[Tuple[timedelta, str, str]]] = {}
-    for g, items in finish_times_by_gender.items():
-        items.sort(key=lambda x: x[0])
-        top10_finish_by_gender[g] = items[:10]
-
-    return {
-        "by_hallway_distance": by_hallway_distance,
-        "by_gender_distance": by_gender_distance,
-        "fastest_lap_by_gender": fastest_lap_by_gender,
-        "top10_finish_by_gender": top10_finish_by_gender,
-    }
+def print_profile(metrics):
+    """Per-phase times, in the order the phases ran."""
+    total_ns = sum(h.total_ns for h in metrics.histograms.values())
+    print(f"\nProfile ({metrics.counters.get('rows', 0)} rows):")
+    for name, histogram in metrics.histograms.items():
+        print(f"  {name:10} {histogram.total_ns / 1e6:10.1f} ms  {histogram.total_ns / (total_ns or 1):6.1%}")
+    print(f"  {'total':10} {total_ns / 1e6:10.1f} ms")
 
 
-def write_stats_text(out_path: str, stats, lap_length_km: float, csv_path: str):
+def format_stats_text(stats, lap_length_km: float, csv_path: str) -> str:
     lines: List[str] = []
     lines.append("=" * 72)
     lines.append("Race Stats Summary")
@@ -149,8 +439,8 @@ def write_stats_text(out_path: str, stats, lap_length_km: float, csv_path: str):
     lines.append("Fastest Lap (Split) by Gender:")
     fastest = stats["fastest_lap_by_gender"]
     if fastest:
-        for gender, (td, race_number, hallway, lap_index) in sorted(fastest.items(), key=lambda x: x[0]):
-            lines.append(f"- {gender}: {format_td(td)} (Runner #{race_number}, {hallway}, lap {lap_index})")
+        for gender, (ms, race_number, hallway, lap_index) in sorted(fastest.items(), key=lambda x: x[0]):
+            lines.append(f"- {gender}: {format_ms(ms)} (Runner #{race_number}, {hallway}, lap {lap_index})")
     else:
         lines.append("- No laps recorded")
     lines.append("")
@@ -161,35 +451,168 @@ def write_stats_text(out_path: str, stats, lap_length_km: float, csv_path: str):
         for gender, items in sorted(top10.items(), key=lambda x: x[0]):
             lines.append(f"- {gender}:")
             if items:
-                for idx, (td, race_number, hallway) in enumerate(items, start=1):
-                    lines.append(f"  {idx:2}. {format_td(td)} (Runner #{race_number}, {hallway})")
+                for idx, (ms, race_number, hallway) in enumerate(items, start=1):
+                    lines.append(f"  {idx:2}. {format_ms(ms)} (Runner #{race_number}, {hallway})")
             else:
                 lines.append("  No finishers")
     else:
         lines.append("- No finishers recorded")
     lines.append("")
+    return "\n".join(lines) + "\n"
 
+
+def write_stats_text(out_path: str, stats, lap_length_km: float, csv_path: str):
+    emit_stats_text(out_path, format_stats_text(stats, lap_length_km, csv_path))
+
+
+def emit_stats_text(out_path: str, text: str):
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines) + "\n")
+        f.write(text)
 
     # Also print to stdout for convenience
-    print("\n".join(lines))
+    print(text, end="")
     print(f"\n✓ Wrote stats: {out_path}")
 
 
+def answer_path(archive_path: str) -> str:
+    return os.path.splitext(archive_path)[0] + ANSWER_SUFFIX
+
+
+def _answer_key(csv_path: str, lap_length_km: float) -> Optional[str]:
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    return "\t".join((f"v{ANSWER_VERSION}", os.path.abspath(csv_path), str(st.st_mtime_ns),
+                      str(st.st_size), repr(lap_length_km), str(TOP_N), csv_path))
+
+
+def read_answer(path: str, csv_path: str, lap_length_km: float) -> Optional[str]:
+    """Stats text of the last run, if it was on the same, unchanged file (else None)."""
+    key = _answer_key(csv_path, lap_length_km)
+    if key is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.readline().rstrip("\n") != key:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def save_answer(path: str, csv_path: str, lap_length_km: float, text: str):
+    """Keep text for read_answer(); a failed write only costs the next run."""
+    key = _answer_key(csv_path, lap_length_km)
+    if key is None or "\n" in key:
+        return
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(key + "\n")
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def main_many(args):
+    paths = find_lap_times_csvs(args.glob_pattern, args.directory)
+    if not paths:
+        raise SystemExit("No lap_times CSVs matched --glob/--dir.")
+    races = dedupe_races(paths)
+    print(f"{len(paths)} CSV files, {len(races)} races ({len(paths) - len(races)} duplicate copies skipped)")
+    stats = compute_stats_many(races, args.lap_length, args.jobs)
+
+    out_path = args.out_path or f"season_stats_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+    source = f"{len(races)} races from {args.glob_pattern or args.directory}"
+    write_stats_text(out_path, stats, args.lap_length, source)
+
+
+def main_follow(args, csv_path: str, archive):
+    from race_follow import follow_csv, follow_journal
+    out_path = args.out_path or "live_stats.txt"
+    journal_path = csv_path if csv_path.endswith(".journal") else os.path.splitext(csv_path)[0] + ".journal"
+    try:
+        if os.path.exists(journal_path):
+            print(f"Following {journal_path} every {args.interval:g} s (Ctrl+C to stop)")
+            follow_journal(journal_path, args.lap_length, out_path, args.interval)
+        elif archive is not None:
+            print(f"No lap journal next to {csv_path}; following the CSV through the race archive")
+            follow_csv(csv_path, archive, args.lap_length, out_path, args.interval)
+        else:
+            raise SystemExit(f"No lap journal for {csv_path}; --follow without a journal needs the race archive.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if archive is not None:
+            archive.close()
+
+
 def main():
     args = parse_args()
-    csv_path = args.csv_path or latest_lap_times_csv()
+    if args.glob_pattern or args.directory:
+        return main_many(args)
+    out_path = args.out_path or f"stats_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+    # A repeat run on an unchanged file is answered without the archive or the stats code
+    answers = answer_path(args.archive) if not (args.no_cache or args.follow or args.profile) else None
+    if answers and args.csv_path:
+        text = read_answer(answers, args.csv_path, args.lap_length)
+        if text is not None:
+            return emit_stats_text(out_path, text)
+
+    archive = None
+    if not args.no_cache:
+        import sqlite3
+        from race_archive import RaceArchive
+        try:
+            archive = RaceArchive(args.archive)
+        except sqlite3.Error as e:
+            print(f"Race archive unavailable ({e}); reading the CSV directly")
+
+    csv_path = args.csv_path or (archive and archive.latest()) or latest_lap_times_csv()
     if not csv_path or not os.path.exists(csv_path):
         raise SystemExit("No lap_times CSV found. Provide --csv or place lap_times_*.csv in current directory.")
-
-    rows, lap_cols = load_rows(csv_path)
-    stats = compute_stats(rows, lap_cols, args.lap_length)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_path = args.out_path or f"stats_{timestamp}.txt"
-
-    write_stats_text(out_path, stats, args.lap_length, csv_path)
+    if args.follow:
+        return main_follow(args, csv_path, archive)
+    if answers and not args.csv_path:
+        text = read_answer(answers, csv_path, args.lap_length)
+        if text is not None:
+            if archive is not None:
+                archive.close()
+            return emit_stats_text(out_path, text)
+
+    profile = None
+    if args.profile:
+        from metrics import Metrics
+        profile = Metrics()
+        stats = compute_stats_profiled(csv_path, args.lap_length, args.backend, profile)
+    elif csv_path.endswith(".lapcol"):
+        stats = compute_stats_columns(csv_path, args.lap_length, args.backend)
+    elif args.backend == "numpy":
+        try:
+            from race_stats_numpy import compute_stats_numpy
+        except ImportError:
+            raise SystemExit("The numpy backend requires numpy (pip install numpy).")
+        stats = compute_stats_numpy(csv_path, args.lap_length)
+    elif archive is not None:
+        stats = archive.stats(csv_path, args.lap_length)
+        print(f"Race archive: {archive.last_lookup} ({archive.rows_parsed} rows parsed)")
+    else:
+        rows, lap_cols = iter_rows(csv_path)
+        stats = compute_stats(rows, lap_cols, args.lap_length)
+    if archive is not None:
+        archive.close()
+
+    if profile is not None:
+        with profile.timer("write"):
+            write_stats_text(out_path, stats, args.lap_length, csv_path)
+        print_profile(profile)
+        return
+    text = format_stats_text(stats, args.lap_length, csv_path)
+    if answers:
+        save_answer(answers, csv_path, args.lap_length, text)
+    emit_stats_text(out_path, text)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+"""
+Bounded Event Log
+
+Keeps the last max_lines log entries in a ring buffer and mirrors them into a
+Tk text widget. Entries are queued and drawn in one batch per frame, so a
+burst of events costs a single insert/trim/scroll. Every entry is also
+written to a rotating log file, so lines dropped from the widget remain
+available on disk.
+
+The widget can be attached after entries were added (e.g. when the log panel
+is built after the window first appears); the buffered lines are drawn then.
+The log file is opened on the first flush.
+"""
+
+import tkinter as tk
+from collections import deque
+from datetime import datetime
+
+
+class EventLog:
+    """Ring-buffered log model driving a (disabled) Text widget."""
+
+    def __init__(self, root, text_widget, max_lines=500, log_file=None,
+                 max_bytes=1_000_000, backup_count=5, flush_ms=16):
+        self.root = root
+        self.text = text_widget
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        self.entries = deque(maxlen=max_lines)  # (line, tag)
+        self._pending = []
+        self._flush_scheduled = False
+        self._widget_lines = 0
+        self._tags = set()
+        self._file_logger = None
+
+    def attach(self, text_widget):
+        """Start drawing into text_widget, beginning with the buffered entries."""
+        self.text = text_widget
+        self._widget_lines = 0
+        # Entries still pending are drawn by the next flush
+        shown = list(self.entries)[:max(0, len(self.entries) - len(self._pending))]
+        if shown:
+            self._draw(shown)
+
+    def _open_log_file(self):
+        import logging
+        import logging.handlers
+        logger = logging.getLogger(f"{__name__}.{id(self)}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = logging.handlers.RotatingFileHandler(
+            self.log_file, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        self._file_logger = logger
+
+    def add(self, message, color=None):
+        """Queue a log entry; the widget is redrawn on the next frame."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        line = f"[{timestamp}] {message}\n"
+        entry = (line, color)
+        self.entries.append(entry)
+        self._pending.append(entry)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after(self.flush_ms, self.flush)
+
+    def flush(self):
+        """Draw all queued entries at once and trim the widget to max_lines."""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        if self.log_file:
+            if self._file_logger is None:
+                self._open_log_file()
+            self._file_logger.info(''.join(line for line, _ in pending).rstrip('\n'))
+        if self.text is not None:
+            self._draw(pending)
+
+    def _draw(self, pending):
+        # Only the newest max_lines entries can be visible
+        if len(pending) > self.max_lines:
+            pending = pending[-self.max_lines:]
+
+        # Group consecutive entries with the same tag into one insert
+        chunks = []
+        for line, tag in pending:
+            if chunks and chunks[-1][1] == tag:
+                chunks[-1][0].append(line)
+            else:
+                chunks.append(([line], tag))
+
+        self.text.config(state=tk.NORMAL)
+        for lines, tag in chunks:
+            if tag:
+                if tag not in self._tags:
+                    self._ensure_tag(tag)
+                self.text.insert(tk.END, ''.join(lines), (tag,))
+            else:
+                self.text.insert(tk.END, ''.join(lines))
+        self._widget_lines += len(pending)
+        excess = self._widget_lines - self.max_lines
+        if excess > 0:
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self._widget_lines -= excess
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+
+    def _ensure_tag(self, tag):
+        # Use the tag name as its colour unless the tag is configured already
+        try:
+            configured = self.text.tag_cget(tag, 'foreground')
+        except tk.TclError:
+            configured = ''
+        if not configured:
+            self.text.tag_config(tag, foreground=tag)
+        self._tags.add(tag)
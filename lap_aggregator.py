@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Lap Aggregator
+
+Collects lap events from several capture stations and records them in one
+race. Stations (the GUI started with --connect, or the headless client
+below) timestamp each bib on their own monotonic clock and send it over TCP;
+the aggregator converts the time to its own clock, holds events for a short
+reorder window so laps from different stations are applied in capture
+order, drops the same bib entered again within dedup_seconds (by any
+station), and records the laps through a race_engine.RaceEngine, which
+applies the lap limit and owns the journal, CSV and backups.
+
+Protocol: one JSON object per line.
+  station -> aggregator
+    {"type": "hello", "station": "north", "clock_ns": <station clock>}
+    {"type": "lap", "seq": 1, "bib": "101", "t_ns": <station clock at capture>}
+  aggregator -> station
+    {"type": "welcome", "start": "...", "total_laps": 10, "lap_length": 2.5}
+    {"type": "ack", "seq": 1, "bib": "101", "status": "ok", "lap": 3, "elapsed_ms": 1234567}
+        status: ok, duplicate, late (older than the runner's last lap), limit, unknown, error
+        (malformed message, or a capture time before the race start or after its arrival)
+    {"type": "recorded", "bib": "101", "lap": 3, "elapsed_ms": 1234567, "hallway": "...",
+     "gender": "...", "station": "north"}     (every accepted lap, to every station)
+
+The station clock offset is measured when the hello arrives, so its error is
+the one-way network latency (well below a millisecond on a LAN).
+
+Usage:
+    python3 lap_aggregator.py serve --runners runners.csv --total-laps 10 --lap-length 2.5
+    python3 lap_aggregator.py serve --runners runners.csv --resume lap_times_<timestamp>.journal
+    python3 lap_aggregator.py client --station north      # one bib per line on stdin
+    python3 lap_time_control.py --connect 127.0.0.1:8765 --station south
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import socket
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from race_clock import now_ns
+from race_engine import DUPLICATE, LIMIT, OK, RaceEngine
+from race_recovery import load_race
+from race_store import LAP_MS_LIMIT, iter_records
+from roster import load_roster
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Events are applied this long after capture, so slightly late stations are merged in order
+REORDER_MS = 300
+# The same bib again within this many seconds is treated as a duplicate entry
+DEDUP_SECONDS = 10.0
+BACKUP_DIR = 'backups'
+
+
+class LapAggregator:
+    """Merges lap events from stations into one race and its output files."""
+
+    def __init__(self, engine: RaceEngine, reorder_ms: int = REORDER_MS,
+                 report: Optional[Callable[[str], None]] = None):
+        self.engine = engine
+        self.reorder_ns = reorder_ms * 1_000_000
+        self.report = report or print
+        # (captured_ns, arrival, station, seq, bib, reply) waiting for the reorder window
+        self._pending: List[Tuple[int, int, str, int, str, Callable[[dict], None]]] = []
+        self._arrivals = 0
+        self._stations: Dict[object, Callable[[dict], None]] = {}
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """Events per status."""
+        return self.engine.counts
+
+    def welcome(self) -> dict:
+        engine = self.engine
+        return {'type': 'welcome', 'start': engine.start_timestamp,
+                'total_laps': engine.total_laps, 'lap_length': engine.lap_length}
+
+    def submit(self, captured_ns: int, station: str, seq: int, bib: str, reply: Callable[[dict], None]):
+        """Queue a lap captured at captured_ns (aggregator clock)."""
+        self._arrivals += 1
+        heapq.heappush(self._pending, (captured_ns, self._arrivals, station, seq, bib, reply))
+
+    def check_time(self, captured_ns: int, received_ns: int):
+        """Raise ValueError unless a lap captured at captured_ns and received at received_ns can be recorded.
+
+        The race stores elapsed times as unsigned 32-bit milliseconds, and a
+        lap captured later than the reorder window after it arrived would
+        wait in the queue until then.
+        """
+        elapsed_ms = self.engine.clock.elapsed_ms(captured_ns)
+        if not 0 <= elapsed_ms < LAP_MS_LIMIT:
+            raise ValueError(f"capture time {elapsed_ms} ms is outside the race")
+        if captured_ns > received_ns + self.reorder_ns:
+            raise ValueError(f"capture time is {(captured_ns - received_ns) // 1_000_000} ms in the future")
+
+    def release(self, now: Optional[int] = None, flush: bool = False):
+        """Apply queued laps whose reorder window has passed (all of them if flush).
+
+        Everything released together is recorded as one batch, so it reaches
+        the writer as a single queue item.
+        """
+        if now is None:
+            now = now_ns()
+        deadline = now - self.reorder_ns
+        pending = self._pending
+        batch = []
+        while pending and (flush or pending[0][0] <= deadline):
+            batch.append(heapq.heappop(pending))
+        if not batch:
+            return
+        engine = self.engine
+        elapsed_ms = engine.clock.elapsed_ms
+        # The dedup window, not the batch, decides whether a repeated bib is a duplicate
+        results = engine.record_many([(bib, elapsed_ms(captured_ns)) for captured_ns, _, _, _, bib, _ in batch],
+                                     once_per_batch=False)
+        for (_, _, station, seq, bib, reply), result in zip(batch, results):
+            status = result.status
+            ack = {'type': 'ack', 'seq': seq, 'bib': bib, 'status': status, 'elapsed_ms': result.elapsed_ms}
+            if result.runner is not None:
+                ack['lap'] = result.lap
+            reply(ack)
+            if status == OK:
+                finish = " - FINISHED!" if result.lap == engine.total_laps else ""
+                self.report(f"Recorded: Runner #{bib} - Lap {result.lap}/{engine.total_laps}{finish}")
+                self.broadcast({'type': 'recorded', 'bib': bib, 'lap': result.lap, 'elapsed_ms': result.elapsed_ms,
+                                'hallway': result.runner.hallway, 'gender': result.runner.gender,
+                                'station': station})
+            elif status not in (DUPLICATE, LIMIT):
+                self.report(f"WARNING: Runner #{bib} at {result.elapsed_ms} ms: {engine.problem_text(result)}")
+
+    def broadcast(self, message: dict):
+        for send in list(self._stations.values()):
+            send(message)
+
+    # -- asyncio server ------------------------------------------------------
+
+    async def handle_station(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        station = str(peer)
+        offset_ns = None
+
+        def send(message: dict):
+            if not writer.is_closing():
+                writer.write((json.dumps(message) + '\n').encode('utf-8'))
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received_ns = now_ns()
+                message = None
+                try:
+                    message = json.loads(line)
+                    kind = message['type']
+                    if kind == 'hello':
+                        station = str(message.get('station') or station)
+                        offset_ns = received_ns - int(message['clock_ns'])
+                        send(self.welcome())
+                        # Replay the race so far, then follow live laps
+                        for bib, lap, elapsed_ms, hallway, gender in iter_records(self.engine.runners.values()):
+                            send({'type': 'recorded', 'bib': bib, 'lap': lap, 'elapsed_ms': elapsed_ms,
+                                  'hallway': hallway, 'gender': gender, 'station': ''})
+                        self._stations[writer] = send
+                        self.report(f"Station {station} connected from {peer}")
+                    elif kind == 'lap':
+                        if offset_ns is None:
+                            raise ValueError("lap before hello")
+                        bib = str(message['bib']).strip()
+                        captured_ns = int(message['t_ns']) + offset_ns
+                        self.check_time(captured_ns, received_ns)
+                        self.submit(captured_ns, station, int(message.get('seq', 0)), bib, send)
+                    else:
+                        raise ValueError(f"unknown message type {kind!r}")
+                except (ValueError, KeyError, TypeError, OverflowError) as e:
+                    send({'type': 'ack', 'seq': message.get('seq') if isinstance(message, dict) else None,
+                          'status': 'error', 'message': str(e)})
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._stations.pop(writer, None)
+            writer.close()
+            self.report(f"Station {station} disconnected")
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, ready: Optional[Callable] = None):
+        """Accept stations and apply their laps until cancelled."""
+        server = await asyncio.start_server(self.handle_station, host, port)
+        if ready:
+            ready(server)
+        tick = max(self.reorder_ns / 4e9, 0.01)
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(tick)
+                    self.release()
+        finally:
+            self.release(flush=True)
+
+
+class AggregatorClient:
+    """Blocking TCP client for a capture station.
+
+    Messages from the aggregator are passed to on_message(dict) from a
+    reader thread; a GUI should marshal them onto its own loop. on_message
+    receives {'type': 'closed'} when the connection ends.
+    """
+
+    def __init__(self, host: str, port: int, station: str,
+                 on_message: Optional[Callable[[dict], None]] = None, timeout: float = 5.0):
+        self.station = station
+        self.on_message = on_message or (lambda message: None)
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send_lock = threading.Lock()
+        self._seq = 0
+        self._send({'type': 'hello', 'station': station, 'clock_ns': now_ns()})
+        self._reader = threading.Thread(target=self._read_loop, name=f"aggregator-{station}", daemon=True)
+        self._reader.start()
+
+    def send_lap(self, bib: str, captured_ns: Optional[int] = None) -> int:
+        """Send a lap captured at captured_ns (this station's now_ns clock); returns its seq."""
+        if captured_ns is None:
+            captured_ns = now_ns()
+        with self._send_lock:
+            self._seq += 1
+            seq = self._seq
+            self.sock.sendall((json.dumps({'type': 'lap', 'seq': seq, 'bib': bib, 't_ns': captured_ns})
+                               + '\n').encode('utf-8'))
+        return seq
+
+    def _send(self, message: dict):
+        with self._send_lock:
+            self.sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+    def _read_loop(self):
+        try:
+            with self.sock.makefile('r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.on_message(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        self.on_message({'type': 'closed'})
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+# -- Command line -------------------------------------------------------------
+
+def parse_address(text: str) -> Tuple[str, int]:
+    """'host:port', 'host' or ':port' -> (host, port)."""
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', '')
+    return host or DEFAULT_HOST, int(port) if port else DEFAULT_PORT
+
+
+def run_server(args):
+    roster = load_roster(args.runners)
+    for line, problem in roster.errors:
+        print(f"WARNING: {args.runners} line {line}: {problem}")
+    engine = RaceEngine(roster.runners, report=lambda message, color=None: print(message),
+                        dedup_ms=int(args.dedup_seconds * 1000), backup_dir=BACKUP_DIR)
+
+    if args.resume:
+        race = load_race(args.resume)
+        try:
+            engine.resume(race, args.lap_length)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Resumed race from {args.resume}: {race.lap_count} laps")
+    else:
+        engine.start(args.total_laps, args.lap_length)
+    aggregator = LapAggregator(engine, reorder_ms=args.reorder_ms)
+
+    def ready(server):
+        addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+        print(f"Aggregating laps on {addresses} - {engine.total_laps} laps x {engine.lap_length} km "
+              f"- output {engine.output_file}")
+
+    try:
+        asyncio.run(aggregator.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        print(f"Stopped. Results saved to {engine.output_file} - {aggregator.counts}")
+
+
+def run_client(args):
+    """Send one bib per stdin line, timestamped as the line is read."""
+    acked = threading.Condition()
+    state = {'acks': 0, 'closed': False}
+
+    def on_message(message):
+        kind = message.get('type')
+        if kind == 'welcome':
+            print(f"Connected: race started {message['start']}, {message['total_laps']} laps", flush=True)
+        elif kind == 'ack':
+            lap = f" lap {message['lap']}" if 'lap' in message else ""
+            print(f"{message.get('bib')}: {message['status']}{lap}", flush=True)
+        if kind in ('ack', 'closed'):
+            with acked:
+                state['acks'] += kind == 'ack'
+                state['closed'] |= kind == 'closed'
+                acked.notify_all()
+
+    client = AggregatorClient(args.host, args.port, args.station, on_message)
+    sent = 0
+    try:
+        for line in sys.stdin:
+            captured_ns = now_ns()
+            for bib in line.split():
+                client.send_lap(bib, captured_ns)
+                sent += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Acks follow the reorder window; wait for the outstanding ones
+        with acked:
+            acked.wait_for(lambda: state['acks'] >= sent or state['closed'], timeout=5.0)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-station lap aggregator")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="Run the aggregator")
+    serve.add_argument('--runners', required=True, help="Runners CSV (number,hallway,gender)")
+    serve.add_argument('--total-laps', type=int, default=10)
+    serve.add_argument('--lap-length', type=float, default=2.5)
+    serve.add_argument('--resume', help="Continue a race from its journal, CSV or backup directory")
+    serve.add_argument('--host', default=DEFAULT_HOST, help="Address to listen on (0.0.0.0 for the LAN)")
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--reorder-ms', type=int, default=REORDER_MS)
+    serve.add_argument('--dedup-seconds', type=float, default=DEDUP_SECONDS)
+
+    client = sub.add_parser('client', help="Headless capture station reading bibs from stdin")
+    client.add_argument('--station', default=socket.gethostname())
+    client.add_argument('--host', default=DEFAULT_HOST)
+    client.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        run_server(args)
+    else:
+        run_client(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Incremental Lap Backups
+
+Instead of copying the whole lap times file on every backup, each backup
+only stores the laps recorded since the previous one, as a numbered segment
+file in a per-race directory:
+
+  backups/lap_times_20260205_182602/
+      base.journal            race metadata + compacted older segments
+      segment_000041.journal  laps 401-410
+      segment_000042.journal  laps 411-420
+
+All files use the lap journal format. When more than max_segments segments
+exist, the oldest ones are appended to base.journal and removed, so the
+number of files stays bounded and every backup costs time proportional to
+the laps it adds, not to the size of the race.
+
+Restore the full race from a backup directory with:
+    python3 lap_backup.py backups/lap_times_20260205_182602 --journal restored.journal --csv restored.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import time
+from typing import Iterator, List, Optional, Set, Tuple
+
+from lap_journal import journal_to_csv
+
+
+BASE_NAME = 'base.journal'
+SEGMENT_RE = re.compile(r'^segment_(\d+)\.journal$')
+
+LapRecord = Tuple[str, int, int, str, str]
+
+
+def _fsync_write(path: str, text: str, mode: str = 'w'):
+    with open(path, mode, newline='', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _records_text(records: List[LapRecord]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(records)
+    return buf.getvalue()
+
+
+def list_segments(race_dir: str) -> List[Tuple[int, str]]:
+    """Return (index, path) of all segments in a backup directory, oldest first."""
+    segments = []
+    for name in os.listdir(race_dir):
+        m = SEGMENT_RE.match(name)
+        if m:
+            segments.append((int(m.group(1)), os.path.join(race_dir, name)))
+    segments.sort()
+    return segments
+
+
+class SegmentBackup:
+    """Writes laps recorded since the last backup as a new segment file.
+
+    A backup is due after every_laps new laps or, if every_seconds is set,
+    when that much time has passed and at least one new lap is pending.
+    """
+
+    def __init__(self, race_dir: str, meta: dict, every_laps: int = 10,
+                 every_seconds: Optional[float] = None, max_segments: int = 50):
+        self.race_dir = race_dir
+        self.every_laps = every_laps
+        self.every_seconds = every_seconds
+        self.max_segments = max(1, max_segments)
+        self._pending: List[LapRecord] = []
+        self._last_backup = time.monotonic()
+
+        os.makedirs(race_dir, exist_ok=True)
+        base_path = os.path.join(race_dir, BASE_NAME)
+        if not os.path.exists(base_path):
+            _fsync_write(base_path, '#' + json.dumps(meta, ensure_ascii=False) + '\n')
+        self._segments = list_segments(race_dir)
+        self._next_index = self._segments[-1][0] + 1 if self._segments else 1
+
+    def add(self, records: List[LapRecord]):
+        """Remember laps that are not yet part of a backup."""
+        self._pending.extend(records)
+
+    def stored(self) -> Set[Tuple[str, int]]:
+        """(race_number, lap) of every lap already in the backup directory."""
+        _, records = restore(self.race_dir)
+        return {(race_number, lap) for race_number, lap, *_ in records}
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def due(self) -> bool:
+        """Whether the configured cadence calls for a backup now."""
+        if not self._pending:
+            return False
+        if self.every_laps and len(self._pending) >= self.every_laps:
+            return True
+        return bool(self.every_seconds) and time.monotonic() - self._last_backup >= self.every_seconds
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Time until a time-based backup is due, or None if not time-based."""
+        if not self.every_seconds or not self._pending:
+            return None
+        return max(0.0, self.every_seconds - (time.monotonic() - self._last_backup))
+
+    def write(self) -> Optional[str]:
+        """Write pending laps to a new segment. Returns its path, or None if nothing was pending."""
+        self._last_backup = time.monotonic()
+        if not self._pending:
+            return None
+        path = os.path.join(self.race_dir, f"segment_{self._next_index:06}.journal")
+        tmp_path = path + '.tmp'
+        _fsync_write(tmp_path, _records_text(self._pending))
+        os.replace(tmp_path, path)
+        self._segments.append((self._next_index, path))
+        self._next_index += 1
+        self._pending = []
+        self._compact()
+        return path
+
+    def _compact(self):
+        """Fold the oldest segments into base.journal once there are too many."""
+        excess = len(self._segments) - self.max_segments
+        if excess <= 0:
+            return
+        oldest = self._segments[:excess]
+        chunks = []
+        for _, path in oldest:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                chunks.append(f.read())
+        _fsync_write(os.path.join(self.race_dir, BASE_NAME), ''.join(chunks), mode='a')
+        # A crash between the append and the removal leaves duplicated laps;
+        # restore() drops those, so the order of these steps is safe.
+        for _, path in oldest:
+            os.remove(path)
+        self._segments = self._segments[excess:]
+
+
+def restore(race_dir: str) -> Tuple[dict, Iterator[LapRecord]]:
+    """Rebuild (meta, records) from base.journal and all segments, in order."""
+    base_path = os.path.join(race_dir, BASE_NAME)
+    meta = {}
+    paths = [p for _, p in list_segments(race_dir)]
+    if os.path.exists(base_path):
+        with open(base_path, 'r', encoding='utf-8') as f:
+            first = f.readline()
+        if first.startswith('#'):
+            meta = json.loads(first[1:])
+        paths.insert(0, base_path)
+
+    def records():
+        seen = set()
+        for path in paths:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if len(row) < 3 or row[0].startswith('#'):
+                        continue
+                    try:
+                        lap = int(row[1])
+                        elapsed_ms = int(row[2])
+                    except ValueError:
+                        continue
+                    key = (row[0], lap)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    hallway = row[3] if len(row) > 3 else ''
+                    gender = row[4] if len(row) > 4 else ''
+                    yield row[0], lap, elapsed_ms, hallway, gender
+
+    return meta, records()
+
+
+def restore_journal(race_dir: str, journal_path: str):
+    """Write a complete lap journal rebuilt from a backup directory."""
+    meta, records = restore(race_dir)
+    tmp_path = journal_path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        f.write('#' + json.dumps(meta, ensure_ascii=False) + '\n')
+        csv.writer(f).writerows(records)
+    os.replace(tmp_path, journal_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore a race from incremental lap backups")
+    parser.add_argument("backup_dir", help="Backup directory, e.g. backups/lap_times_20260205_182602")
+    parser.add_argument("--journal", dest="journal_path", default=None,
+                        help="Restored journal path (default: restored_<race>.journal)")
+    parser.add_argument("--csv", dest="csv_path", default=None,
+                        help="Restored lap times CSV path (default: restored_<race>.csv)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.backup_dir):
+        raise SystemExit(f"Backup directory not found: {args.backup_dir}")
+    race_name = os.path.basename(os.path.normpath(args.backup_dir))
+    journal_path = args.journal_path or f"restored_{race_name}.journal"
+    csv_path = args.csv_path or f"restored_{race_name}.csv"
+
+    restore_journal(args.backup_dir, journal_path)
+    journal_to_csv(journal_path, csv_path)
+    print(f"✓ Restored journal: {journal_path}")
+    print(f"✓ Restored CSV: {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Append-only Lap Journal
+
+Every recorded lap is appended to the journal as a single CSV record:
+  race_number,lap,elapsed_ms,hallway,gender
+The first line holds the race metadata as JSON, prefixed with '#':
+  #{"start": "2026-02-05 18:26:02.578", "total_laps": 10, "lap_length": 2.5}
+
+Recording a lap therefore costs one small append regardless of race size.
+The wide per-runner lap_times CSV is built from the same data on demand.
+
+Usage:
+    python3 lap_journal.py lap_times_20260205_182602.journal --csv lap_times_20260205_182602.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from race_store import Runner, add_lap, results_rows
+from timecodec import format_ms
+
+
+def results_header(total_laps: int) -> List[str]:
+    """Header of the wide lap_times CSV."""
+    return (
+        ['timestamp', 'race_number', 'hallway', 'gender'] +
+        [f'lap{i}' for i in range(1, total_laps + 1)] + ['finish_time']
+    )
+
+
+def _truncate_torn_record(path: str):
+    """Drop a last record cut short by a crash, so new records start on a fresh line."""
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = max(0, size - 4096)
+        f.seek(tail_start)
+        tail = f.read()
+        if tail.endswith(b'\n'):
+            return
+        f.truncate(tail_start + tail.rfind(b'\n') + 1)
+
+
+class LapJournal:
+    """Append-only journal of lap records.
+
+    fsync_interval controls durability: None never fsyncs (the OS decides),
+    0 fsyncs after every record and a positive value fsyncs at most once per
+    that many seconds.
+    """
+
+    def __init__(self, path: str, meta: Optional[dict] = None, fsync_interval: Optional[float] = 1.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._last_sync = time.monotonic()
+        if os.path.exists(path) and os.path.getsize(path):
+            _truncate_torn_record(path)
+        # Also a journal whose only, torn line was the metadata: it is empty now
+        self.created = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if self.created and meta is not None:
+            self._file.write('#' + json.dumps(meta, ensure_ascii=False) + '\n')
+            self._sync(force=True)
+
+    def append(self, race_number: str, lap: int, elapsed_ms: int, hallway: str = '', gender: str = ''):
+        """Append one lap record."""
+        self._writer.writerow([race_number, lap, elapsed_ms, hallway, gender])
+        self._sync()
+
+    def extend(self, records: Iterable[Tuple[str, int, int, str, str]]):
+        """Append several lap records with a single flush."""
+        self._writer.writerows(records)
+        self._sync()
+
+    def _sync(self, force: bool = False):
+        self._file.flush()
+        if self.fsync_interval is None and not force:
+            return
+        now = time.monotonic()
+        if force or now - self._last_sync >= (self.fsync_interval or 0):
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+    @property
+    def size(self) -> int:
+        """Bytes in the journal file so far (flushed records only)."""
+        return os.fstat(self._file.fileno()).st_size
+
+    def flush(self):
+        """Flush and fsync any pending records."""
+        if not self._file.closed:
+            self._sync(force=True)
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def read_journal(path: str) -> Tuple[dict, Iterator[Tuple[str, int, int, str, str]]]:
+    """Open a journal and return (meta, records).
+
+    records lazily yields (race_number, lap, elapsed_ms, hallway, gender).
+    A last line without a newline (cut short by a crash) is skipped.
+    """
+    f = open(path, 'r', newline='', encoding='utf-8')
+    first = f.readline()
+    meta = {}
+    if first.startswith('#'):
+        meta = json.loads(first[1:])
+    else:
+        f.seek(0)
+
+    def complete_lines():
+        for line in f:
+            if line.endswith('\n'):
+                yield line
+
+    def records():
+        with f:
+            for row in csv.reader(complete_lines()):
+                if len(row) < 3:
+                    continue
+                try:
+                    lap = int(row[1])
+                    elapsed_ms = int(row[2])
+                except ValueError:
+                    continue
+                hallway = row[3] if len(row) > 3 else ''
+                gender = row[4] if len(row) > 4 else ''
+                yield row[0], lap, elapsed_ms, hallway, gender
+
+    return meta, records()
+
+
+def write_results_csv(path: str, start_timestamp: str, total_laps: int,
+                      rows: Iterable[Tuple[str, str, str, Sequence[int]]]):
+    """Write the wide lap_times CSV from (race_number, hallway, gender, lap_ms).
+
+    Lap times are elapsed milliseconds and are formatted here.
+
+    The file is written to a temporary name and renamed into place so readers
+    never see a half-written file.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(results_header(total_laps))
+        for race_number, hallway, gender, lap_ms in rows:
+            laps = [format_ms(ms) for ms in lap_ms[:total_laps]]
+            row = [start_timestamp, race_number, hallway, gender]
+            # Add lap columns padded to total_laps
+            row.extend(laps)
+            row.extend([''] * (total_laps - len(laps)))
+            finish_time = laps[-1] if len(laps) >= total_laps else ''
+            row.append(finish_time)
+            writer.writerow(row)
+    os.replace(tmp_path, path)
+
+
+def journal_to_csv(journal_path: str, csv_path: str):
+    """Rebuild the wide lap_times CSV from a journal."""
+    meta, records = read_journal(journal_path)
+    total_laps = int(meta.get('total_laps', 0))
+    runners: Dict[str, Runner] = {}
+    max_laps = total_laps
+    for race_number, lap, elapsed_ms, hallway, gender in records:
+        add_lap(runners, race_number, elapsed_ms, hallway, gender)
+        max_laps = max(max_laps, lap)
+    write_results_csv(csv_path, meta.get('start', ''), total_laps or max_laps,
+                      results_rows(runners.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild a lap_times CSV from a lap journal")
+    parser.add_argument("journal", help="Path to lap_times_*.journal")
+    parser.add_argument("--csv", dest="csv_path", default=None,
+                        help="Output CSV path (default: journal path with .csv extension)")
+    args = parser.parse_args()
+    csv_path = args.csv_path or os.path.splitext(args.journal)[0] + '.csv'
+    journal_to_csv(args.journal, csv_path)
+    print(f"✓ Wrote {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,42 +4,133 @@ Nybrogård Half Marathon Lap Time Control
 A GUI application for recording lap times during a race.
 """
 
+import argparse
+import re
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import csv
-from datetime import datetime
 import os
-import shutil
-from pathlib import Path
+import queue
+import threading
+
+from bib_index import AMBIGUOUS, EMPTY, IMPOSSIBLE, BibIndex
+from event_log import EventLog
+from leaderboard import LeaderboardView
+from metrics import Metrics, MetricsFile
+from race_clock import DISPLAY_RESOLUTIONS, format_clock, ms_until_next_tick, now_ns
+from race_engine import OK, UNKNOWN, LapResult, RaceEngine
+from race_recovery import find_latest_race, load_race
+from race_store import add_lap
+from timecodec import format_ms
+
+
+# How often the wide lap_times CSV is rebuilt from the recorded laps (seconds)
+CSV_REFRESH_INTERVAL = 5.0
+# Journal durability: fsync at most once per this many seconds (0 = every lap)
+JOURNAL_FSYNC_INTERVAL = 1.0
+# Maximum number of laps waiting for the background writer
+WRITER_MAX_PENDING = 10000
+# How often the writer backlog is shown in the status bar (ms)
+WRITER_STATUS_MS = 500
+# How often messages from the writer thread are logged, and a stopping writer is checked (ms)
+WRITER_POLL_MS = 50
+# Backups: 'incremental' stores only new laps in segment files, 'full' copies the CSV
+BACKUP_MODE = 'incremental'
+BACKUP_DIR = 'backups'
+# Backup cadence: after this many laps, and/or after this many seconds (None = off)
+BACKUP_EVERY_LAPS = 10
+BACKUP_EVERY_SECONDS = 60.0
+# Incremental backups: segments kept before the oldest are folded into base.journal
+BACKUP_MAX_SEGMENTS = 50
+# Event log: lines kept in the window; everything is also written to LOG_FILE
+LOG_MAX_LINES = 500
+LOG_FILE = 'lap_time_control.log'
+LOG_MAX_BYTES = 1_000_000
+LOG_BACKUP_COUNT = 5
+# Default race timer display resolution (see race_clock.DISPLAY_RESOLUTIONS)
+TIMER_RESOLUTION = 'tenths'
+# Also export each race as a binary .lapcol file (race_columns.py) when it stops
+EXPORT_COLUMNS = True
+# Timing metrics (latencies, bytes written, timer lag) written here every METRICS_INTERVAL seconds (None = off)
+METRICS_FILE = 'lap_time_control_metrics.json'
+METRICS_INTERVAL = 10.0
+# How often the diagnostics pane is refreshed while it is shown (ms)
+DIAGNOSTICS_MS = 1000
+# Pre-parsed runner rosters, keyed by the hash of the runners CSV
+ROSTER_CACHE_DIR = 'roster_cache'
+# Burst mode: keys that end a race number (its lap time is taken on the key press)
+BURST_SEPARATOR_KEYS = ('<KeyPress-space>', '<KeyPress-comma>', '<KeyPress-semicolon>')
+BURST_SPLIT = re.compile(r'[\s,;]+')
+# Default of the auto-commit checkbox: record a race number without Enter as soon as
+# no other race number starts with it and its runner can run another lap
+AUTO_COMMIT = False
 
 
 class LapTimeControl:
     """Main application for controlling lap times."""
     
-    def __init__(self, root):
+    def __init__(self, root, aggregator=None):
         self.root = root
         self.root.title("Nybrogård Half Marathon - Lap Time Control")
         self.root.geometry("900x700")
         
         # Race state
         self.race_active = False
-        self.runners = {}  # Dictionary: race_number -> runner_data
-        self.lap_times = []  # List of lap time records
-        self.total_laps = 0
-        self.lap_length = 0.0
+        # Latency histograms and counters for the diagnostics pane and METRICS_FILE
+        self.metrics = Metrics()
+        # Runners, race clock, lap limit and the writer owning the output files
+        self.engine = RaceEngine(report=self._report_from_writer, backup_mode=BACKUP_MODE,
+                                 backup_dir=BACKUP_DIR, backup_every_laps=BACKUP_EVERY_LAPS,
+                                 backup_every_seconds=BACKUP_EVERY_SECONDS,
+                                 backup_max_segments=BACKUP_MAX_SEGMENTS,
+                                 csv_interval=CSV_REFRESH_INTERVAL,
+                                 fsync_interval=JOURNAL_FSYNC_INTERVAL, max_pending=WRITER_MAX_PENDING,
+                                 export_columns=EXPORT_COLUMNS, metrics=self.metrics)
+        self.runners = self.engine.runners  # Dictionary: race_number -> Runner (laps as elapsed ms)
+        self.roster = None  # roster.Roster the runners came from (indexes by hallway/gender)
+        self.bib_index = None  # bib_index.BibIndex of the race numbers, for type-ahead feedback
+        self.bib_feedback = ("", None)  # (text, colour) shown under the race number entry
+        self.roster_thread = None
         self.runners_file = None
-        self.output_file = None
-        self.backup_counter = 0
-        self.race_start_time = None
-        self.race_start_timestamp = None
-        self.runner_laps = {}  # race_number -> list of elapsed lap times (HH:MM:SS.mmm)
+        self.writer_status_text = ""
+        self.writer_messages = queue.Queue()  # (message, color) reported on the writer thread
+        self.closing = False
+        self.timer_after_id = None
+        self.timer_paused = False
+        self.timer_text = ""
+        self.timer_redraws = 0
+        self.timer_busy_ns = 0  # main-loop time spent in update_timer
+        self.timer_due_ns = 0  # when the pending timer redraw should run, for the lag metric
+        self.diagnostics_after_id = None
+        self.station_client = None  # AggregatorClient when running as a capture station
+        self.burst_stamps = []  # burst mode: (race number, capture time ns) of each one typed so far
+        self.entry_problems = []  # (elapsed_ms, race_number, problem) shown in the problems list
+        # Standings and log are kept from the start; their panels are built after the first draw
+        self.leaderboard = LeaderboardView(self.root)
+        self.event_log = EventLog(self.root, None, max_lines=LOG_MAX_LINES,
+                                  log_file=LOG_FILE, max_bytes=LOG_MAX_BYTES,
+                                  backup_count=LOG_BACKUP_COUNT)
+        self.standings_frame = None
+        self.diagnostics_frame = None
         
         # Create GUI
         self.create_widgets()
+        self.root.after_idle(self.create_secondary_widgets)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.metrics_file = None
+        if METRICS_FILE:
+            self.metrics_file = MetricsFile(self.metrics, METRICS_FILE, METRICS_INTERVAL,
+                                            extra=self._metrics_extra)
         self.log_event("Application started")
+        self.root.after(WRITER_POLL_MS, self.poll_writer_messages)
+        if aggregator:
+            self.connect_to_aggregator(*aggregator)
+            return
+        previous = find_latest_race(backup_dir=BACKUP_DIR)
+        if previous:
+            self.log_event(f"Found previous race: {previous} - use Resume Race to continue it")
         
     def create_widgets(self):
-        """Create all GUI widgets."""
+        """Create the widgets needed to set up a race and record laps."""
         
         # Main padded container to give edge padding
         self.main_container = ttk.Frame(self.root, padding=10)
@@ -79,12 +170,18 @@ class LapTimeControl:
         ttk.Entry(config_frame, textvariable=self.lap_length_var, width=10).grid(row=0, column=3, padx=5)
         
         # Load runners button
-        ttk.Button(config_frame, text="Load Runners CSV", 
-                  command=self.load_runners).grid(row=0, column=4, padx=5)
+        self.load_runners_button = ttk.Button(config_frame, text="Load Runners CSV",
+                                              command=self.load_runners)
+        self.load_runners_button.grid(row=0, column=4, padx=5)
         
         self.runners_label = ttk.Label(config_frame, text="No runners loaded")
         self.runners_label.grid(row=0, column=5, padx=5)
         
+        # Shown while a roster loads in the background
+        self.roster_progress = ttk.Progressbar(config_frame, length=120, mode='determinate', maximum=100)
+        self.roster_progress.grid(row=0, column=6, padx=5)
+        self.roster_progress.grid_remove()
+        
         # Control frame - Start/Stop
         control_frame = ttk.LabelFrame(self.main_container, text="Race Control", padding=10)
         control_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -97,6 +194,10 @@ class LapTimeControl:
         self.stop_button = ttk.Button(control_frame, text="Stop Race",
                           command=self.stop_race, width=15, state=tk.DISABLED, style='Danger.TButton')
         self.stop_button.pack(side=tk.LEFT, padx=5)
+        
+        self.resume_button = ttk.Button(control_frame, text="Resume Race",
+                            command=self.resume_race, width=15)
+        self.resume_button.pack(side=tk.LEFT, padx=5)
 
         
         
@@ -109,21 +210,59 @@ class LapTimeControl:
                                           font=('Arial', 12, 'bold'))
         self.race_timer_label.pack(side=tk.RIGHT, padx=10)
         
+        # Race timer display resolution
+        self.timer_resolution_var = tk.StringVar(value=TIMER_RESOLUTION)
+        timer_resolution = ttk.Combobox(control_frame, textvariable=self.timer_resolution_var,
+                                        values=list(DISPLAY_RESOLUTIONS), width=8, state='readonly')
+        timer_resolution.pack(side=tk.RIGHT)
+        timer_resolution.bind('<<ComboboxSelected>>', lambda e: self.schedule_timer(0))
+        
+        self.diagnostics_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Diagnostics", variable=self.diagnostics_var,
+                        command=self.toggle_diagnostics).pack(side=tk.RIGHT, padx=10)
+        
+        # Stop redrawing the timer while the window is minimized
+        self.root.bind('<Unmap>', self._on_unmap)
+        self.root.bind('<Map>', self._on_map)
+        
         # Input frame - Enter race numbers
         input_frame = ttk.LabelFrame(self.main_container, text="Record Lap Time", padding=10)
         input_frame.pack(fill=tk.X, padx=10, pady=5)
         
+        # Type-ahead feedback on the race number being typed, below the entry row
+        self.bib_feedback_label = ttk.Label(input_frame, text="", font=('Arial', 10))
+        self.bib_feedback_label.pack(side=tk.BOTTOM, anchor=tk.W, padx=5, pady=(5, 0))
+        
         ttk.Label(input_frame, text="Race Number:").pack(side=tk.LEFT, padx=5)
         self.race_number_var = tk.StringVar()
         self.race_number_entry = ttk.Entry(input_frame, textvariable=self.race_number_var, 
                                            width=15, font=('Arial', 12))
         self.race_number_entry.pack(side=tk.LEFT, padx=5)
-        self.race_number_entry.bind('<Return>', lambda e: self.record_lap_time())
+        # Capture the lap time the moment the key is pressed, before any validation
+        self.race_number_entry.bind('<Return>', lambda e: self.record_lap_time(now_ns()))
         
         self.record_button = ttk.Button(input_frame, text="Record Lap",
-                        command=self.record_lap_time, style='Primary.TButton')
+                        command=lambda: self.record_lap_time(now_ns()), style='Primary.TButton')
         self.record_button.pack(side=tk.LEFT, padx=5)
         
+        # Burst mode: several race numbers per line, each timed when its separator is typed
+        self.burst_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(input_frame, text="Burst mode (space/comma between numbers)",
+                        variable=self.burst_mode_var,
+                        command=lambda: self.burst_stamps.clear()).pack(side=tk.LEFT, padx=10)
+        for key in BURST_SEPARATOR_KEYS:
+            self.race_number_entry.bind(key, lambda e: self._stamp_burst_numbers(now_ns()))
+        
+        self.auto_commit_var = tk.BooleanVar(value=AUTO_COMMIT)
+        ttk.Checkbutton(input_frame, text="Auto-commit",
+                        variable=self.auto_commit_var).pack(side=tk.LEFT, padx=5)
+        # Checked after the Entry class bindings have applied the key to the text
+        tags = list(self.race_number_entry.bindtags())
+        tags.insert(tags.index(self.race_number_entry.winfo_class()) + 1, 'RaceNumberTypeAhead')
+        self.race_number_entry.bindtags(tuple(tags))
+        self.race_number_entry.bind_class('RaceNumberTypeAhead', '<KeyPress>',
+                                          lambda e: self.check_race_number(now_ns()))
+        
         # Info frame - Show runner info
         info_frame = ttk.LabelFrame(self.main_container, text="Runner Information", padding=10)
         info_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -132,6 +271,39 @@ class LapTimeControl:
                                           font=('Arial', 10))
         self.runner_info_label.pack()
         
+        # Problems frame - rejected entries, worked through without blocking input
+        problems_frame = ttk.LabelFrame(self.main_container, text="Entry Problems", padding=10)
+        problems_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        problem_buttons = ttk.Frame(problems_frame)
+        problem_buttons.pack(side=tk.RIGHT, fill=tk.Y)
+        ttk.Button(problem_buttons, text="Record as Entered Number",
+                   command=self.correct_entry_problem).pack(fill=tk.X, pady=1)
+        ttk.Button(problem_buttons, text="Dismiss",
+                   command=self.dismiss_entry_problem).pack(fill=tk.X, pady=1)
+        self.problems_list = tk.Listbox(problems_frame, height=3, font=('Courier', 11))
+        self.problems_list.pack(fill=tk.X, expand=True)
+        
+        # Status bar
+        self.status_bar = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
+        self.status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        
+    def create_secondary_widgets(self):
+        """Create the standings and log panels (run once the window is up)."""
+        # Standings frame - live leaderboard and hallway distances
+        standings_frame = ttk.LabelFrame(self.main_container, text="Live Standings", padding=10)
+        standings_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.standings_frame = standings_frame
+        
+        self.hallway_totals_label = ttk.Label(standings_frame, text="No laps yet", font=('Arial', 10))
+        self.hallway_totals_label.pack(side=tk.BOTTOM, fill=tk.X)
+        standings_tree = ttk.Treeview(standings_frame, height=8, selectmode='none')
+        standings_scroll = ttk.Scrollbar(standings_frame, orient=tk.VERTICAL, command=standings_tree.yview)
+        standings_tree.configure(yscrollcommand=standings_scroll.set)
+        standings_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        standings_tree.pack(fill=tk.BOTH, expand=True)
+        self.leaderboard.attach(standings_tree, self.hallway_totals_label)
+        
         # Log frame - Event log
         log_frame = ttk.LabelFrame(self.main_container, text="Event Log", padding=10)
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -142,29 +314,11 @@ class LapTimeControl:
         self.log_text.config(state=tk.DISABLED)
         # Tag for error/wrong number entries
         self.log_text.tag_config('error', foreground='red')
-        
-        # Status bar
-        self.status_bar = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
-        self.status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        self.event_log.attach(self.log_text)
         
     def log_event(self, message, color=None):
-        """Log an event to the GUI log."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        
-        self.log_text.config(state=tk.NORMAL)
-        if color:
-            # Ensure tag exists; use provided color name as tag
-            try:
-                self.log_text.insert(tk.END, log_message, (color,))
-            except tk.TclError:
-                # Fallback: configure tag dynamically and insert
-                self.log_text.tag_config(color, foreground=color)
-                self.log_text.insert(tk.END, log_message, (color,))
-        else:
-            self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        """Log an event to the GUI log (drawn in batches, once per frame)."""
+        self.event_log.add(message, color)
         
     def load_runners(self):
         """Load runners from CSV file."""
@@ -175,30 +329,60 @@ class LapTimeControl:
         
         if not filename:
             return
-            
+        
+        # Parse off the UI thread; results come back through root.after
+        self.load_runners_button.config(state=tk.DISABLED)
+        self.roster_progress['value'] = 0
+        self.roster_progress.grid()
+        self.status_bar.config(text=f"Loading runners from {os.path.basename(filename)}...")
+        self.roster_thread = threading.Thread(target=self._load_roster_worker, args=(filename,),
+                                              name="roster-loader", daemon=True)
+        self.roster_thread.start()
+        
+    def _load_roster_worker(self, filename):
+        """Runs on the loader thread."""
         try:
-            self.runners = {}
-            with open(filename, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    race_number = row.get('number', '').strip()
-                    if race_number:
-                        self.runners[race_number] = {
-                            'number': race_number,
-                            'hallway': row.get('hallway', '').strip(),
-                            'gender': row.get('gender', '').strip(),
-                            'laps': 0
-                        }
-            
-            self.runners_file = filename
-            count = len(self.runners)
-            self.runners_label.config(text=f"{count} runners loaded")
-            self.log_event(f"Loaded {count} runners from {os.path.basename(filename)}")
-            self.status_bar.config(text=f"Loaded {count} runners")
-            
+            # Imported here (hashlib) to keep it out of the startup path
+            from roster import load_roster
+            roster = load_roster(filename, cache_dir=ROSTER_CACHE_DIR, progress=self._report_roster_progress)
+            bib_index = BibIndex(roster.runners)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load runners: {str(e)}")
-            self.log_event(f"ERROR: Failed to load runners: {str(e)}")
+            self.root.after(0, self._roster_failed, e)
+        else:
+            self.root.after(0, self._roster_loaded, filename, roster, bib_index)
+        
+    def _report_roster_progress(self, done, total):
+        """Called on the loader thread."""
+        self.root.after(0, self.roster_progress.config, {'value': 100 * done / total if total else 100})
+        
+    def _roster_failed(self, error):
+        self.load_runners_button.config(state=tk.NORMAL)
+        self.roster_progress.grid_remove()
+        self.status_bar.config(text="Failed to load runners")
+        messagebox.showerror("Error", f"Failed to load runners: {str(error)}")
+        self.log_event(f"ERROR: Failed to load runners: {str(error)}", color='error')
+        
+    def _roster_loaded(self, filename, roster, bib_index):
+        self.load_runners_button.config(state=tk.NORMAL)
+        self.roster_progress.grid_remove()
+        self.roster = roster
+        self.bib_index = bib_index
+        self.runners = self.engine.runners = roster.runners
+        self.runners_file = filename
+        count = len(self.runners)
+        self.runners_label.config(text=f"{count} runners loaded")
+        cached = " (cached)" if roster.from_cache else ""
+        self.log_event(f"Loaded {count} runners from {os.path.basename(filename)}{cached}: "
+                       + ", ".join(f"{len(numbers)} {hallway or 'no hallway'}"
+                                   for hallway, numbers in sorted(roster.by_hallway.items())))
+        self.status_bar.config(text=f"Loaded {count} runners")
+        if roster.errors:
+            # Every problem goes to the log; the dialog shows the first few
+            for line, problem in roster.errors:
+                self.log_event(f"WARNING: {os.path.basename(filename)} line {line}: {problem}", color='error')
+            messagebox.showwarning(
+                "Runners CSV problems",
+                f"{len(roster.errors)} rows were skipped:\n\n{roster.error_summary()}")
             
     def start_race(self):
         """Start the race."""
@@ -207,10 +391,10 @@ class LapTimeControl:
             return
             
         try:
-            self.total_laps = self.total_laps_var.get()
-            self.lap_length = self.lap_length_var.get()
+            total_laps = self.total_laps_var.get()
+            lap_length = self.lap_length_var.get()
             
-            if self.total_laps <= 0 or self.lap_length <= 0:
+            if total_laps <= 0 or lap_length <= 0:
                 messagebox.showerror("Error", "Total laps and lap length must be positive")
                 return
                 
@@ -218,184 +402,553 @@ class LapTimeControl:
             messagebox.showerror("Error", "Invalid lap configuration")
             return
             
-        # Create output file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.output_file = f"lap_times_{timestamp}.csv"
-        self.race_start_time = datetime.now()
-        self.race_start_timestamp = self.race_start_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        
-        # Initialize output file with new header: timestamp,race_number,hallway,gender,lap1..lapN,finish_time
-        header = ['timestamp', 'race_number', 'hallway', 'gender'] + \
-                 [f'lap{i}' for i in range(1, self.total_laps + 1)] + ['finish_time']
-        with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
+        # Clears all lap times and opens lap_times_<timestamp>.csv/.journal
+        self.engine.start(total_laps, lap_length)
+        self.leaderboard.reset(lap_length_km=self.engine.lap_length)
+        
+        self._begin_race()
+        self.log_event(f"Race started - {self.engine.total_laps} laps x {self.engine.lap_length} km")
+        self.log_event(f"Output file: {self.engine.output_file}")
+        self.log_event(f"Lap journal: {self.engine.journal_file}")
+        self.status_bar.config(text=f"Race active - Output: {self.engine.output_file}")
+        self.writer_status_text = self.status_bar.cget('text')
+        
+    def resume_race(self):
+        """Resume an interrupted race from its journal, CSV or backups."""
+        if self.race_active:
+            return
+        if not self.runners:
+            messagebox.showwarning("Warning", "Please load runners before resuming the race")
+            return
         
-        self.race_active = True
-        self.lap_times = []
-        self.backup_counter = 0
-        self.runner_laps = {}
+        source = find_latest_race(backup_dir=BACKUP_DIR)
+        if not source or not messagebox.askyesno("Resume Race", f"Resume race from {source}?"):
+            source = filedialog.askopenfilename(
+                title="Select Race to Resume",
+                filetypes=[("Lap journal", "*.journal"), ("CSV files", "*.csv"), ("All files", "*.*")]
+            )
+            if not source:
+                return
         
-        # Reset lap counts
-        for runner in self.runners.values():
-            runner['laps'] = 0
+        try:
+            race = load_race(source)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load race: {str(e)}")
+            self.log_event(f"ERROR: Failed to load race: {str(e)}", color='error')
+            return
+        if race.start_time is None or race.total_laps <= 0:
+            messagebox.showerror("Error", f"No race start time or lap count found in {source}")
+            return
+        
+        # Restores the lap times and keeps writing to the same race files
+        unknown = self.engine.resume(race, self.lap_length_var.get())
+        self.total_laps_var.set(self.engine.total_laps)
+        self.lap_length_var.set(self.engine.lap_length)
+        self.leaderboard.reset(self.runners.values(), self.engine.lap_length)
+        
+        self._begin_race()
+        self.log_event(f"Race resumed from {source} - {race.lap_count} laps recovered "
+                       f"for {len(race.runners)} runners")
+        if unknown:
+            self.log_event(f"WARNING: {unknown} recovered race numbers are not in the loaded runners",
+                           color='error')
+        self.log_event(f"Output file: {self.engine.output_file}")
+        self.status_bar.config(text=f"Race resumed - Output: {self.engine.output_file}")
+        self.writer_status_text = self.status_bar.cget('text')
+        
+    def _begin_race(self):
+        """Set up the UI for a race the engine has started."""
+        self.register_race_file()
+        
+        self.race_active = True
             
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
+        self.resume_button.config(state=tk.DISABLED)
         self.race_status_label.config(text="Race Status: ACTIVE", foreground="green")
         self.race_timer_label.config(text="Race Time: 00:00:00")
-        self.update_timer()
-        
-        self.log_event(f"Race started - {self.total_laps} laps x {self.lap_length} km")
-        self.log_event(f"Output file: {self.output_file}")
-        self.status_bar.config(text=f"Race active - Output: {self.output_file}")
+        self.timer_redraws = 0
+        self.timer_busy_ns = 0
+        self.schedule_timer(0)
+        self.root.after(WRITER_STATUS_MS, self.update_writer_status)
         
         # Focus on race number entry
         self.race_number_entry.focus()
         
+    def register_race_file(self):
+        """Index the race CSV so calculate_race_stats.py finds it without a directory scan."""
+        from race_archive import ARCHIVE_FILE, RaceArchive
+        try:
+            with RaceArchive(ARCHIVE_FILE) as archive:
+                archive.register(self.engine.output_file)
+        except Exception as e:
+            self.log_event(f"WARNING: Could not register race in archive: {str(e)}", color='error')
+
     def stop_race(self):
         """Stop the race."""
         if messagebox.askyesno("Confirm", "Are you sure you want to stop the race?"):
             self.race_active = False
             
-            self.start_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
             self.race_status_label.config(text="Race Status: Stopped", foreground="red")
             
-            # Create final backup
+            # Build the final CSV, create the final backup and wait for the writer
+            self.save_results_csv()
             self.create_backup()
+            output_file = self.engine.output_file
+            self.close_writer(lambda: self._race_stopped(output_file))
+
+    def _race_stopped(self, output_file):
+        """Finish stopping the race once the writer has saved everything."""
+        self.start_button.config(state=tk.NORMAL)
+        self.resume_button.config(state=tk.NORMAL)
+        self.log_event("Race stopped")
+        self.log_event(f"Race timer: {self.timer_redraws} redraws, "
+                       f"{self.timer_busy_ns / 1e6:.1f} ms main-loop time")
+        self.status_bar.config(text=f"Race stopped - Results saved to {output_file}")
             
-            self.log_event("Race stopped")
-            self.status_bar.config(text=f"Race stopped - Results saved to {self.output_file}")
-            
-    def record_lap_time(self):
-        """Record a lap time for a runner."""
+    def record_lap_time(self, captured_ns=None):
+        """Record a lap time for a runner, captured at captured_ns (default: now)."""
+        if captured_ns is None:
+            captured_ns = now_ns()
         if not self.race_active:
             messagebox.showwarning("Warning", "Race is not active")
             self.race_number_var.set("")
             return
             
+        if self.burst_mode_var.get():
+            self.record_burst(captured_ns)
+            self.metrics.observe('ui.record_lap', now_ns() - captured_ns)
+            return
+        
         race_number = self.race_number_var.get().strip()
         
         if not race_number:
             return
+        
+        # As a station, the aggregator validates and records the lap
+        if self.station_client is not None:
+            self.station_client.send_lap(race_number, captured_ns)
+            self.race_number_var.set("")
+            return
             
-        if race_number not in self.runners:
+        # Record lap elapsed time since race start; the engine hands it to the writer thread
+        result = self.engine.record(race_number, captured_ns=captured_ns)
+        if result.status == UNKNOWN:
             messagebox.showwarning("Warning", f"Race number {race_number} not found")
             self.log_event(f"WARNING: Unknown race number: {race_number}", color='error')
             self.race_number_var.set("")
             return
-            
-        runner = self.runners[race_number]
-        runner['laps'] += 1
-        
-        # Check if runner exceeded total laps
-        if runner['laps'] > self.total_laps:
-            messagebox.showwarning("Warning", 
-                                 f"Runner {race_number} has already completed all {self.total_laps} laps")
-            runner['laps'] = self.total_laps
+        if result.status != OK:
+            messagebox.showwarning("Warning", f"Runner {race_number}: {self.engine.problem_text(result)}")
             self.race_number_var.set("")
             return
             
-        # Record lap elapsed time since race start
-        now = datetime.now()
-        elapsed_str = self._format_elapsed(now - self.race_start_time)
-        self.runner_laps.setdefault(race_number, []).append(elapsed_str)
-        
-        # Track for backup cadence
-        self.lap_times.append({
-            'timestamp': now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            'race_number': race_number,
-            'lap_number': runner['laps']
-        })
-        
-        # Save entire CSV in new format
-        self.save_results_csv()
+        runner = result.runner
+        self.leaderboard.record(runner)
         
         # Update UI
-        finish_text = " - FINISHED!" if runner['laps'] == self.total_laps else ""
+        finish_text = " - FINISHED!" if runner.laps == self.engine.total_laps else ""
         self.runner_info_label.config(
-            text=f"Runner #{race_number} ({runner['hallway']}, {runner['gender']}) - "
-                 f"Lap {runner['laps']}/{self.total_laps} at {elapsed_str}{finish_text}"
+            text=f"Runner #{race_number} ({runner.hallway}, {runner.gender}) - "
+                 f"Lap {runner.laps}/{self.engine.total_laps} at {format_ms(result.elapsed_ms)}{finish_text}"
         )
         
-        self.log_event(f"Recorded: Runner #{race_number} - Lap {runner['laps']}/{self.total_laps}{finish_text}")
+        self.log_event(f"Recorded: Runner #{race_number} - Lap {runner.laps}/{self.engine.total_laps}{finish_text}")
         
         # Clear input
         self.race_number_var.set("")
-        
-        # Create backup every 10 laps
-        if len(self.lap_times) % 10 == 0:
-            self.create_backup()
+        self.metrics.observe('ui.record_lap', now_ns() - captured_ns)
             
-    def create_backup(self):
-        """Create a backup of the lap times file."""
-        if not self.output_file or not os.path.exists(self.output_file):
+    def check_race_number(self, captured_ns):
+        """Type-ahead: show whether the race number being typed can be a runner.
+        
+        Runs after every key press in the entry (in burst mode, on the number
+        after the last separator). With auto-commit, a race number that no
+        other one starts with is recorded straight away, timed at this key
+        press, if its runner can run another lap.
+        """
+        if self.bib_index is None or self.station_client is not None:
             return
+        text = self.race_number_var.get()
+        burst = self.burst_mode_var.get()
+        if burst:
+            text = BURST_SPLIT.split(text)[-1]
+        match = self.bib_index.match(text)
+        if match.status == EMPTY:
+            self._show_bib_feedback("")
+            return
+        if match.status == IMPOSSIBLE:
+            self._show_bib_feedback(f"#{match.prefix}: no runner has this number", 'red')
+            return
+        if match.status == AMBIGUOUS:
+            exact = f" - Enter records #{match.prefix}" if match.exact else ""
+            self._show_bib_feedback(f"#{match.prefix}...: {match.count} runners{exact}", 'orange')
+            return
+        runner = self.runners[match.bib]
+        who = f"#{match.bib} ({runner.hallway}, {runner.gender})"
+        if not match.exact:
+            self._show_bib_feedback(f"#{match.prefix}... can only be {who}", 'blue')
+            return
+        if not self.race_active:
+            self._show_bib_feedback(f"{who} - {runner.laps} laps", 'green')
+            return
+        status = self.engine.check(match.bib, self.engine.clock.elapsed_ms(captured_ns))
+        if status != OK:
+            problem = self.engine.problem_text(LapResult(status, match.bib, 0, runner.laps, runner))
+            self._show_bib_feedback(f"{who} - {problem}", 'red')
+        elif self.auto_commit_var.get() and not burst:
+            self.record_lap_time(captured_ns)
+            self._show_bib_feedback(f"{who} - lap {runner.laps}/{self.engine.total_laps} recorded (auto-commit)",
+                                    'green')
+        else:
+            self._show_bib_feedback(f"{who} - lap {runner.laps + 1}/{self.engine.total_laps}", 'green')
             
-        try:
-            backup_dir = "backups"
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            self.backup_counter += 1
-            backup_file = os.path.join(backup_dir, 
-                                      f"backup_{self.backup_counter}_{os.path.basename(self.output_file)}")
-            shutil.copy2(self.output_file, backup_file)
+    def _show_bib_feedback(self, text, color=None):
+        if (text, color) != self.bib_feedback:
+            self.bib_feedback = (text, color)
+            self.bib_feedback_label.config(text=text, foreground=color or '')
             
-            self.log_event(f"Backup created: {backup_file}")
+    def _stamp_burst_numbers(self, captured_ns):
+        """A separator key was pressed: time every race number typed or changed since the last one."""
+        if not self.burst_mode_var.get():
+            return
+        numbers = [n for n in BURST_SPLIT.split(self.race_number_var.get()) if n]
+        self.burst_stamps = list(zip(numbers, self._burst_times(numbers, captured_ns)))
+
+    def _burst_times(self, numbers, captured_ns):
+        """Capture time of each race number on the line.
+        
+        A number keeps the time it was stamped with only while its text is
+        unchanged, so editing or deleting an earlier number in the line can't
+        give a lap another runner's time. Other numbers are timed at captured_ns.
+        """
+        times = []
+        start = 0
+        for race_number in numbers:
+            for i in range(start, len(self.burst_stamps)):
+                if self.burst_stamps[i][0] == race_number:
+                    times.append(self.burst_stamps[i][1])
+                    start = i + 1
+                    break
+            else:
+                times.append(captured_ns)
+        return times
             
-        except Exception as e:
-            self.log_event(f"ERROR: Backup failed: {str(e)}")
+    def record_burst(self, captured_ns):
+        """Record every race number on the entry line at their own capture times."""
+        numbers = [n for n in BURST_SPLIT.split(self.race_number_var.get()) if n]
+        stamps = self._burst_times(numbers, captured_ns)
+        self.burst_stamps = []
+        self.race_number_var.set("")
+        if not numbers:
+            return
+        if self.station_client is not None:
+            for race_number, stamp in zip(numbers, stamps):
+                self.station_client.send_lap(race_number, stamp)
+            return
+        self.record_laps([(race_number, self.engine.clock.elapsed_ms(stamp))
+                          for race_number, stamp in zip(numbers, stamps)], captured_ns)
+        
+    def record_laps(self, entries, captured_ns=None):
+        """Validate a batch of (race_number, elapsed_ms) and record the valid ones.
+        
+        The valid laps go to the writer as one batch; problems are added to the
+        problems list instead of interrupting the operator. Returns the number
+        of problems.
+        """
+        results = self.engine.record_many(entries, captured_ns=captured_ns)
+        recorded = [result for result in results if result.status == OK]
+        problems = [result for result in results if result.status != OK]
+        for result in recorded:
+            self.leaderboard.record(result.runner)
+        
+        if recorded:
+            last = recorded[-1]
+            finish_text = " - FINISHED!" if last.lap == self.engine.total_laps else ""
+            self.runner_info_label.config(
+                text=f"Runner #{last.race_number} ({last.runner.hallway}, {last.runner.gender}) - "
+                     f"Lap {last.lap}/{self.engine.total_laps} at {format_ms(last.elapsed_ms)}{finish_text}"
+            )
+            self.log_event(f"Recorded {len(recorded)} laps: " + ", ".join(
+                f"#{result.race_number} {result.lap}/{self.engine.total_laps}" for result in recorded))
+        for result in problems:
+            self.add_entry_problem(result.elapsed_ms, result.race_number, self.engine.problem_text(result))
+        return len(problems)
+        
+    def add_entry_problem(self, elapsed_ms, race_number, problem):
+        self.entry_problems.append((elapsed_ms, race_number, problem))
+        self.problems_list.insert(tk.END, f"{format_ms(elapsed_ms)}  #{race_number}: {problem}")
+        self.problems_list.see(tk.END)
+        self.log_event(f"WARNING: Runner #{race_number} at {format_ms(elapsed_ms)}: {problem}", color='error')
+        
+    def _selected_entry_problem(self):
+        selection = self.problems_list.curselection()
+        return selection[0] if selection else None
+        
+    def correct_entry_problem(self):
+        """Record the selected problem's lap time for the race number in the entry field."""
+        index = self._selected_entry_problem()
+        race_number = self.race_number_var.get().strip()
+        if index is None or not race_number or not self.race_active or self.station_client is not None:
+            self.status_bar.config(text="Select a problem and type the correct race number first")
+            return
+        elapsed_ms, original, _ = self.entry_problems[index]
+        self.race_number_var.set("")
+        self.burst_stamps.clear()
+        if self.record_laps([(race_number, elapsed_ms)]) == 0:
+            self.log_event(f"Corrected: #{original} at {format_ms(elapsed_ms)} recorded as #{race_number}")
+            self.dismiss_entry_problem(index)
+        
+    def dismiss_entry_problem(self, index=None):
+        if index is None:
+            index = self._selected_entry_problem()
+            if index is None:
+                return
+        del self.entry_problems[index]
+        self.problems_list.delete(index)
+        
+    def create_backup(self):
+        """Create a backup of the lap times file."""
+        self.engine.backup()
 
-    def _format_elapsed(self, delta):
-        """Format a timedelta as HH:MM:SS.mmm"""
-        total_ms = int(delta.total_seconds() * 1000)
-        hours = total_ms // (3600 * 1000)
-        minutes = (total_ms // (60 * 1000)) % 60
-        seconds = (total_ms // 1000) % 60
-        ms = total_ms % 1000
-        return f"{hours:02}:{minutes:02}:{seconds:02}.{ms:03}"
+    def close_writer(self, then=None):
+        """Flush all pending writes, stop the writer thread and call then() once it is done.
 
-    def update_timer(self):
-        """Update race timer label while race is active."""
-        if self.race_active and self.race_start_time:
-            now = datetime.now()
-            elapsed_str = self._format_elapsed(now - self.race_start_time)
-            self.race_timer_label.config(text=f"Race Time: {elapsed_str}")
-            # Refresh ~10 times per second
-            self.root.after(100, self.update_timer)
+        The Tk loop keeps running meanwhile: joining the writer here would block
+        it, and the writer's messages would wait for it.
+        """
+        writer = self.engine.writer
+        if writer is not None and self.engine.pending:
+            self.status_bar.config(text=f"Saving {self.engine.pending} pending writes...")
+        self.engine.close(timeout=0)
+        self._wait_for_writer(writer, then)
 
-    def save_results_csv(self):
-        """Rewrite the CSV with header and per-runner lap columns."""
-        if not self.output_file:
+    def _wait_for_writer(self, writer, then):
+        if writer is not None and writer.running:
+            self.root.after(WRITER_POLL_MS, self._wait_for_writer, writer, then)
             return
-        header = (
-            ['timestamp', 'race_number', 'hallway', 'gender'] +
-            [f'lap{i}' for i in range(1, self.total_laps + 1)] + ['finish_time']
-        )
+        self.log_writer_messages()
+        if then is not None:
+            then()
+
+    def on_close(self):
+        """Flush output files before the window closes."""
+        if self.closing:
+            return
+        if self.race_active and self.station_client is None and not messagebox.askyesno(
+                "Confirm", "The race is still active. Quit anyway?"):
+            return
+        self.race_active = False
+        self.closing = True
+        self.close_writer(self._destroy)
+
+    def _destroy(self):
+        """Close everything else and the window, after the writer has stopped."""
+        if self.station_client is not None:
+            self.station_client.close()
+        if self.metrics_file is not None:
+            self.metrics_file.close()
+        self.event_log.flush()
+        self.root.destroy()
+
+    def connect_to_aggregator(self, host, port, station):
+        """Run as a capture station: laps are sent to a lap_aggregator.py server."""
+        self.start_button.config(state=tk.DISABLED)
+        self.resume_button.config(state=tk.DISABLED)
+        from lap_aggregator import AggregatorClient
         try:
-            with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(header)
-                for race_number, laps in self.runner_laps.items():
-                    runner = self.runners.get(race_number, {})
-                    hallway = runner.get('hallway', '')
-                    gender = runner.get('gender', '')
-                    row = [self.race_start_timestamp, race_number, hallway, gender]
-                    # Add lap columns padded to total_laps
-                    lap_cols = laps[:self.total_laps] + [''] * max(0, self.total_laps - len(laps))
-                    row.extend(lap_cols)
-                    finish_time = laps[self.total_laps - 1] if len(laps) >= self.total_laps else ''
-                    row.append(finish_time)
-                    writer.writerow(row)
-        except Exception as e:
-            self.log_event(f"ERROR: Failed to save CSV: {str(e)}")
+            self.station_client = AggregatorClient(
+                host, port, station,
+                on_message=lambda message: self.root.after(0, self._on_aggregator_message, message))
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not connect to aggregator at {host}:{port}: {str(e)}")
+            self.log_event(f"ERROR: Could not connect to aggregator at {host}:{port}: {str(e)}", color='error')
+            return
+        self.log_event(f"Station {station} connected to aggregator at {host}:{port}")
+        self.status_bar.config(text=f"Station {station} - aggregator {host}:{port}")
+
+    def _on_aggregator_message(self, message):
+        """Handle a message from the aggregator (on the Tk loop)."""
+        kind = message.get('type')
+        if kind == 'welcome':
+            # The aggregator replays all recorded laps next
+            self.engine.follow(message['start'], message['total_laps'], message['lap_length'])
+            self.total_laps_var.set(self.engine.total_laps)
+            self.lap_length_var.set(self.engine.lap_length)
+            self.leaderboard.reset(lap_length_km=self.engine.lap_length)
+            self.race_active = True
+            self.race_status_label.config(text="Race Status: ACTIVE (station)", foreground="green")
+            self.schedule_timer(0)
+            self.race_number_entry.focus()
+        elif kind == 'recorded':
+            runner = self.runners.get(message['bib'])
+            if runner is not None and runner.laps >= message['lap']:
+                return
+            runner = add_lap(self.runners, message['bib'], message['elapsed_ms'],
+                             message.get('hallway', ''), message.get('gender', ''))
+            self.leaderboard.record(runner)
+        elif kind == 'ack':
+            race_number = message.get('bib')
+            status = message['status']
+            if status == 'ok':
+                finish_text = " - FINISHED!" if message['lap'] == self.engine.total_laps else ""
+                self.runner_info_label.config(
+                    text=f"Runner #{race_number} - Lap {message['lap']}/{self.engine.total_laps} "
+                         f"at {format_ms(message['elapsed_ms'])}{finish_text}")
+                self.log_event(f"Recorded: Runner #{race_number} - Lap {message['lap']}/{self.engine.total_laps}{finish_text}")
+            elif status == 'duplicate':
+                self.log_event(f"WARNING: Runner #{race_number} was just recorded - ignored duplicate", color='error')
+            elif status == 'limit':
+                self.log_event(f"WARNING: Runner {race_number} has already completed all {self.engine.total_laps} laps",
+                               color='error')
+            elif status == 'unknown':
+                self.log_event(f"WARNING: Unknown race number: {race_number}", color='error')
+            else:
+                self.log_event(f"WARNING: Aggregator rejected {race_number}: {status} {message.get('message', '')}",
+                               color='error')
+        elif kind == 'closed':
+            self.race_active = False
+            self.race_status_label.config(text="Race Status: Disconnected", foreground="red")
+            self.log_event("ERROR: Connection to the aggregator was lost", color='error')
+
+    def _report_from_writer(self, message, color=None):
+        """Called on the writer thread; poll_writer_messages logs the message on the Tk loop."""
+        self.writer_messages.put((message, color))
+
+    def poll_writer_messages(self):
+        """Log the writer's messages, every WRITER_POLL_MS."""
+        self.log_writer_messages()
+        self.root.after(WRITER_POLL_MS, self.poll_writer_messages)
+
+    def log_writer_messages(self):
+        while True:
+            try:
+                message, color = self.writer_messages.get_nowait()
+            except queue.Empty:
+                return
+            self.log_event(message, color)
+
+    def update_writer_status(self):
+        """Show writer backlog in the status bar while the race is active."""
+        if not self.race_active or not self.engine.writer:
+            return
+        pending = self.engine.writer.pending
+        if pending:
+            text = f"{self.writer_status_text} - Writing: {pending}/{self.engine.writer.max_pending} pending"
+        else:
+            text = self.writer_status_text
+        if self.status_bar.cget('text') != text:
+            self.status_bar.config(text=text)
+        self.root.after(WRITER_STATUS_MS, self.update_writer_status)
+
+    def schedule_timer(self, delay_ms):
+        """(Re)schedule the next race timer redraw."""
+        if self.timer_after_id is not None:
+            self.root.after_cancel(self.timer_after_id)
+            self.timer_after_id = None
+        if self.race_active and not self.timer_paused:
+            self.timer_due_ns = now_ns() + delay_ms * 1_000_000
+            self.timer_after_id = self.root.after(delay_ms, self.update_timer)
+
+    def update_timer(self):
+        """Update race timer label while race is active.
+
+        Redraws are lined up with the next change of the visible text at the
+        selected resolution, and the label is only touched if the text changed.
+        """
+        self.timer_after_id = None
+        if not (self.race_active and self.engine.clock.running) or self.timer_paused:
+            return
+        t0 = now_ns()
+        # How late the Tk loop ran us: the event-loop lag the operator would feel
+        self.metrics.observe('ui.timer_lag', t0 - self.timer_due_ns)
+        resolution_ms = DISPLAY_RESOLUTIONS.get(self.timer_resolution_var.get(), 1000)
+        elapsed_ms = self.engine.clock.elapsed_ms(t0)
+        text = f"Race Time: {format_clock(elapsed_ms, resolution_ms)}"
+        if text != self.timer_text:
+            self.timer_text = text
+            self.race_timer_label.config(text=text)
+            self.timer_redraws += 1
+        # +1 ms so we wake just after the tick rather than just before it
+        self.schedule_timer(ms_until_next_tick(elapsed_ms, resolution_ms) + 1)
+        busy_ns = now_ns() - t0
+        self.timer_busy_ns += busy_ns
+        self.metrics.observe('ui.timer_redraw', busy_ns)
+
+    def toggle_diagnostics(self):
+        """Show or hide the diagnostics pane; it is only refreshed while shown."""
+        if self.diagnostics_var.get():
+            if self.diagnostics_frame is None:
+                self.diagnostics_frame = ttk.LabelFrame(self.main_container, text="Diagnostics", padding=10)
+                self.diagnostics_label = ttk.Label(self.diagnostics_frame, text="", font=('Courier', 10),
+                                                   justify=tk.LEFT, anchor=tk.W)
+                self.diagnostics_label.pack(fill=tk.X)
+            self.diagnostics_frame.pack(fill=tk.X, padx=10, pady=5, before=self.standings_frame)
+            self.update_diagnostics()
+        else:
+            if self.diagnostics_after_id is not None:
+                self.root.after_cancel(self.diagnostics_after_id)
+                self.diagnostics_after_id = None
+            self.diagnostics_frame.pack_forget()
+
+    def update_diagnostics(self):
+        """Redraw the diagnostics pane from the current metrics."""
+        self.diagnostics_after_id = None
+        if not self.diagnostics_var.get():
+            return
+        # Scheduled first, so a failed redraw doesn't stop the refreshes
+        self.diagnostics_after_id = self.root.after(DIAGNOSTICS_MS, self.update_diagnostics)
+        lines = self.metrics.format_lines()
+        lines.append(f"{'writer queue':24} {self.engine.pending:8d} / {self.engine.max_pending}")
+        if self.engine.counts:
+            lines.append(f"{'laps by status':24} " + ", ".join(
+                f"{status} {count}" for status, count in sorted(self.engine.counts.items())))
+        if self.metrics_file is not None and self.metrics_file.error:
+            lines.append(f"metrics file: {self.metrics_file.error}")
+        text = "\n".join(lines)
+        if self.diagnostics_label.cget('text') != text:
+            self.diagnostics_label.config(text=text)
+
+    def _metrics_extra(self):
+        """Race state added to each METRICS_FILE snapshot (called on the metrics thread)."""
+        writer = self.engine.writer
+        return {
+            'race': self.engine.race_name,
+            'writer_pending': writer.pending if writer else 0,
+            'laps_by_status': dict(self.engine.counts),
+        }
+
+    def _on_unmap(self, event):
+        if event.widget is self.root:
+            self.timer_paused = True
+            self.schedule_timer(0)
+
+    def _on_map(self, event):
+        if event.widget is self.root and self.timer_paused:
+            self.timer_paused = False
+            self.schedule_timer(0)
+
+    def save_results_csv(self):
+        """Ask the writer to rebuild the CSV with header and per-runner lap columns."""
+        self.engine.save_csv()
 
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Nybrogård Half Marathon Lap Time Control")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="Run as a capture station of a lap_aggregator.py server")
+    parser.add_argument("--station", default="gui", help="Station name shown by the aggregator")
+    args = parser.parse_args()
+    aggregator = None
+    if args.connect:
+        # Only stations need the networking code (asyncio)
+        from lap_aggregator import parse_address
+        aggregator = (*parse_address(args.connect), args.station)
+    
     root = tk.Tk()
-    app = LapTimeControl(root)
+    app = LapTimeControl(root, aggregator)
     root.mainloop()
 
 
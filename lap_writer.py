@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Background Lap Writer
+
+A worker thread that owns the lap journal, the wide lap_times CSV and the
+backups, so the GUI never waits on the disk. The GUI only puts small work
+items on a bounded queue; the worker drains everything that is pending,
+writes all queued laps with a single flush, and rebuilds the CSV at most
+once per csv_interval (or when explicitly asked).
+
+Backups are either incremental (a SegmentBackup storing only the laps added
+since the previous backup) or, without one, full copies of the CSV taken
+every backup_every_laps laps.
+
+If columns_file is set, the race is also exported as a binary .lapcol file
+(race_columns.py) when the writer stops.
+
+With a metrics.Metrics, the worker records how long each lap took from
+capture (the keypress) to being written to the journal, the time spent on
+journal writes, CSV rebuilds and backups, and the bytes written.
+"""
+
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lap_backup import SegmentBackup
+from lap_journal import LapJournal, write_results_csv
+from metrics import Metrics
+from race_clock import now_ns
+from race_columns import runner_rows, write_columns
+from race_store import Runner, add_lap, iter_records, results_rows
+
+
+_LAP = 'lap'
+_LAPS = 'laps'
+_SAVE_CSV = 'save_csv'
+_BACKUP = 'backup'
+_STOP = 'stop'
+
+
+class LapWriter:
+    """Owns all race output files and writes them on a worker thread.
+
+    report(message, color) is called from the worker thread for log messages
+    and errors; the GUI is expected to marshal it onto the Tk loop.
+    """
+
+    def __init__(self, journal_path: str, output_file: str, meta: dict,
+                 report: Optional[Callable[[str, Optional[str]], None]] = None,
+                 max_pending: int = 10000, csv_interval: float = 5.0,
+                 fsync_interval: Optional[float] = 1.0, backup_dir: str = 'backups',
+                 segment_backup: Optional[SegmentBackup] = None, backup_every_laps: int = 10,
+                 initial_runners: Optional[Dict[str, Runner]] = None,
+                 columns_file: Optional[str] = None, metrics: Optional[Metrics] = None):
+        self.journal_path = journal_path
+        self.output_file = output_file
+        self.columns_file = columns_file
+        self.meta = meta
+        self.report = report or (lambda message, color=None: None)
+        self.max_pending = max_pending
+        self.csv_interval = csv_interval
+        self.backup_dir = backup_dir
+        self.backup_counter = 0
+        self.segment_backup = segment_backup
+        self.backup_every_laps = backup_every_laps
+        self.metrics = metrics
+        self._laps_since_backup = 0
+
+        # Worker-owned copy of the recorded laps, used to rebuild the CSV
+        self._runners: Dict[str, Runner] = {
+            r.number: Runner(r.number, r.hallway, r.gender, r.lap_ms)
+            for r in (initial_runners or {}).values()
+        }
+        self._dirty = bool(self._runners)
+        self._last_csv = time.monotonic()
+        self._queue: 'queue.Queue[Tuple]' = queue.Queue(maxsize=max_pending)
+        self._journal = LapJournal(journal_path, meta=meta, fsync_interval=fsync_interval)
+        if self._runners and self._journal.created:
+            # Resuming from a CSV or backup: the journal must hold the recovered laps too
+            self._journal.extend(iter_records(self._runners.values()))
+        self._journal_size = self._journal.size
+        if self._runners and segment_backup:
+            # Backups may be older than the recovered state: back up only the missing laps
+            stored = segment_backup.stored()
+            segment_backup.add([r for r in iter_records(self._runners.values()) if (r[0], r[1]) not in stored])
+        self._thread = threading.Thread(target=self._run, name='LapWriter', daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    # -- Producer side (GUI thread) -------------------------------------
+
+    def submit(self, race_number: str, lap: int, elapsed_ms: int, hallway: str = '', gender: str = '',
+               captured_ns: Optional[int] = None):
+        """Queue one lap. Blocks only if the queue is full (backpressure).
+
+        captured_ns is when the lap was captured (race_clock.now_ns(),
+        default: now), for the capture-to-journal latency metric.
+        """
+        self._put((_LAP, (race_number, lap, elapsed_ms, hallway, gender), captured_ns or now_ns()))
+
+    def submit_many(self, records: List[Tuple[str, int, int, str, str]], captured_ns: Optional[int] = None):
+        """Queue a batch of laps (race_number, lap, elapsed_ms, hallway, gender) as one item."""
+        if records:
+            self._put((_LAPS, list(records), captured_ns or now_ns()))
+
+    def save_csv(self):
+        """Ask the worker to rebuild the lap times CSV."""
+        self._put((_SAVE_CSV, None, 0))
+
+    def backup(self):
+        """Ask the worker to write a backup now, regardless of cadence."""
+        self._put((_BACKUP, None, 0))
+
+    def _put(self, item):
+        # Raises instead of waiting forever on a full queue nobody drains
+        while True:
+            if not self._thread.is_alive():
+                raise RuntimeError("the lap writer thread has stopped; laps are not being saved")
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    @property
+    def pending(self) -> int:
+        """Number of work items waiting for the worker."""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker thread is still writing."""
+        return self._thread.is_alive()
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush everything still queued and stop the worker.
+
+        Waits at most timeout seconds (None: until the worker is done; 0:
+        not at all, poll running instead). A caller whose report needs the
+        calling thread, like the Tk loop, must not wait here.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._put((_STOP, None, 0))
+        except RuntimeError:
+            self._close_journal()
+            return
+        self._thread.join(timeout)
+
+    # -- Worker side ----------------------------------------------------
+
+    def _run(self):
+        running = True
+        while running:
+            timeout = max(0.0, self.csv_interval - (time.monotonic() - self._last_csv))
+            if self.segment_backup:
+                backup_wait = self.segment_backup.seconds_until_due()
+                if backup_wait is not None:
+                    timeout = min(timeout, backup_wait)
+            try:
+                items = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                items = []
+            # Coalesce everything that piled up while we were writing
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            laps = []
+            captured = []  # (captured_ns, laps) per lap item, for metrics
+            save_csv = backup = False
+            for kind, payload, captured_ns in items:
+                if kind == _LAP:
+                    laps.append(payload)
+                    captured.append((captured_ns, 1))
+                elif kind == _LAPS:
+                    laps.extend(payload)
+                    captured.append((captured_ns, len(payload)))
+                elif kind == _SAVE_CSV:
+                    save_csv = True
+                elif kind == _BACKUP:
+                    backup = True
+                elif kind == _STOP:
+                    running = False
+                    save_csv = True
+
+            # The worker must outlive any error (a dead worker never closes the journal),
+            # and a failure with the laps must not cost the CSV or the backup
+            try:
+                if laps:
+                    self._write_laps(laps, captured)
+            except Exception as e:
+                self.report(f"ERROR: Failed to record laps: {str(e)}", 'error')
+            try:
+                self._write_files(save_csv, backup)
+            except Exception as e:
+                self.report(f"ERROR: Lap writer: {str(e)}", 'error')
+
+        if self.columns_file:
+            self._write_columns()
+        self._close_journal()
+
+    def _write_files(self, save_csv: bool, backup: bool):
+        if self.segment_backup:
+            if backup or self.segment_backup.due():
+                self._write_segment()
+        elif self.backup_every_laps and self._laps_since_backup >= self.backup_every_laps:
+            backup = True
+        if save_csv or (backup and not self.segment_backup) or \
+                (self._dirty and time.monotonic() - self._last_csv >= self.csv_interval):
+            self._write_csv()
+        if backup and not self.segment_backup:
+            self._write_backup()
+
+    def _close_journal(self):
+        try:
+            self._journal.close()
+        except Exception as e:
+            self.report(f"ERROR: Failed to close lap journal: {str(e)}", 'error')
+
+    def _write_laps(self, laps, captured):
+        # Journal first: it is what a crash recovers from
+        try:
+            if self.metrics:
+                with self.metrics.timer('writer.journal'):
+                    self._journal.extend(laps)
+                size = self._journal.size
+                self.metrics.count('bytes.journal', size - self._journal_size)
+                self.metrics.count('laps.saved', len(laps))
+                self._journal_size = size
+            else:
+                self._journal.extend(laps)
+        except Exception as e:
+            self.report(f"ERROR: Failed to write lap journal: {str(e)}", 'error')
+        self._dirty = True
+        self._laps_since_backup += len(laps)
+        for race_number, lap, elapsed_ms, hallway, gender in laps:
+            add_lap(self._runners, race_number, elapsed_ms, hallway, gender)
+        if self.segment_backup:
+            self.segment_backup.add(laps)
+        if self.metrics:
+            saved_ns = now_ns()
+            saved = self.metrics.histogram('lap.capture_to_saved')
+            for captured_ns, n in captured:
+                saved.add(saved_ns - captured_ns, n)
+
+    def _write_csv(self):
+        self._last_csv = time.monotonic()
+        if not self._dirty and os.path.exists(self.output_file):
+            return
+        try:
+            t0 = now_ns()
+            write_results_csv(self.output_file, self.meta.get('start', ''),
+                              int(self.meta.get('total_laps', 0)),
+                              results_rows(self._runners.values()))
+            self._dirty = False
+            if self.metrics:
+                self.metrics.observe('writer.csv', now_ns() - t0)
+                self.metrics.count('bytes.csv', os.path.getsize(self.output_file))
+        except Exception as e:
+            self.report(f"ERROR: Failed to save CSV: {str(e)}", 'error')
+
+    def _write_columns(self):
+        try:
+            total_laps = int(self.meta.get('total_laps', 0))
+            write_columns(self.columns_file, self.meta, runner_rows(self._runners.values(), total_laps))
+        except Exception as e:
+            self.report(f"ERROR: Failed to export {self.columns_file}: {str(e)}", 'error')
+
+    def _write_segment(self):
+        try:
+            t0 = now_ns()
+            path = self.segment_backup.write()
+            self._laps_since_backup = 0
+            if path and self.metrics:
+                self.metrics.observe('writer.backup', now_ns() - t0)
+                self.metrics.count('bytes.backup', os.path.getsize(path))
+            if path:
+                self.report(f"Backup created: {path}", None)
+        except Exception as e:
+            self.report(f"ERROR: Backup failed: {str(e)}", 'error')
+
+    def _write_backup(self):
+        self._laps_since_backup = 0
+        if not os.path.exists(self.output_file):
+            return
+        try:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            self.backup_counter += 1
+            backup_file = os.path.join(self.backup_dir,
+                                       f"backup_{self.backup_counter}_{os.path.basename(self.output_file)}")
+            t0 = now_ns()
+            shutil.copy2(self.output_file, backup_file)
+            if self.metrics:
+                self.metrics.observe('writer.backup', now_ns() - t0)
+                self.metrics.count('bytes.backup', os.path.getsize(backup_file))
+            self.report(f"Backup created: {backup_file}", None)
+        except Exception as e:
+            self.report(f"ERROR: Backup failed: {str(e)}", 'error')
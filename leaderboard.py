@@ -0,0 +1,138 @@
+"""
+Live Leaderboard
+
+Draws standings.Standings into a ttk.Treeview (one row per runner with laps,
+in race order) and the hallway distance totals into a label. Laps mark a
+range of positions as dirty; once per frame the rows in that range are
+recomputed and only the rows whose values changed are moved or redrawn.
+
+The standings are kept without a Treeview too; everything is drawn once
+attach() gives it one.
+"""
+
+import tkinter as tk
+from typing import Dict, Optional, Tuple
+
+from standings import Standings, last_split_ms
+from timecodec import format_ms
+
+# (column id, heading, width)
+COLUMNS = (
+    ('pos', 'Pos', 45),
+    ('number', 'Bib', 60),
+    ('hallway', 'Hallway', 150),
+    ('gender', 'Gender', 60),
+    ('gender_pos', 'Gender Pos', 80),
+    ('laps', 'Laps', 50),
+    ('split', 'Last Split', 100),
+    ('time', 'Race Time', 100),
+)
+
+
+class LeaderboardView:
+    """Incrementally redrawn Treeview of the live standings."""
+
+    def __init__(self, root, tree=None, hallway_label=None, flush_ms=100):
+        self.root = root
+        self.tree = None
+        self.hallway_label = None
+        self.flush_ms = flush_ms
+        self.standings = Standings()
+        self.lap_length_km = 0.0
+        self._drawn: Dict[str, Tuple] = {}  # race number -> values shown
+        self._moved = set()
+        self._dirty: Optional[Tuple[int, int]] = None  # (first, last) index in standings.order
+        self._flush_scheduled = False
+        self.rows_redrawn = 0
+        if tree is not None:
+            self.attach(tree, hallway_label)
+
+    def attach(self, tree, hallway_label=None):
+        """Draw into tree (and hallway_label) from now on, starting with all rows."""
+        self.tree = tree
+        self.hallway_label = hallway_label
+        tree['columns'] = [c for c, _, _ in COLUMNS]
+        tree['show'] = 'headings'
+        for column, heading, width in COLUMNS:
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column == 'hallway' else tk.CENTER)
+        self._drawn.clear()
+        self._moved.clear()
+        self._mark(0, len(self.standings) - 1)
+
+    def reset(self, runners=(), lap_length_km=None):
+        """Rank runners from scratch and redraw everything on the next frame."""
+        if lap_length_km is not None:
+            self.lap_length_km = lap_length_km
+        self.standings.rebuild(runners)
+        children = self.tree.get_children() if self.tree is not None else ()
+        if children:
+            self.tree.delete(*children)
+        self._drawn.clear()
+        self._moved.clear()
+        self._mark(0, len(self.standings) - 1)
+
+    def record(self, runner):
+        """Re-rank runner after a lap was appended to it."""
+        old_index, new_index = self.standings.record(runner)
+        if new_index is None:
+            return
+        # Laps only move a runner up; everyone between its old and new
+        # position (or below it, for a new row) shifts down by one.
+        if old_index is None:
+            self._mark(new_index, len(self.standings) - 1)
+        else:
+            self._mark(new_index, old_index)
+        if old_index != new_index:
+            self._moved.add(runner.number)
+
+    def _mark(self, first, last):
+        if last >= first:
+            if self._dirty is None:
+                self._dirty = (first, last)
+            else:
+                self._dirty = (min(first, self._dirty[0]), max(last, self._dirty[1]))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after(self.flush_ms, self.flush)
+
+    def flush(self):
+        """Redraw the dirty range, touching only rows whose values changed."""
+        self._flush_scheduled = False
+        standings = self.standings
+        if self.tree is None:
+            return
+        if self._dirty is not None:
+            first, last = self._dirty
+            self._dirty = None
+            tree = self.tree
+            drawn = self._drawn
+            moved = self._moved
+            order = standings.order
+            runners = standings.runners
+            # Ascending order keeps every row above the current index in place
+            for index in range(first, min(last, len(order) - 1) + 1):
+                number = order[index][2]
+                runner = runners[number]
+                values = (index + 1, number, runner.hallway, runner.gender,
+                          standings.gender_position(number), runner.laps,
+                          format_ms(last_split_ms(runner)), format_ms(runner.last_lap_ms))
+                shown = drawn.get(number)
+                if shown is None:
+                    tree.insert('', index, iid=number, values=values)
+                elif values != shown:
+                    if number in moved:
+                        tree.move(number, '', index)
+                    tree.item(number, values=values)
+                else:
+                    continue
+                drawn[number] = values
+                self.rows_redrawn += 1
+            moved.clear()
+
+        if self.hallway_label is not None:
+            distances = standings.distance_by_hallway(self.lap_length_km)
+            text = "   ".join(f"{hallway or 'Unknown'}: {km:.1f} km"
+                               for hallway, km in sorted(distances.items())) or "No laps yet"
+            if self.hallway_label.cget('text') != text:
+                self.hallway_label.config(text=text)
@@ -0,0 +1,200 @@
+"""
+Race Metrics
+
+Low-overhead counters and latency histograms for the hot paths of a race:
+lap entry to journal, CSV rebuilds, backups, bytes written and how late the
+Tk event loop runs scheduled callbacks. Recording a sample is a
+bit_length(), a shift and a list increment; nothing is allocated and no lock
+is taken.
+
+Histograms use log-linear buckets (4 per power of two), so percentiles are
+accurate to within 25% over the whole 64-bit range in 256 buckets.
+Each metric should be recorded from one thread; snapshots may be taken from
+any thread and are at worst one sample out of date. A snapshot iterates over
+copies of the metric tables, since another thread may add a metric meanwhile.
+
+A MetricsFile thread writes snapshots as JSON to a file at a fixed interval
+(atomically: temporary file, then rename).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from race_clock import now_ns
+
+
+_SUB_BITS = 2  # 2**_SUB_BITS buckets per power of two
+_BUCKETS = 64 << _SUB_BITS
+
+
+def _bucket(ns: int) -> int:
+    shift = ns.bit_length() - _SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return (shift << _SUB_BITS) + (ns >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    """Largest value that falls into bucket index."""
+    shift = (index >> _SUB_BITS) - 1
+    if shift <= 0:
+        return index
+    mantissa = index - (shift << _SUB_BITS)
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """Latency histogram in nanoseconds."""
+
+    __slots__ = ('buckets', 'count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.buckets = [0] * _BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns: int, n: int = 1):
+        """Add n samples of ns nanoseconds."""
+        if ns < 0:
+            ns = 0
+        self.buckets[_bucket(ns)] += n
+        self.count += n
+        self.total_ns += ns * n
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, fraction: float) -> int:
+        """Upper bound of the bucket holding the given fraction of samples (0 if empty)."""
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * fraction + 0.5))
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max_ns)
+        return self.max_ns
+
+    def summary(self) -> dict:
+        """count and mean/p50/p90/p99/max in milliseconds."""
+        count = self.count
+        return {
+            'count': count,
+            'mean_ms': round(self.total_ns / count / 1e6, 3) if count else 0.0,
+            'p50_ms': round(self.percentile(0.50) / 1e6, 3),
+            'p90_ms': round(self.percentile(0.90) / 1e6, 3),
+            'p99_ms': round(self.percentile(0.99) / 1e6, 3),
+            'max_ms': round(self.max_ns / 1e6, 3),
+        }
+
+
+class _Timer:
+    __slots__ = ('histogram', 't0')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.t0 = now_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.add(now_ns() - self.t0)
+        return False
+
+
+class Metrics:
+    """Named counters and latency histograms, created on first use."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.started_ns = now_ns()
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def observe(self, name: str, ns: int, n: int = 1):
+        """Record a duration (or lateness) of ns nanoseconds, n times."""
+        self.histogram(name).add(ns, n)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timer(self, name: str) -> _Timer:
+        """Context manager recording the duration of its block: with metrics.timer('csv'): ..."""
+        return _Timer(self.histogram(name))
+
+    def snapshot(self) -> dict:
+        return {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'uptime_s': round((now_ns() - self.started_ns) / 1e9, 1),
+            'counters': dict(sorted(list(self.counters.items()))),
+            'latency': {name: h.summary() for name, h in sorted(list(self.histograms.items()))},
+        }
+
+    def format_lines(self) -> List[str]:
+        """Human-readable snapshot, one metric per line."""
+        snapshot = self.snapshot()
+        lines = [f"{'latency (ms)':24} {'count':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"]
+        for name, s in snapshot['latency'].items():
+            lines.append(f"{name:24} {s['count']:8d} {s['p50_ms']:8.2f} {s['p90_ms']:8.2f} "
+                         f"{s['p99_ms']:8.2f} {s['max_ms']:8.2f}")
+        for name, value in snapshot['counters'].items():
+            if name.startswith('bytes.'):
+                lines.append(f"{name:24} {value / 1e3:8.1f} kB")
+            else:
+                lines.append(f"{name:24} {value:8d}")
+        return lines
+
+    def write(self, path: str, extra: Optional[dict] = None):
+        """Write a JSON snapshot (plus extra top-level fields) atomically."""
+        snapshot = self.snapshot()
+        if extra:
+            snapshot.update(extra)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(tmp_path, path)
+
+
+class MetricsFile:
+    """Writes metrics snapshots to path every interval seconds on a daemon thread.
+
+    extra(), if given, is called on the writer thread for additional fields
+    (e.g. queue depth); it must not touch Tk widgets.
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 10.0, extra=None):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.extra = extra
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='MetricsFile', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+        self._write()
+
+    def _write(self):
+        try:
+            self.metrics.write(self.path, self.extra() if self.extra else None)
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+
+    def close(self):
+        """Write a final snapshot and stop."""
+        self._stop.set()
+        self._thread.join()
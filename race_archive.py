@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Race Archive Index
+
+A small SQLite index of lap_times CSVs so repeated stats runs don't reparse
+them. For each file it keeps the path, mtime and size, the parsed rows as
+integer milliseconds (one BLOB of lap times per runner), and the aggregates
+of calculate_race_stats.StatsAccumulator.
+
+- An unchanged file (same mtime and size) is answered from the stored
+  aggregates without opening the CSV.
+- A changed file is read again, but only rows whose bytes changed (CRC32 per
+  line) are parsed; the others reuse their stored lap times.
+- Files not used for max_age_days are dropped, then the least recently used
+  ones until the cached rows fit in max_bytes.
+- The GUI registers each race's CSV when it starts, so the latest race is
+  found with one query instead of a glob and stat scan.
+
+Usage:
+    python3 race_archive.py                 # list indexed files
+    python3 race_archive.py --evict         # apply the size/age limits now
+    python3 race_archive.py --forget PATH   # drop one file from the index
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from calculate_race_stats import StatsAccumulator
+from timecodec import MISSING, parse_ms
+
+
+ARCHIVE_FILE = "race_archive.sqlite"
+MAX_BYTES = 256 * 1024 * 1024
+MAX_AGE_DAYS = 365
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path       TEXT PRIMARY KEY,
+    mtime_ns   INTEGER NOT NULL DEFAULT 0,
+    size       INTEGER NOT NULL DEFAULT -1,
+    registered REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    header     TEXT,
+    stats      TEXT,
+    nbytes     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rows (
+    path        TEXT NOT NULL,
+    idx         INTEGER NOT NULL,
+    crc         INTEGER NOT NULL,
+    race_number TEXT NOT NULL,
+    hallway     TEXT NOT NULL,
+    gender      TEXT NOT NULL,
+    laps        BLOB NOT NULL,
+    finish      INTEGER NOT NULL,
+    PRIMARY KEY (path, idx)
+) WITHOUT ROWID;
+"""
+
+# (crc, race_number, hallway, gender, laps as array('q') bytes, finish ms)
+Row = Tuple[int, str, str, str, bytes, int]
+
+
+class RaceArchive:
+    """SQLite-backed cache of parsed lap_times CSVs and their stats."""
+
+    def __init__(self, db_path: str = ARCHIVE_FILE, max_bytes: int = MAX_BYTES,
+                 max_age_days: Optional[float] = MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.db = sqlite3.connect(db_path, timeout=5.0)
+        self.db.executescript(_SCHEMA)
+        self.last_lookup = None  # 'hit', 'partial' or 'miss' after stats()
+        self.rows_parsed = 0
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- Index ---------------------------------------------------------------
+
+    def register(self, csv_path: str):
+        """Record a race file (it may not exist yet), e.g. when a race starts."""
+        path = os.path.abspath(csv_path)
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT INTO files (path, registered, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET registered = excluded.registered",
+                (path, now, now))
+
+    def latest(self) -> Optional[str]:
+        """Most recently registered or modified indexed file that still exists."""
+        cur = self.db.execute(
+            "SELECT path FROM files ORDER BY MAX(registered, mtime_ns / 1e9) DESC")
+        for (path,) in cur:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def forget(self, csv_path: str):
+        path = os.path.abspath(csv_path)
+        with self.db:
+            self.db.execute("DELETE FROM rows WHERE path = ?", (path,))
+            self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def files(self) -> List[Tuple[str, int, float, int]]:
+        """(path, size, last_used, cached bytes) of every indexed file."""
+        return self.db.execute(
+            "SELECT path, size, last_used, nbytes FROM files ORDER BY registered").fetchall()
+
+    # -- Stats ---------------------------------------------------------------
+
+    def stats(self, csv_path: str, lap_length_km: float):
+        """Stats dict of calculate_race_stats.compute_stats, from the cache if possible."""
+        return self.accumulator(csv_path, lap_length_km).result()
+
+    def accumulator(self, csv_path: str, lap_length_km: float) -> StatsAccumulator:
+        path = os.path.abspath(csv_path)
+        st = os.stat(path)
+        found = self.db.execute(
+            "SELECT mtime_ns, size, header, stats FROM files WHERE path = ?", (path,)).fetchone()
+        now = time.time()
+        if found and found[0] == st.st_mtime_ns and found[1] == st.st_size and found[3]:
+            self.last_lookup = 'hit'
+            self.rows_parsed = 0
+            with self.db:
+                self.db.execute("UPDATE files SET last_used = ? WHERE path = ?", (now, path))
+            return StatsAccumulator.from_state(json.loads(found[3]), lap_length_km)
+
+        old_header = found[2] if found else None
+        acc, header, nbytes = self._refresh(path, old_header, lap_length_km)
+        with self.db:
+            self.db.execute(
+                "INSERT INTO files (path, mtime_ns, size, registered, last_used, header, stats, nbytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+                "mtime_ns = excluded.mtime_ns, size = excluded.size, last_used = excluded.last_used, "
+                "header = excluded.header, stats = excluded.stats, nbytes = excluded.nbytes",
+                (path, st.st_mtime_ns, st.st_size, now, now, header,
+                 json.dumps(acc.to_state()), nbytes))
+        self.evict()
+        return acc
+
+    def rows(self, csv_path: str) -> List[Tuple[str, str, str, array, int]]:
+        """Cached rows of a file as (race_number, hallway, gender, lap ms array('q'), finish ms)."""
+        path = os.path.abspath(csv_path)
+        out = []
+        for race_number, hallway, gender, laps, finish in self.db.execute(
+                "SELECT race_number, hallway, gender, laps, finish FROM rows WHERE path = ? ORDER BY idx",
+                (path,)):
+            lap_ms = array('q')
+            lap_ms.frombytes(laps)
+            out.append((race_number, hallway, gender, lap_ms, finish))
+        return out
+
+    def _refresh(self, path: str, old_header: Optional[str],
+                 lap_length_km: float) -> Tuple[StatsAccumulator, str, int]:
+        """Re-read a changed file, parsing only rows whose CRC changed.
+
+        Returns (accumulator, header line, cached bytes).
+        """
+        with open(path, "rb") as f:
+            lines = [line for line in f.read().splitlines() if line]
+        header = lines[0].decode("utf-8") if lines else ""
+        columns = next(csv.reader([header]), [])
+        col = {name: i for i, name in enumerate(columns)}
+        lap_cols = sorted((c for c in columns if c.startswith("lap")), key=lambda x: int(x.replace("lap", "")))
+        lap_idx = [col[c] for c in lap_cols]
+        num_i, hall_i, gen_i = col.get("race_number"), col.get("hallway"), col.get("gender")
+        fin_i = col.get("finish_time")
+
+        # Stored rows are only reusable if the columns are the same
+        old: Dict[int, Row] = {}
+        if header == old_header:
+            for idx, crc, race_number, hallway, gender, laps, finish in self.db.execute(
+                    "SELECT idx, crc, race_number, hallway, gender, laps, finish FROM rows WHERE path = ?",
+                    (path,)):
+                old[idx] = (crc, race_number, hallway, gender, laps, finish)
+
+        def cell(row, i):
+            return row[i] if i is not None and i < len(row) else ""
+
+        acc = StatsAccumulator(lap_cols, lap_length_km)
+        changed: List[Tuple] = []
+        nbytes = len(header)
+        parsed = 0
+        for idx, line in enumerate(lines[1:]):
+            crc = zlib.crc32(line)
+            cached = old.get(idx)
+            if cached is not None and cached[0] == crc:
+                _, race_number, hallway, gender, laps, finish = cached
+                lap_ms = array('q')
+                lap_ms.frombytes(laps)
+            else:
+                row = next(csv.reader([line.decode("utf-8")]))
+                race_number = cell(row, num_i).strip() or "?"
+                hallway = cell(row, hall_i).strip() or "Unknown"
+                gender = cell(row, gen_i).strip() or "Unknown"
+                lap_ms = array('q', [MISSING if ms is None else ms
+                                     for ms in map(parse_ms, (cell(row, i) for i in lap_idx))])
+                finish_ms = parse_ms(cell(row, fin_i))
+                finish = MISSING if finish_ms is None else finish_ms
+                laps = lap_ms.tobytes()
+                changed.append((path, idx, crc, race_number, hallway, gender, laps, finish))
+                parsed += 1
+            acc.add_parsed(race_number, hallway, gender, lap_ms, finish)
+            nbytes += len(laps) + len(race_number) + len(hallway) + len(gender) + 24
+
+        with self.db:
+            if header != old_header:
+                self.db.execute("DELETE FROM rows WHERE path = ?", (path,))
+            else:
+                self.db.execute("DELETE FROM rows WHERE path = ? AND idx >= ?", (path, len(lines) - 1))
+            self.db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed)
+        self.last_lookup = 'partial' if old else 'miss'
+        self.rows_parsed = parsed
+        return acc, header, nbytes
+
+    # -- Eviction ------------------------------------------------------------
+
+    def evict(self):
+        """Drop files unused for max_age_days, then least recently used ones over max_bytes."""
+        with self.db:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                for (path,) in self.db.execute("SELECT path FROM files WHERE last_used < ?", (cutoff,)).fetchall():
+                    self.db.execute("DELETE FROM rows WHERE path = ?", (path,))
+                    self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+            if self.max_bytes is not None:
+                total = self.db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM files").fetchone()[0]
+                if total > self.max_bytes:
+                    for path, nbytes in self.db.execute(
+                            "SELECT path, nbytes FROM files WHERE nbytes > 0 ORDER BY last_used").fetchall():
+                        # Keep the index entry (for latest()), drop the cached data
+                        self.db.execute("DELETE FROM rows WHERE path = ?", (path,))
+                        self.db.execute(
+                            "UPDATE files SET stats = NULL, header = NULL, nbytes = 0, size = -1 WHERE path = ?",
+                            (path,))
+                        total -= nbytes
+                        if total <= self.max_bytes:
+                            break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the race archive index")
+    parser.add_argument("--archive", default=ARCHIVE_FILE, help=f"Index file (default: {ARCHIVE_FILE})")
+    parser.add_argument("--evict", action="store_true", help="Apply the size and age limits now")
+    parser.add_argument("--forget", metavar="PATH", help="Drop a file from the index")
+    args = parser.parse_args()
+
+    with RaceArchive(args.archive) as archive:
+        if args.forget:
+            archive.forget(args.forget)
+        if args.evict:
+            archive.evict()
+        for path, size, last_used, nbytes in archive.files():
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_used))
+            print(f"{path}  size={size}  cached={nbytes}  last used {used}")
+
+
+if __name__ == "__main__":
+    main()
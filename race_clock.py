@@ -0,0 +1,70 @@
+"""
+Race Clock
+
+Elapsed race time comes from time.perf_counter_ns(), a monotonic
+high-resolution counter that NTP adjustments and DST changes cannot move.
+The clock is anchored to wall-clock time exactly once, when the race starts
+(or is resumed), and that anchor is only used for the timestamp column.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+now_ns = time.perf_counter_ns
+
+
+class RaceClock:
+    """Monotonic race clock with a single wall-clock anchor."""
+
+    __slots__ = ('start_ns', 'start_wall')
+
+    def __init__(self):
+        self.start_ns: Optional[int] = None
+        self.start_wall: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self.start_ns is not None
+
+    def start(self):
+        """Start the race now."""
+        self.start_ns = now_ns()
+        self.start_wall = datetime.now()
+
+    def resume(self, start_wall: datetime):
+        """Continue a race that started at start_wall (e.g. after a crash).
+
+        The wall clock is read once here to place the start on the monotonic
+        timeline; from then on only the monotonic counter is used.
+        """
+        offset_ns = (datetime.now() - start_wall) // timedelta(microseconds=1) * 1000
+        self.start_ns = now_ns() - offset_ns
+        self.start_wall = start_wall
+
+    def elapsed_ms(self, captured_ns: Optional[int] = None) -> int:
+        """Elapsed race time in ms at captured_ns (default: now)."""
+        if captured_ns is None:
+            captured_ns = now_ns()
+        return (captured_ns - self.start_ns) // 1_000_000
+
+
+# Race timer display resolutions (label text -> ms per visible tick)
+DISPLAY_RESOLUTIONS = {'seconds': 1000, 'tenths': 100}
+
+
+def format_clock(elapsed_ms: int, resolution_ms: int = 1000) -> str:
+    """Format elapsed ms as HH:MM:SS, or HH:MM:SS.t for tenths."""
+    seconds, ms = divmod(elapsed_ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{hours:02}:{minutes:02}:{seconds:02}"
+    if resolution_ms < 1000:
+        text += f".{ms // 100}"
+    return text
+
+
+def ms_until_next_tick(elapsed_ms: int, resolution_ms: int) -> int:
+    """Delay until the displayed clock text next changes."""
+    return resolution_ms - elapsed_ms % resolution_ms
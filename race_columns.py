@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Columnar Race Results
+
+A compact binary alternative to the wide lap_times CSV (.lapcol files):
+
+    magic    8 bytes   b'LAPCOL\\x00\\x01'
+    length   uint32    size of the JSON header
+    header   JSON      start, total_laps, lap_length, rows, hallways, genders
+                       and the (offset, nbytes) of each column below
+    columns  little-endian, each starting on an 8-byte boundary
+      race_number_offsets  uint32[rows + 1]  into race_number_bytes
+      race_number_bytes    UTF-8
+      hallway              uint16[rows]      index into the header's hallways
+      gender               uint16[rows]      index into the header's genders
+      laps                 int32[rows, total_laps]  elapsed ms, -1 if missing
+      finish               int32[rows]       elapsed ms, -1 if not finished
+
+The race metadata is stored once instead of in every row, and nothing has to
+be parsed: RaceColumns maps the file and hands out memoryviews (or NumPy
+arrays) over the mapping without copying. calculate_race_stats.py reads
+.lapcol files directly; lap times must fit in an int32 (about 596 hours).
+
+Race numbers, hallways and genders are stored as they are, so converting
+back to CSV gives the original cells. The stats (accumulator() and matrix())
+strip them and count blanks as "?" and "Unknown", like the CSV stats do.
+
+Usage:
+    python3 race_columns.py lap_times_20260205_182602.csv --lap-length 2.5   # -> .lapcol
+    python3 race_columns.py lap_times_20260205_182602.journal                # -> .lapcol
+    python3 race_columns.py lap_times_20260205_182602.lapcol                 # -> .csv
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lap_journal import read_journal, results_header
+from race_store import Runner, add_lap
+from timecodec import MISSING, format_ms, parse_ms
+
+
+MAGIC = b'LAPCOL\x00\x01'
+SUFFIX = '.lapcol'
+_PREFIX = struct.Struct('<8sI')
+_ALIGN = 8
+
+# (race_number, hallway, gender, lap ms (MISSING for blanks), finish ms or MISSING)
+ColumnRow = Tuple[str, str, str, Sequence[int], int]
+
+UNKNOWN_RACE_NUMBER = '?'
+UNKNOWN_GROUP = 'Unknown'
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder != 'little':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_columns(path: str, meta: dict, rows: Iterable[ColumnRow]):
+    """Write rows as a .lapcol file; lap rows are cut or padded to meta['total_laps'].
+
+    Like the CSV, the file is written to a temporary name and renamed into place.
+    """
+    total_laps = int(meta.get('total_laps') or 0)
+    hallway_index: Dict[str, int] = {}
+    gender_index: Dict[str, int] = {}
+    offsets = array('I', [0])
+    names = bytearray()
+    hallway = array('H')
+    gender = array('H')
+    laps = array('i')
+    finish = array('i')
+    padding = [MISSING] * total_laps
+    for race_number, row_hallway, row_gender, lap_ms, finish_ms in rows:
+        names += race_number.encode('utf-8')
+        offsets.append(len(names))
+        hallway.append(hallway_index.setdefault(row_hallway, len(hallway_index)))
+        gender.append(gender_index.setdefault(row_gender, len(gender_index)))
+        row = list(lap_ms[:total_laps])
+        laps.extend(row)
+        laps.extend(padding[len(row):])
+        finish.append(finish_ms)
+
+    columns = [
+        ('race_number_offsets', _little_endian(offsets)),
+        ('race_number_bytes', bytes(names)),
+        ('hallway', _little_endian(hallway)),
+        ('gender', _little_endian(gender)),
+        ('laps', _little_endian(laps)),
+        ('finish', _little_endian(finish)),
+    ]
+    layout = {}
+    offset = 0
+    for name, data in columns:
+        layout[name] = [offset, len(data)]
+        offset = _aligned(offset + len(data))
+    header = json.dumps({
+        'start': meta.get('start', ''),
+        'total_laps': total_laps,
+        'lap_length': meta.get('lap_length'),
+        'rows': len(finish),
+        'hallways': list(hallway_index),
+        'genders': list(gender_index),
+        'columns': layout,
+    }, ensure_ascii=False).encode('utf-8')
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        data_start = _aligned(_PREFIX.size + len(header))
+        f.write(b'\0' * (data_start - _PREFIX.size - len(header)))
+        for name, data in columns:
+            f.write(data)
+            f.write(b'\0' * (_aligned(len(data)) - len(data)))
+    os.replace(tmp_path, path)
+
+
+def runner_rows(runners: Iterable[Runner], total_laps: int) -> Iterable[ColumnRow]:
+    """Rows of runners with at least one lap; finished once total_laps laps are in."""
+    for runner in runners:
+        lap_ms = runner.lap_ms
+        if lap_ms:
+            finish = lap_ms[total_laps - 1] if total_laps and len(lap_ms) >= total_laps else MISSING
+            yield runner.number, runner.hallway, runner.gender, lap_ms, finish
+
+
+def is_columns_file(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class RaceColumns:
+    """A memory-mapped .lapcol file.
+
+    laps is a flat int32 memoryview, row after row (lap_row(i) is row i);
+    hallway_codes and gender_codes index hallways and genders. Nothing is
+    copied until race numbers are decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, header_len = _PREFIX.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a {SUFFIX} file")
+            header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_len])
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise
+        self.start_timestamp: str = header['start']
+        self.total_laps: int = header['total_laps']
+        self.lap_length: Optional[float] = header['lap_length']
+        self.rows: int = header['rows']
+        self.hallways: List[str] = header['hallways']
+        self.genders: List[str] = header['genders']
+        self._data_start = _aligned(_PREFIX.size + header_len)
+        self._layout = header['columns']
+        self._views: List[memoryview] = []
+
+        self.race_number_offsets = self._column('race_number_offsets', 'I')
+        self.hallway_codes = self._column('hallway', 'H')
+        self.gender_codes = self._column('gender', 'H')
+        self.laps = self._column('laps', 'i')
+        self.finish = self._column('finish', 'i')
+        self._race_numbers: Optional[List[str]] = None
+
+    def _bounds(self, name: str) -> Tuple[int, int]:
+        offset, nbytes = self._layout[name]
+        return self._data_start + offset, nbytes
+
+    def _column(self, name: str, typecode: str) -> memoryview:
+        start, nbytes = self._bounds(name)
+        raw = memoryview(self._mmap)[start:start + nbytes]
+        if sys.byteorder == 'little':
+            view = raw.cast(typecode)
+            self._views.extend((raw, view))
+            return view
+        # Big-endian machines get a swapped copy instead of a view
+        column = array(typecode, raw.tobytes())
+        raw.release()
+        column.byteswap()
+        return memoryview(column)
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap the file. NumPy arrays from numpy_columns() keep it mapped until they are freed."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    @property
+    def meta(self) -> dict:
+        return {'start': self.start_timestamp, 'total_laps': self.total_laps, 'lap_length': self.lap_length}
+
+    @property
+    def race_numbers(self) -> List[str]:
+        if self._race_numbers is None:
+            start, nbytes = self._bounds('race_number_bytes')
+            names = self._mmap[start:start + nbytes]
+            offsets = self.race_number_offsets
+            self._race_numbers = [names[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.rows)]
+        return self._race_numbers
+
+    def lap_row(self, i: int) -> memoryview:
+        width = self.total_laps
+        return self.laps[i * width:(i + 1) * width]
+
+    def iter_rows(self) -> Iterable[ColumnRow]:
+        hallways, genders = self.hallways, self.genders
+        hallway_codes, gender_codes, finish = self.hallway_codes, self.gender_codes, self.finish
+        for i, race_number in enumerate(self.race_numbers):
+            yield (race_number, hallways[hallway_codes[i]], genders[gender_codes[i]],
+                   self.lap_row(i), finish[i])
+
+    def numpy_columns(self):
+        """(laps[rows, total_laps], finish, hallway_codes, gender_codes) as NumPy views of the file."""
+        import numpy as np
+
+        def view(name, dtype, count):
+            start, _ = self._bounds(name)
+            return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=start)
+
+        laps = view('laps', '<i4', self.rows * self.total_laps).reshape(self.rows, self.total_laps)
+        return (laps, view('finish', '<i4', self.rows),
+                view('hallway', '<u2', self.rows), view('gender', '<u2', self.rows))
+
+    def matrix(self):
+        """race_stats_numpy.LapMatrix over the mapped columns (requires numpy)."""
+        from race_stats_numpy import LapMatrix
+        laps, finish, hallway_codes, gender_codes = self.numpy_columns()
+        hallways, hallway_codes = _stats_groups(self.hallways, hallway_codes)
+        genders, gender_codes = _stats_groups(self.genders, gender_codes)
+        return LapMatrix(laps, finish, self.stats_race_numbers(), hallway_codes, hallways,
+                         gender_codes, genders)
+
+    def accumulator(self, lap_length_km: float):
+        """calculate_race_stats.StatsAccumulator over all rows, without parsing any text."""
+        from calculate_race_stats import StatsAccumulator
+        acc = StatsAccumulator([f"lap{i}" for i in range(1, self.total_laps + 1)], lap_length_km)
+        hallways = [_stats_label(label) for label in self.hallways]
+        genders = [_stats_label(label) for label in self.genders]
+        hallway_codes, gender_codes, finish = self.hallway_codes, self.gender_codes, self.finish
+        for i, race_number in enumerate(self.stats_race_numbers()):
+            acc.add_parsed(race_number, hallways[hallway_codes[i]], genders[gender_codes[i]],
+                           self.lap_row(i), finish[i])
+        return acc
+
+    def stats_race_numbers(self) -> List[str]:
+        """Race numbers as the stats count them: stripped, blanks as "?"."""
+        return [race_number.strip() or UNKNOWN_RACE_NUMBER for race_number in self.race_numbers]
+
+
+def _stats_label(label: str) -> str:
+    return label.strip() or UNKNOWN_GROUP
+
+
+def _stats_groups(labels: List[str], codes):
+    """Group labels as the stats count them, and NumPy codes indexing them.
+
+    Labels that become equal (e.g. "" and " ") are merged, which needs a
+    recoded copy of the codes instead of the view of the file.
+    """
+    index: Dict[str, int] = {}
+    recode = [index.setdefault(_stats_label(label), len(index)) for label in labels]
+    if len(index) < len(labels):
+        import numpy as np
+        codes = np.asarray(recode, dtype=codes.dtype)[codes]
+    return list(index), codes
+
+
+# -- Conversion ---------------------------------------------------------------
+
+def csv_to_columns(csv_path: str, out_path: str, lap_length: Optional[float] = None):
+    """Convert a wide lap_times CSV; the race start comes from its timestamp column."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        col = {name: i for i, name in enumerate(header)}
+        lap_idx = [i for _, i in sorted((int(name[3:]), i) for name, i in col.items()
+                                        if name.startswith('lap') and name[3:].isdigit())]
+        ts_i, num_i = col.get('timestamp'), col.get('race_number')
+        hall_i, gen_i, fin_i = col.get('hallway'), col.get('gender'), col.get('finish_time')
+
+        def cell(row, i):
+            return row[i] if i is not None and i < len(row) else ''
+
+        def ms(text):
+            value = parse_ms(text)
+            return MISSING if value is None else value
+
+        start = ''
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            start = start or cell(row, ts_i).strip()
+            rows.append((cell(row, num_i), cell(row, hall_i), cell(row, gen_i),
+                         [ms(cell(row, i)) for i in lap_idx], ms(cell(row, fin_i))))
+    write_columns(out_path, {'start': start, 'total_laps': len(lap_idx), 'lap_length': lap_length}, rows)
+
+
+def journal_to_columns(journal_path: str, out_path: str, lap_length: Optional[float] = None):
+    meta, records = read_journal(journal_path)
+    runners: Dict[str, Runner] = {}
+    max_laps = 0
+    for race_number, lap, elapsed_ms, hallway, gender in records:
+        add_lap(runners, race_number, elapsed_ms, hallway, gender)
+        max_laps = max(max_laps, lap)
+    meta = dict(meta, total_laps=int(meta.get('total_laps') or max_laps))
+    if meta.get('lap_length') is None:
+        meta['lap_length'] = lap_length
+    write_columns(out_path, meta, runner_rows(runners.values(), meta['total_laps']))
+
+
+def columns_to_csv(columns_path: str, csv_path: str):
+    """Write a .lapcol file back out as the wide lap_times CSV."""
+    with RaceColumns(columns_path) as columns:
+        tmp_path = csv_path + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(results_header(columns.total_laps))
+            start = columns.start_timestamp
+            for race_number, hallway, gender, lap_ms, finish in columns.iter_rows():
+                row = [start, race_number, hallway, gender]
+                row.extend(format_ms(ms) if ms != MISSING else '' for ms in lap_ms)
+                row.append(format_ms(finish) if finish != MISSING else '')
+                writer.writerow(row)
+        os.replace(tmp_path, csv_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between lap_times CSV/journal and .lapcol")
+    parser.add_argument("source", help="lap_times CSV, journal or .lapcol file")
+    parser.add_argument("--out", help="Output path (default: source with .lapcol or .csv)")
+    parser.add_argument("--lap-length", type=float, default=None,
+                        help="Lap length in km to store, if the source doesn't record it")
+    args = parser.parse_args()
+
+    stem = os.path.splitext(args.source)[0]
+    if is_columns_file(args.source):
+        out = args.out or stem + '.csv'
+        columns_to_csv(args.source, out)
+    elif args.source.endswith('.journal'):
+        out = args.out or stem + SUFFIX
+        journal_to_columns(args.source, out, args.lap_length)
+    else:
+        out = args.out or stem + SUFFIX
+        csv_to_columns(args.source, out, args.lap_length)
+    print(f"Wrote {out} ({os.path.getsize(out)} bytes, source {os.path.getsize(args.source)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
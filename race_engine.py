@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Race Engine
+
+The race without a user interface: the runners, the race clock, the lap
+limit and the LapWriter that owns the journal, CSV and backups. The Tk GUI,
+the lap aggregator and the command line below all record laps through it,
+so a race can be run, tested and load-tested without a display
+(see benchmarks/bench_race_engine.py).
+
+Every lap gets a status:
+    ok         recorded
+    unknown    race number not in the runners
+    repeated   the same race number twice in one batch
+    duplicate  the same race number again within dedup_ms of its last lap
+    late       earlier than the runner's last lap
+    limit      the runner already completed all laps
+    range      the time is before the race start or too far after it
+
+Usage:
+    python3 race_engine.py --runners runners.csv --total-laps 10 --lap-length 2.5
+    python3 race_engine.py --runners runners.csv --resume lap_times_<timestamp>.journal
+
+Race numbers are read from stdin, one or more per line (separated by spaces,
+commas or semicolons); every number on a line gets the time the line was
+read. The race is stopped and saved at end of input or Ctrl+C.
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from lap_backup import SegmentBackup
+from lap_writer import LapWriter
+from metrics import Metrics
+from race_clock import RaceClock, now_ns
+from race_columns import SUFFIX as COLUMNS_SUFFIX
+from race_recovery import TIMESTAMP_FORMAT, RecoveredRace, load_race
+from race_store import LAP_MS_LIMIT, Runner
+from timecodec import format_ms
+
+
+OK = 'ok'
+UNKNOWN = 'unknown'
+REPEATED = 'repeated'
+DUPLICATE = 'duplicate'
+LATE = 'late'
+LIMIT = 'limit'
+RANGE = 'range'
+
+BACKUP_DIR = 'backups'
+SEPARATORS = re.compile(r'[\s,;]+')
+
+
+class LapResult(NamedTuple):
+    """Outcome of one lap entry; lap is the runner's lap count after it (0 if unknown)."""
+    status: str
+    race_number: str
+    elapsed_ms: int
+    lap: int
+    runner: Optional[Runner]
+
+
+class RaceEngine:
+    """Runs one race: validates laps, keeps the runners' state and feeds the writer.
+
+    report(message, color) receives the writer's log messages and errors,
+    from the writer thread. Not thread-safe: record laps from one thread.
+    """
+
+    def __init__(self, runners: Optional[Dict[str, Runner]] = None,
+                 report: Optional[Callable[[str, Optional[str]], None]] = None,
+                 dedup_ms: int = 0, backup_mode: str = 'incremental', backup_dir: str = BACKUP_DIR,
+                 backup_every_laps: int = 10, backup_every_seconds: Optional[float] = 60.0,
+                 backup_max_segments: int = 50, csv_interval: float = 5.0,
+                 fsync_interval: Optional[float] = 1.0, max_pending: int = 10000,
+                 export_columns: bool = True, metrics: Optional[Metrics] = None):
+        self.runners: Dict[str, Runner] = runners if runners is not None else {}
+        self.report = report or (lambda message, color=None: None)
+        self.dedup_ms = dedup_ms
+        self.backup_mode = backup_mode
+        self.backup_dir = backup_dir
+        self.backup_every_laps = backup_every_laps
+        self.backup_every_seconds = backup_every_seconds
+        self.backup_max_segments = backup_max_segments
+        self.csv_interval = csv_interval
+        self.fsync_interval = fsync_interval
+        self.max_pending = max_pending
+        self.export_columns = export_columns  # also write a .lapcol file when the race stops
+        self.metrics = metrics  # passed to the writer (latencies, bytes written)
+
+        self.clock = RaceClock()
+        self.total_laps = 0
+        self.lap_length = 0.0
+        self.start_timestamp: Optional[str] = None
+        self.output_file: Optional[str] = None
+        self.journal_file: Optional[str] = None
+        self.writer: Optional[LapWriter] = None
+        self.counts: Dict[str, int] = {}  # status -> laps
+
+    @property
+    def recording(self) -> bool:
+        """Whether a race is running and owns its output files."""
+        return self.writer is not None
+
+    @property
+    def race_name(self) -> Optional[str]:
+        if self.output_file is None:
+            return None
+        return os.path.splitext(os.path.basename(self.output_file))[0]
+
+    # -- Race lifecycle ------------------------------------------------------
+
+    def start(self, total_laps: int, lap_length: float, directory: str = '.'):
+        """Start a new race now, with output files in directory."""
+        if self.recording:
+            raise RuntimeError("a race is already running")
+        if total_laps <= 0 or lap_length <= 0:
+            raise ValueError("total laps and lap length must be positive")
+        self.total_laps = total_laps
+        self.lap_length = lap_length
+        self.clock.start()
+        self.start_timestamp = self.clock.start_wall.strftime(TIMESTAMP_FORMAT)[:-3]
+        race_name = f"lap_times_{self.clock.start_wall.strftime('%Y%m%d_%H%M%S')}"
+        self.output_file = os.path.normpath(os.path.join(directory, f"{race_name}.csv"))
+        self.journal_file = os.path.normpath(os.path.join(directory, f"{race_name}.journal"))
+        for runner in self.runners.values():
+            del runner.lap_ms[:]
+        self._open()
+
+    def resume(self, race: RecoveredRace, lap_length: Optional[float] = None) -> int:
+        """Continue a race loaded with race_recovery.load_race, writing to the same files.
+
+        lap_length is used if the race files don't record it. Returns the
+        number of recovered race numbers that are not in the runners.
+        """
+        if self.recording:
+            raise RuntimeError("a race is already running")
+        if race.start_time is None or race.total_laps <= 0:
+            raise ValueError(f"no race start time or lap count found in {race.source}")
+        self.total_laps = race.total_laps
+        self.lap_length = race.lap_length or lap_length or 0.0
+        self.clock.resume(race.start_time)
+        self.start_timestamp = race.start_timestamp
+        directory = '.' if os.path.isdir(race.source) else os.path.dirname(race.source)
+        self.output_file = os.path.join(directory, f"{race.race_name}.csv")
+        self.journal_file = os.path.join(directory, f"{race.race_name}.journal")
+
+        # Laps past total_laps are dropped here and from the files the writer rebuilds
+        recovered = {number: Runner(r.number, r.hallway, r.gender, r.lap_ms[:self.total_laps])
+                     for number, r in race.runners.items()}
+        unknown = 0
+        for runner in self.runners.values():
+            del runner.lap_ms[:]
+        for race_number, runner_laps in recovered.items():
+            runner = self.runners.get(race_number)
+            if runner is None:
+                unknown += 1
+                continue
+            runner.lap_ms.extend(runner_laps.lap_ms)
+        self._open(initial_runners=recovered)
+        return unknown
+
+    def follow(self, start_timestamp: str, total_laps: int, lap_length: float):
+        """Track a race recorded elsewhere (a capture station): clock and lap limit only, no files."""
+        self.total_laps = total_laps
+        self.lap_length = lap_length
+        self.start_timestamp = start_timestamp
+        self.clock.resume(datetime.strptime(start_timestamp, TIMESTAMP_FORMAT))
+        for runner in self.runners.values():
+            del runner.lap_ms[:]
+
+    def _open(self, initial_runners: Optional[Dict[str, Runner]] = None):
+        # All file I/O happens on the writer thread. Every lap is appended to the
+        # journal; the CSV (timestamp,race_number,hallway,gender,lap1..lapN,finish_time)
+        # is rebuilt from it periodically.
+        meta = {
+            'start': self.start_timestamp,
+            'total_laps': self.total_laps,
+            'lap_length': self.lap_length,
+        }
+        segment_backup = None
+        if self.backup_mode == 'incremental':
+            segment_backup = SegmentBackup(os.path.join(self.backup_dir, self.race_name), meta,
+                                           every_laps=self.backup_every_laps,
+                                           every_seconds=self.backup_every_seconds,
+                                           max_segments=self.backup_max_segments)
+        self.counts = {}
+        columns_file = os.path.splitext(self.output_file)[0] + COLUMNS_SUFFIX if self.export_columns else None
+        self.writer = LapWriter(self.journal_file, self.output_file, meta,
+                                report=self.report, max_pending=self.max_pending,
+                                csv_interval=self.csv_interval,
+                                fsync_interval=self.fsync_interval, backup_dir=self.backup_dir,
+                                segment_backup=segment_backup,
+                                backup_every_laps=self.backup_every_laps,
+                                initial_runners=initial_runners, columns_file=columns_file,
+                                metrics=self.metrics)
+        self.writer.save_csv()
+
+    def save_csv(self):
+        """Ask the writer to rebuild the CSV with header and per-runner lap columns."""
+        if self.writer:
+            self.writer.save_csv()
+
+    def backup(self):
+        """Ask the writer for a backup now, regardless of cadence."""
+        if self.writer:
+            self.writer.backup()
+
+    @property
+    def pending(self) -> int:
+        return self.writer.pending if self.writer else 0
+
+    def stop(self):
+        """Build the final CSV and backup, and wait until everything is on disk."""
+        if self.writer:
+            self.writer.save_csv()
+            self.writer.backup()
+            self.close()
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush pending writes and stop the writer thread (see LapWriter.close for timeout)."""
+        if self.writer:
+            self.writer.close(timeout)
+            self.writer = None
+
+    # -- Recording -----------------------------------------------------------
+
+    def check(self, race_number: str, elapsed_ms: int) -> str:
+        """Status a lap would get, without recording it."""
+        runner = self.runners.get(race_number)
+        if runner is None:
+            return UNKNOWN
+        if not 0 <= elapsed_ms < LAP_MS_LIMIT:
+            return RANGE
+        if runner.laps:
+            since_last = elapsed_ms - runner.last_lap_ms
+            if abs(since_last) < self.dedup_ms:
+                return DUPLICATE
+            if since_last < 0:
+                return LATE
+        if runner.laps >= self.total_laps:
+            return LIMIT
+        return OK
+
+    def record(self, race_number: str, elapsed_ms: Optional[int] = None,
+               captured_ns: Optional[int] = None) -> LapResult:
+        """Validate and record one lap at elapsed_ms (default: at captured_ns, or now)."""
+        if elapsed_ms is None:
+            if captured_ns is None:
+                captured_ns = now_ns()
+            elapsed_ms = self.clock.elapsed_ms(captured_ns)
+        status = self.check(race_number, elapsed_ms)
+        runner = self.runners.get(race_number)
+        if status == OK:
+            runner.lap_ms.append(elapsed_ms)
+            self.writer.submit(race_number, runner.laps, elapsed_ms, runner.hallway, runner.gender,
+                               captured_ns)
+        self.counts[status] = self.counts.get(status, 0) + 1
+        return LapResult(status, race_number, elapsed_ms, runner.laps if runner else 0, runner)
+
+    def record_many(self, entries: Iterable[Tuple[str, int]], once_per_batch: bool = True,
+                    captured_ns: Optional[int] = None) -> List[LapResult]:
+        """Validate and record a batch of (race_number, elapsed_ms) in order.
+
+        The valid laps go to the writer as one item. With once_per_batch, a
+        race number that appears again in the same batch is 'repeated'.
+        captured_ns is when the batch was entered, for the writer's metrics.
+        """
+        results = []
+        records = []
+        in_batch = set()
+        counts = self.counts
+        for race_number, elapsed_ms in entries:
+            if once_per_batch and race_number in in_batch:
+                status = REPEATED
+            else:
+                status = self.check(race_number, elapsed_ms)
+            runner = self.runners.get(race_number)
+            if status == OK:
+                in_batch.add(race_number)
+                runner.lap_ms.append(elapsed_ms)
+                records.append((race_number, runner.laps, elapsed_ms, runner.hallway, runner.gender))
+            counts[status] = counts.get(status, 0) + 1
+            results.append(LapResult(status, race_number, elapsed_ms, runner.laps if runner else 0, runner))
+        if records:
+            self.writer.submit_many(records, captured_ns)
+        return results
+
+    def problem_text(self, result: LapResult) -> str:
+        """Operator-facing description of a lap that was not recorded."""
+        return {
+            UNKNOWN: "unknown race number",
+            REPEATED: "entered twice in one batch",
+            DUPLICATE: "entered again within the duplicate window",
+            LATE: "earlier than the runner's last lap",
+            LIMIT: f"already completed all {self.total_laps} laps",
+            RANGE: "time is before the race start or too long after it",
+        }.get(result.status, result.status)
+
+
+# -- Command line ---------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Record lap times from stdin without the GUI")
+    parser.add_argument('--runners', required=True, help="Runners CSV (number,hallway,gender)")
+    parser.add_argument('--total-laps', type=int, default=10)
+    parser.add_argument('--lap-length', type=float, default=2.5)
+    parser.add_argument('--resume', help="Continue a race from its journal, CSV or backup directory")
+    parser.add_argument('--dir', default='.', help="Directory for the race files of a new race")
+    args = parser.parse_args()
+
+    from roster import load_roster
+    roster = load_roster(args.runners)
+    for line, problem in roster.errors:
+        print(f"WARNING: {args.runners} line {line}: {problem}", file=sys.stderr)
+    engine = RaceEngine(roster.runners, report=lambda message, color=None: print(message, file=sys.stderr))
+    if args.resume:
+        unknown = engine.resume(load_race(args.resume), args.lap_length)
+        print(f"Race resumed from {args.resume}", file=sys.stderr)
+        if unknown:
+            print(f"WARNING: {unknown} recovered race numbers are not in the runners", file=sys.stderr)
+    else:
+        engine.start(args.total_laps, args.lap_length, args.dir)
+        print(f"Race started - {engine.total_laps} laps x {engine.lap_length} km", file=sys.stderr)
+    print(f"Output file: {engine.output_file}", file=sys.stderr)
+
+    try:
+        for line in sys.stdin:
+            elapsed_ms = engine.clock.elapsed_ms(now_ns())
+            numbers = [n for n in SEPARATORS.split(line) if n]
+            for result in engine.record_many((n, elapsed_ms) for n in numbers):
+                if result.status == OK:
+                    finish = " - FINISHED!" if result.lap == engine.total_laps else ""
+                    print(f"#{result.race_number} lap {result.lap}/{engine.total_laps} "
+                          f"at {format_ms(result.elapsed_ms)}{finish}", flush=True)
+                else:
+                    print(f"#{result.race_number}: {engine.problem_text(result)}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        print(f"Race stopped - Results saved to {engine.output_file} - {engine.counts}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Live Race Stats
+
+Keeps the calculate_race_stats aggregates of a running race up to date
+(calculate_race_stats.py --follow). The race's lap journal only ever grows,
+so each poll reads just the bytes appended since the previous one and adds
+those laps: a lap is one more lap for its hallway and gender, its split is
+the difference to the runner's previous lap, and the lap that reaches
+total_laps is the runner's finish. An update costs O(new laps), however big
+the race is. The results are the same as running the batch stats on the
+CSV rebuilt from the journal.
+
+Without a journal the CSV is followed through the race archive, which only
+parses rows whose bytes changed (every row is still read and checksummed).
+
+The stats file is rewritten atomically (temporary file, then rename) at
+most once per interval, and only when something changed.
+"""
+
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from calculate_race_stats import TOP_N, StatsAccumulator, format_stats_text
+
+Record = Tuple[str, int, int, str, str]
+
+
+class JournalTail:
+    """Reads the complete records appended to a lap journal since the last read."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.meta: Optional[dict] = None
+
+    def read(self) -> List[Record]:
+        """New (race_number, lap, elapsed_ms, hallway, gender) records; a torn last line waits."""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return []
+        lines = data[:end].decode("utf-8").splitlines()
+        self.offset += end
+        if self.meta is None:
+            if lines and lines[0].startswith("#"):
+                self.meta = json.loads(lines[0][1:])
+                lines = lines[1:]
+            else:
+                self.meta = {}
+        records = []
+        for row in csv.reader(lines):
+            if len(row) < 3:
+                continue
+            try:
+                lap = int(row[1])
+                elapsed_ms = int(row[2])
+            except ValueError:
+                continue
+            records.append((row[0], lap, elapsed_ms,
+                            row[3] if len(row) > 3 else "", row[4] if len(row) > 4 else ""))
+        return records
+
+    def replaced(self) -> bool:
+        """Whether the journal shrank (e.g. restored from a backup), so it must be read again."""
+        try:
+            return os.path.getsize(self.path) < self.offset
+        except OSError:
+            return False
+
+
+class LiveStats:
+    """StatsAccumulator fed one lap at a time, in journal order.
+
+    Rows are numbered by each runner's first lap, which is the row order of
+    the CSV the writer builds, so ties on the fastest split and on finish
+    times break the same way as in the batch stats.
+    """
+
+    def __init__(self, total_laps: int, lap_length_km: float, top_n: int = TOP_N):
+        self.total_laps = total_laps
+        self.acc = StatsAccumulator([f"lap{i}" for i in range(1, total_laps + 1)], lap_length_km, top_n)
+        self.laps_added = 0
+        self._last_ms: Dict[str, int] = {}
+        self._seq: Dict[str, int] = {}
+        self._fastest_key: Dict[str, Tuple[int, int, int]] = {}  # gender -> (split, seq, lap)
+
+    def add(self, race_number: str, lap: int, elapsed_ms: int, hallway: str, gender: str):
+        if self.total_laps and lap > self.total_laps:
+            return
+        acc = self.acc
+        race_number = race_number.strip() or "?"
+        hallway = hallway.strip() or "Unknown"
+        gender = gender.strip() or "Unknown"
+        seq = self._seq.setdefault(race_number, len(self._seq))
+        acc.rows_seen = len(self._seq)
+        self.laps_added += 1
+
+        acc.laps_by_hallway[hallway] = acc.laps_by_hallway.get(hallway, 0) + 1
+        acc.laps_by_gender[gender] = acc.laps_by_gender.get(gender, 0) + 1
+
+        split = elapsed_ms - self._last_ms.get(race_number, 0)
+        self._last_ms[race_number] = elapsed_ms
+        key = (split, seq, lap)
+        best = self._fastest_key.get(gender)
+        if best is None or key < best:
+            self._fastest_key[gender] = key
+            acc.fastest_lap_by_gender[gender] = (split, race_number, hallway, lap)
+
+        if lap == self.total_laps:
+            acc.add_finish(gender, elapsed_ms, seq, race_number, hallway)
+
+    def result(self):
+        return self.acc.result()
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def follow_journal(journal_path: str, lap_length_km: float, out_path: str,
+                   interval: float = 5.0, max_updates: Optional[int] = None):
+    """Follow a lap journal until interrupted (or for max_updates writes)."""
+    tail = JournalTail(journal_path)
+    live = None
+    updates = 0
+    while True:
+        t0 = time.perf_counter()
+        if tail.replaced():
+            tail = JournalTail(journal_path)
+            live = None
+        records = tail.read()
+        if live is None and tail.meta is not None:
+            live = LiveStats(int(tail.meta.get("total_laps") or 0), lap_length_km)
+        if live is not None and (records or updates == 0):
+            for record in records:
+                live.add(*record)
+            source = (f"{journal_path} (live: {live.laps_added} laps, "
+                      f"updated {datetime.now().strftime('%H:%M:%S')})")
+            _write_atomic(out_path, format_stats_text(live.result(), lap_length_km, source))
+            updates += 1
+            print(f"{datetime.now().strftime('%H:%M:%S')} +{len(records)} laps "
+                  f"({live.laps_added} total) in {(time.perf_counter() - t0) * 1000:.1f} ms -> {out_path}",
+                  flush=True)
+            if updates == max_updates:
+                break
+        time.sleep(interval)
+
+
+def follow_csv(csv_path: str, archive, lap_length_km: float, out_path: str,
+               interval: float = 5.0, max_updates: Optional[int] = None):
+    """Follow a lap_times CSV through a race_archive.RaceArchive."""
+    last = None
+    updates = 0
+    while True:
+        try:
+            st = os.stat(csv_path)
+        except OSError:
+            st = None
+        if st is not None and (st.st_mtime_ns, st.st_size) != last:
+            last = (st.st_mtime_ns, st.st_size)
+            t0 = time.perf_counter()
+            stats = archive.stats(csv_path, lap_length_km)
+            source = f"{csv_path} (live, updated {datetime.now().strftime('%H:%M:%S')})"
+            _write_atomic(out_path, format_stats_text(stats, lap_length_km, source))
+            updates += 1
+            print(f"{datetime.now().strftime('%H:%M:%S')} {archive.rows_parsed} rows parsed "
+                  f"in {(time.perf_counter() - t0) * 1000:.1f} ms -> {out_path}", flush=True)
+            if updates == max_updates:
+                break
+        time.sleep(interval)
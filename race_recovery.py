@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Race Recovery
+
+Rebuilds the state of an interrupted race from whatever survived on disk:
+the lap journal (most complete), the wide lap_times CSV, or an incremental
+backup directory. Every source is read in a single streaming pass.
+
+Usage:
+    python3 race_recovery.py [path]
+
+Without a path, the newest race in the current directory is inspected.
+"""
+
+import csv
+import glob
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+from lap_backup import restore
+from lap_journal import read_journal
+from race_store import Runner, add_lap
+from timecodec import parse_ms
+
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class RecoveredRace:
+    """Race state loaded from disk."""
+
+    def __init__(self, source: str, meta: dict):
+        self.source = source
+        self.meta = meta
+        self.runners: Dict[str, Runner] = {}
+        self.lap_count = 0
+
+    @property
+    def start_timestamp(self) -> str:
+        return self.meta.get('start', '')
+
+    @property
+    def start_time(self) -> Optional[datetime]:
+        try:
+            return datetime.strptime(self.start_timestamp, TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+
+    @property
+    def total_laps(self) -> int:
+        return int(self.meta.get('total_laps') or 0)
+
+    @property
+    def lap_length(self) -> Optional[float]:
+        value = self.meta.get('lap_length')
+        return float(value) if value is not None else None
+
+    @property
+    def race_name(self) -> str:
+        """Race file stem, e.g. lap_times_20260205_182602."""
+        name = os.path.basename(os.path.normpath(self.source))
+        return os.path.splitext(name)[0]
+
+    def add_lap(self, race_number: str, elapsed_ms: int, hallway: str, gender: str):
+        add_lap(self.runners, race_number, elapsed_ms, hallway, gender)
+        self.lap_count += 1
+
+
+def _load_records(race: RecoveredRace, records) -> RecoveredRace:
+    for race_number, lap, elapsed_ms, hallway, gender in records:
+        race.add_lap(race_number, elapsed_ms, hallway, gender)
+    return race
+
+
+def load_journal(path: str) -> RecoveredRace:
+    meta, records = read_journal(path)
+    return _load_records(RecoveredRace(path, meta), records)
+
+
+def load_backup_dir(path: str) -> RecoveredRace:
+    meta, records = restore(path)
+    return _load_records(RecoveredRace(path, meta), records)
+
+
+def load_results_csv(path: str) -> RecoveredRace:
+    """Load the wide lap_times CSV; the race start comes from its timestamp column."""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        col = {name: i for i, name in enumerate(header)}
+        lap_idx = sorted((int(name[3:]), i) for name, i in col.items()
+                         if name.startswith('lap') and name[3:].isdigit())
+        lap_cols = [i for _, i in lap_idx]
+        race = RecoveredRace(path, {'total_laps': len(lap_cols)})
+        ts_i, num_i = col.get('timestamp', 0), col.get('race_number', 1)
+        hall_i, gen_i = col.get('hallway', 2), col.get('gender', 3)
+        for row in reader:
+            if len(row) <= num_i or not row[num_i].strip():
+                continue
+            if 'start' not in race.meta and len(row) > ts_i:
+                race.meta['start'] = row[ts_i]
+            hallway = row[hall_i] if len(row) > hall_i else ''
+            gender = row[gen_i] if len(row) > gen_i else ''
+            for i in lap_cols:
+                if i < len(row):
+                    ms = parse_ms(row[i])
+                    if ms is not None:
+                        race.add_lap(row[num_i].strip(), ms, hallway, gender)
+        return race
+
+
+def load_race(path: str) -> RecoveredRace:
+    """Load a race from a journal, lap_times CSV or backup directory."""
+    if os.path.isdir(path):
+        return load_backup_dir(path)
+    if path.endswith('.journal'):
+        return load_journal(path)
+    return load_results_csv(path)
+
+
+def find_latest_race(directory: str = '.', backup_dir: str = 'backups') -> Optional[str]:
+    """Return the best recovery source for the newest race, or None.
+
+    The newest race is the one with the latest timestamp in its name. For
+    that race the journal is preferred, then the CSV, then its backups.
+    """
+    sources: Dict[str, Dict[str, str]] = {}
+    for path in glob.glob(os.path.join(directory, 'lap_times_*.journal')):
+        sources.setdefault(os.path.splitext(os.path.basename(path))[0], {})['journal'] = path
+    for path in glob.glob(os.path.join(directory, 'lap_times_*.csv')):
+        sources.setdefault(os.path.splitext(os.path.basename(path))[0], {})['csv'] = path
+    for path in glob.glob(os.path.join(directory, backup_dir, 'lap_times_*')):
+        if os.path.isdir(path):
+            sources.setdefault(os.path.basename(path), {})['backup'] = path
+    if not sources:
+        return None
+    newest = sources[max(sources)]
+    for kind in ('journal', 'csv', 'backup'):
+        if kind in newest:
+            return newest[kind]
+    return None
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else find_latest_race()
+    if not path:
+        raise SystemExit("No race found to recover.")
+    race = load_race(path)
+    print(f"Source: {race.source}")
+    print(f"Race start: {race.start_timestamp}")
+    print(f"Total laps: {race.total_laps}")
+    print(f"Runners with laps: {len(race.runners)}")
+    print(f"Recorded laps: {race.lap_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+NumPy Backend for Race Stats
+
+Loads the lap columns of a lap_times CSV into an integer millisecond matrix
+(one runner per row, one lap per column, -1 for a missing lap) and computes
+the same stats as calculate_race_stats.compute_stats with array operations:
+splits with diff, per-group sums with bincount, per-group minimums with a
+lexsort, and top finishes with argpartition.
+
+Requires numpy; use it with:
+    python3 calculate_race_stats.py --backend numpy
+"""
+
+import csv
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from calculate_race_stats import TOP_N
+from timecodec import MISSING, parse_ms
+
+
+class LapMatrix:
+    """Lap times of one race as arrays, with dictionary-encoded groups."""
+
+    def __init__(self, laps: np.ndarray, finish: np.ndarray, race_numbers: List[str],
+                 hallway_codes: np.ndarray, hallways: List[str],
+                 gender_codes: np.ndarray, genders: List[str]):
+        # int64 from a CSV, int32 views when mapped from a .lapcol file (race_columns.py)
+        self.laps = laps              # (runners, lap_cols) elapsed ms, -1 if missing
+        self.finish = finish          # (runners,) finish ms, -1 if missing
+        self.race_numbers = race_numbers
+        self.hallway_codes = hallway_codes
+        self.hallways = hallways
+        self.gender_codes = gender_codes
+        self.genders = genders
+
+
+def _elapsed_ms(cell: str) -> int:
+    ms = parse_ms(cell)
+    return MISSING if ms is None else ms
+
+
+# Digit positions and weights (in ms) of 'HH:MM:SS.mmm'
+_DIGITS = np.array([0, 1, 3, 4, 6, 7, 9, 10, 11])
+_WEIGHTS = np.array([36_000_000, 3_600_000, 600_000, 60_000, 10_000, 1_000, 100, 10, 1], dtype=np.int64)
+
+
+def decode_cells(cells: List[str]) -> np.ndarray:
+    """Decode 'HH:MM:SS.mmm' cells to int64 ms (-1 if blank) without a Python loop.
+
+    The cells are viewed as a fixed-width character matrix and the digits are
+    combined with one weighted sum. Cells in any other layout (e.g. more than
+    two hour digits) fall back to timecodec.parse_ms.
+    """
+    # One spare character so longer cells are not silently truncated
+    chars = np.array(cells, dtype="U13").view(np.uint32).reshape(len(cells), 13)
+    digits = chars[:, _DIGITS].astype(np.int64) - ord("0")
+    ms = digits @ _WEIGHTS
+    valid = ((chars[:, 2] == ord(":")) & (chars[:, 5] == ord(":")) & (chars[:, 8] == ord("."))
+             & (chars[:, 12] == 0) & ((digits >= 0) & (digits <= 9)).all(axis=1))
+    ms[~valid] = MISSING
+    # Blank cells are missing; anything else that did not match is parsed the slow way
+    for i in np.flatnonzero(~valid & (chars[:, 0] != 0)):
+        ms[i] = _elapsed_ms(cells[i])
+    return ms
+
+
+def load_matrix(csv_path: str) -> LapMatrix:
+    """Read a lap_times CSV into a LapMatrix in one pass."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        col = {name: i for i, name in enumerate(header)}
+        lap_cols = sorted((c for c in header if c.startswith("lap")), key=lambda x: int(x.replace("lap", "")))
+        lap_idx = [col[c] for c in lap_cols]
+        num_i, hall_i, gen_i = col.get("race_number"), col.get("hallway"), col.get("gender")
+        fin_i = col.get("finish_time")
+
+        hallway_index: Dict[str, int] = {}
+        gender_index: Dict[str, int] = {}
+        race_numbers: List[str] = []
+        hallway_codes: List[int] = []
+        gender_codes: List[int] = []
+        lap_cells: List[str] = []
+        finish_cells: List[str] = []
+
+        def cell(row, i):
+            return row[i] if i is not None and i < len(row) else ""
+
+        for row in reader:
+            if not row:
+                continue
+            race_numbers.append(cell(row, num_i).strip() or "?")
+            hallway = cell(row, hall_i).strip() or "Unknown"
+            gender = cell(row, gen_i).strip() or "Unknown"
+            hallway_codes.append(hallway_index.setdefault(hallway, len(hallway_index)))
+            gender_codes.append(gender_index.setdefault(gender, len(gender_index)))
+            lap_cells.extend([cell(row, i) for i in lap_idx])
+            finish_cells.append(cell(row, fin_i))
+
+    n = len(race_numbers)
+    return LapMatrix(
+        decode_cells(lap_cells).reshape(n, len(lap_idx)),
+        decode_cells(finish_cells),
+        race_numbers,
+        np.array(hallway_codes, dtype=np.intp), list(hallway_index),
+        np.array(gender_codes, dtype=np.intp), list(gender_index),
+    )
+
+
+def compute_stats_matrix(m: LapMatrix, lap_length_km: float, top_n: int = TOP_N):
+    """Compute the stats dict of calculate_race_stats.compute_stats from a LapMatrix."""
+    laps = m.laps
+    n, width = laps.shape
+    present = laps != MISSING
+    counts = present.sum(axis=1)
+
+    # The row-wise loop skips missing cells, so shift present laps to the
+    # left (stable) before taking splits; the lap index is then the position.
+    prefix = np.arange(width) < counts[:, None]
+    if not np.array_equal(present, prefix):
+        order = np.argsort(~present, axis=1, kind="stable")
+        laps = np.take_along_axis(laps, order, axis=1)
+        present = prefix
+
+    # Distances: total laps per group, times the lap length
+    laps_by_hallway = np.bincount(m.hallway_codes, weights=counts, minlength=len(m.hallways))
+    laps_by_gender = np.bincount(m.gender_codes, weights=counts, minlength=len(m.genders))
+
+    # Fastest split per gender: per-row minimum, then first row with the
+    # smallest minimum in each gender (same tie-breaking as the row loop)
+    fastest_lap_by_gender: Dict[str, Tuple[int, str, str, int]] = {}
+    if n and width:
+        splits = np.diff(laps, axis=1, prepend=0)
+        big = np.iinfo(splits.dtype).max
+        splits = np.where(present, splits, big)
+        row_arg = splits.argmin(axis=1)
+        row_min = splits[np.arange(n), row_arg]
+        has_laps = counts > 0
+        rows = np.flatnonzero(has_laps)
+        order = np.lexsort((rows, row_min[rows], m.gender_codes[rows]))
+        ranked = rows[order]
+        codes = m.gender_codes[ranked]
+        first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(ranked) else []
+        for i in first:
+            r = ranked[i]
+            fastest_lap_by_gender[m.genders[codes[i]]] = (
+                int(row_min[r]),
+                m.race_numbers[r],
+                m.hallways[m.hallway_codes[r]],
+                int(row_arg[r]) + 1,
+            )
+
+    # Top finishes per gender: argpartition to the k-th value, keep ties,
+    # then order the few candidates by (time, row)
+    top_finish_by_gender: Dict[str, List[Tuple[int, str, str]]] = {}
+    finished = np.flatnonzero(m.finish != MISSING)
+    for code, gender in enumerate(m.genders):
+        idx = finished[m.gender_codes[finished] == code]
+        if not len(idx):
+            continue
+        vals = m.finish[idx]
+        if len(idx) > top_n:
+            kth = vals[np.argpartition(vals, top_n - 1)[:top_n]].max()
+            keep = vals <= kth
+            idx, vals = idx[keep], vals[keep]
+        best = idx[np.lexsort((idx, vals))[:top_n]]
+        top_finish_by_gender[gender] = [
+            (int(m.finish[r]), m.race_numbers[r], m.hallways[m.hallway_codes[r]])
+            for r in best
+        ]
+
+    return {
+        "by_hallway_distance": {h: int(c) * lap_length_km for h, c in zip(m.hallways, laps_by_hallway)},
+        "by_gender_distance": {g: int(c) * lap_length_km for g, c in zip(m.genders, laps_by_gender)},
+        "fastest_lap_by_gender": fastest_lap_by_gender,
+        "top10_finish_by_gender": top_finish_by_gender,
+    }
+
+
+def compute_stats_numpy(csv_path: str, lap_length_km: float, top_n: int = TOP_N):
+    """Load csv_path and compute its stats with the NumPy backend."""
+    return compute_stats_matrix(load_matrix(csv_path), lap_length_km, top_n)
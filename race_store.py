@@ -0,0 +1,63 @@
+"""
+Compact Race Storage
+
+Runner records use __slots__ and keep their lap times as integer elapsed
+milliseconds in an array('I') (4 bytes per lap). Times are only formatted as
+HH:MM:SS.mmm at the edges: in the GUI and when writing the CSV.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, Tuple
+
+
+# Lap times must be 0 <= elapsed_ms < LAP_MS_LIMIT to fit the array
+LAP_MS_LIMIT = 1 << (8 * array('I').itemsize)
+
+
+class Runner:
+    """One runner and the elapsed race time (ms) at the end of each lap."""
+
+    __slots__ = ('number', 'hallway', 'gender', 'lap_ms')
+
+    def __init__(self, number: str, hallway: str = '', gender: str = '', lap_ms: Iterable[int] = ()):
+        self.number = number
+        self.hallway = hallway
+        self.gender = gender
+        self.lap_ms = array('I', lap_ms)
+
+    @property
+    def laps(self) -> int:
+        """Number of completed laps."""
+        return len(self.lap_ms)
+
+    @property
+    def last_lap_ms(self) -> int:
+        """Elapsed time of the last completed lap, or 0 before the first lap."""
+        return self.lap_ms[-1] if self.lap_ms else 0
+
+    def __repr__(self):
+        return f"Runner({self.number!r}, {self.hallway!r}, {self.gender!r}, laps={self.laps})"
+
+
+def add_lap(runners: Dict[str, Runner], race_number: str, elapsed_ms: int,
+            hallway: str = '', gender: str = '') -> Runner:
+    """Append a lap to runners[race_number], creating the runner if needed."""
+    runner = runners.get(race_number)
+    if runner is None:
+        runner = runners[race_number] = Runner(race_number, hallway, gender)
+    runner.lap_ms.append(elapsed_ms)
+    return runner
+
+
+def iter_records(runners: Iterable[Runner]) -> Iterator[Tuple[str, int, int, str, str]]:
+    """Yield journal records (race_number, lap, elapsed_ms, hallway, gender)."""
+    for runner in runners:
+        for lap, elapsed_ms in enumerate(runner.lap_ms, start=1):
+            yield runner.number, lap, elapsed_ms, runner.hallway, runner.gender
+
+
+def results_rows(runners: Iterable[Runner]):
+    """Rows for lap_journal.write_results_csv: (race_number, hallway, gender, lap_ms)."""
+    for runner in runners:
+        if runner.lap_ms:
+            yield runner.number, runner.hallway, runner.gender, runner.lap_ms
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Runner Roster
+
+Loads a runners CSV (number,hallway,gender) in one streaming pass into
+Runner objects keyed by race number, with indexes by hallway and gender.
+Problems are collected and reported together instead of stopping the load:
+duplicate race numbers (the first row is kept), rows without a race number,
+rows with missing or extra fields and bytes that are not UTF-8.
+
+A pre-parsed copy of each roster is cached under cache_dir as JSON, keyed by
+the SHA-256 of the file, so reopening the same file costs little more than
+the hash.
+
+Usage:
+    python3 roster.py runners.csv    # validate a roster and print a summary
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+from race_store import Runner
+
+
+# Call progress(bytes_read, total_bytes) every this many rows
+PROGRESS_EVERY_ROWS = 2000
+_CACHE_VERSION = 2
+
+
+class Roster:
+    """Runners of a race with secondary indexes and load problems."""
+
+    def __init__(self, source: Optional[str] = None, digest: Optional[str] = None):
+        self.source = source
+        self.digest = digest
+        self.runners: Dict[str, Runner] = {}
+        self.by_hallway: Dict[str, List[str]] = {}  # hallway -> race numbers, file order
+        self.by_gender: Dict[str, List[str]] = {}   # gender -> race numbers, file order
+        self.errors: List[Tuple[int, str]] = []     # (line number, problem)
+        self.from_cache = False
+
+    def __len__(self):
+        return len(self.runners)
+
+    def error_summary(self, limit: int = 10) -> str:
+        lines = [f"Line {line}: {problem}" for line, problem in self.errors[:limit]]
+        if len(self.errors) > limit:
+            lines.append(f"... and {len(self.errors) - limit} more")
+        return "\n".join(lines)
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_roster(path: str, cache_dir: Optional[str] = None,
+                progress: Optional[Callable[[int, int], None]] = None) -> Roster:
+    """Load a runners CSV, from the cache if the same file was loaded before.
+
+    Safe to call off the UI thread; progress is called from the calling thread.
+    """
+    digest = file_digest(path)
+    if cache_dir:
+        roster = _read_cache(cache_dir, digest)
+        if roster is not None:
+            roster.source = path
+            if progress:
+                total = os.path.getsize(path)
+                progress(total, total)
+            return roster
+
+    roster = parse_roster(path, progress)
+    roster.digest = digest
+    if cache_dir:
+        _write_cache(cache_dir, roster)
+    return roster
+
+
+def parse_roster(path: str, progress: Optional[Callable[[int, int], None]] = None) -> Roster:
+    """Stream a runners CSV into a Roster, collecting every problem found."""
+    roster = Roster(path)
+    total = os.path.getsize(path)
+    errors = roster.errors
+    runners = roster.runners
+    by_hallway = roster.by_hallway
+    by_gender = roster.by_gender
+    # utf-8-sig drops a leading BOM (Excel); undecodable bytes become U+FFFD
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            errors.append((1, "file is empty"))
+            return roster
+        col = {name.strip().lower(): i for i, name in enumerate(header)}
+        if "number" not in col:
+            errors.append((1, f"no 'number' column (found: {', '.join(header)})"))
+            return roster
+        width = len(header)
+        num_i = col["number"]
+        hall_i, gen_i = col.get("hallway"), col.get("gender")
+        first_line: Dict[str, int] = {}
+
+        for row in reader:
+            if len(row) != width:
+                # Blank lines and trailing empty fields are fine
+                if not any(cell.strip() for cell in row[width:]) and len(row) > width:
+                    row = row[:width]
+                elif not any(cell.strip() for cell in row):
+                    continue
+                else:
+                    errors.append((reader.line_num, f"expected {width} fields, got {len(row)}"))
+                    continue
+            number = row[num_i].strip()
+            hallway = row[hall_i].strip() if hall_i is not None else ""
+            gender = row[gen_i].strip() if gen_i is not None else ""
+            if not number or number in first_line or "\ufffd" in number + hallway + gender:
+                line = reader.line_num
+                if not number:
+                    if any(cell.strip() for cell in row):
+                        errors.append((line, "missing race number"))
+                elif number in first_line:
+                    errors.append((line, f"duplicate race number {number} (first on line {first_line[number]})"))
+                else:
+                    errors.append((line, "not valid UTF-8"))
+                continue
+            first_line[number] = reader.line_num
+            runners[number] = Runner(number, hallway, gender)
+            if hallway in by_hallway:
+                by_hallway[hallway].append(number)
+            else:
+                by_hallway[hallway] = [number]
+            if gender in by_gender:
+                by_gender[gender].append(number)
+            else:
+                by_gender[gender] = [number]
+            if progress and len(runners) % PROGRESS_EVERY_ROWS == 0:
+                progress(f.buffer.tell(), total)
+
+    if progress:
+        progress(total, total)
+    return roster
+
+
+def _cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, f"roster_{digest}.json")
+
+
+def _read_cache(cache_dir: str, digest: str) -> Optional[Roster]:
+    """Load a cached roster (None if it is missing, stale or malformed)."""
+    try:
+        with open(_cache_path(cache_dir, digest), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != _CACHE_VERSION or data.get("digest") != digest:
+            return None
+        numbers, hallways, genders = data["numbers"], data["hallways"], data["genders"]
+        hallway_codes, gender_codes = data["hallway_codes"], data["gender_codes"]
+        labels = [*numbers, *hallways, *genders]
+        codes = [*hallway_codes, *gender_codes]
+        if not (len(numbers) == len(hallway_codes) == len(gender_codes)) or \
+                set(map(type, labels)) - {str} or set(map(type, codes)) - {int} or min(codes, default=0) < 0:
+            return None
+        roster = Roster(digest=digest)
+        roster.runners = {number: Runner(number, hallways[h], genders[g])
+                          for number, h, g in zip(numbers, hallway_codes, gender_codes)}
+        roster.by_hallway = _group(numbers, hallways, hallway_codes)
+        roster.by_gender = _group(numbers, genders, gender_codes)
+        roster.errors = [(int(line), str(problem)) for line, problem in data["errors"]]
+    except (OSError, ValueError, AttributeError, KeyError, IndexError, TypeError):
+        return None
+    roster.from_cache = True
+    return roster
+
+
+def _group(numbers: List[str], labels: List[str], codes: List[int]) -> Dict[str, List[str]]:
+    """label -> race numbers with that label's code, in order (labels in first-seen order)."""
+    groups: List[List[str]] = [[] for _ in labels]
+    for number, code in zip(numbers, codes):
+        groups[code].append(number)
+    return dict(zip(labels, groups))
+
+
+def _write_cache(cache_dir: str, roster: Roster):
+    """Write the cache file atomically; a failed write only costs the next load.
+
+    Hallways and genders are dictionary-encoded (a small integer per runner).
+    """
+    hallways = list(roster.by_hallway)
+    genders = list(roster.by_gender)
+    hallway_code = {h: i for i, h in enumerate(hallways)}
+    gender_code = {g: i for i, g in enumerate(genders)}
+    runners = roster.runners.values()
+    data = {
+        "version": _CACHE_VERSION,
+        "digest": roster.digest,
+        "numbers": list(roster.runners),
+        "hallways": hallways,
+        "hallway_codes": [hallway_code[r.hallway] for r in runners],
+        "genders": genders,
+        "gender_codes": [gender_code[r.gender] for r in runners],
+        "errors": roster.errors,
+    }
+    path = _cache_path(cache_dir, roster.digest)
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def main():
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python3 roster.py runners.csv")
+    roster = parse_roster(sys.argv[1])
+    print(f"Runners: {len(roster)}")
+    for hallway, numbers in sorted(roster.by_hallway.items()):
+        print(f"- {hallway or '(no hallway)'}: {len(numbers)}")
+    for gender, numbers in sorted(roster.by_gender.items()):
+        print(f"- {gender or '(no gender)'}: {len(numbers)}")
+    if roster.errors:
+        print(f"{len(roster.errors)} problems:")
+        print(roster.error_summary(limit=len(roster.errors)))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
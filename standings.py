@@ -0,0 +1,105 @@
+"""
+Live Standings
+
+Race positions kept up to date one lap at a time. Every runner with at
+least one lap has a key (-laps, last_lap_ms, number): more laps first, then
+whoever completed them earlier. The keys are held in sorted lists (overall
+and per gender) and moved with bisect when a lap is recorded, so a lap costs
+two binary searches and a list shift per list instead of a full sort.
+Hallway distances are running lap counts.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from race_store import Runner
+
+Key = Tuple[int, int, str]
+
+
+def standing_key(runner: Runner) -> Key:
+    return (-runner.laps, runner.last_lap_ms, runner.number)
+
+
+class Standings:
+    """Overall and per-gender order of runners with at least one lap."""
+
+    def __init__(self):
+        self.order: List[Key] = []
+        self.by_gender: Dict[str, List[Key]] = {}
+        self.runners: Dict[str, Runner] = {}
+        self.laps_by_hallway: Dict[str, int] = {}
+        self._keys: Dict[str, Key] = {}
+
+    def __len__(self):
+        return len(self.order)
+
+    def rebuild(self, runners: Iterable[Runner]):
+        """Rank all runners from scratch (race start or resume)."""
+        self.order = []
+        self.by_gender = {}
+        self.runners = {}
+        self.laps_by_hallway = {}
+        self._keys = {}
+        for runner in runners:
+            if not runner.laps:
+                continue
+            key = self._keys[runner.number] = standing_key(runner)
+            self.runners[runner.number] = runner
+            self.order.append(key)
+            self.by_gender.setdefault(runner.gender, []).append(key)
+            self.laps_by_hallway[runner.hallway] = self.laps_by_hallway.get(runner.hallway, 0) + runner.laps
+        self.order.sort()
+        for keys in self.by_gender.values():
+            keys.sort()
+
+    def record(self, runner: Runner) -> Tuple[Optional[int], Optional[int]]:
+        """Re-rank runner after its laps changed.
+
+        Returns (old index, new index) in self.order; None where the runner
+        was not (or is no longer) ranked.
+        """
+        number = runner.number
+        old_key = self._keys.pop(number, None)
+        old_index = None
+        old_laps = 0
+        gender_keys = self.by_gender.setdefault(runner.gender, [])
+        if old_key is not None:
+            old_laps = -old_key[0]
+            old_index = bisect_left(self.order, old_key)
+            del self.order[old_index]
+            del gender_keys[bisect_left(gender_keys, old_key)]
+        self.laps_by_hallway[runner.hallway] = self.laps_by_hallway.get(runner.hallway, 0) + runner.laps - old_laps
+
+        if not runner.laps:
+            self.runners.pop(number, None)
+            return old_index, None
+        key = self._keys[number] = standing_key(runner)
+        self.runners[number] = runner
+        new_index = bisect_left(self.order, key)
+        self.order.insert(new_index, key)
+        insort(gender_keys, key)
+        return old_index, new_index
+
+    def position(self, number: str) -> Optional[int]:
+        """1-based overall position, or None if the runner has no laps."""
+        key = self._keys.get(number)
+        return None if key is None else bisect_left(self.order, key) + 1
+
+    def gender_position(self, number: str) -> Optional[int]:
+        """1-based position among runners of the same gender."""
+        key = self._keys.get(number)
+        if key is None:
+            return None
+        return bisect_left(self.by_gender[self.runners[number].gender], key) + 1
+
+    def distance_by_hallway(self, lap_length_km: float) -> Dict[str, float]:
+        return {hallway: laps * lap_length_km for hallway, laps in self.laps_by_hallway.items()}
+
+
+def last_split_ms(runner: Runner) -> int:
+    """Duration of the runner's last lap in ms (0 before the first lap)."""
+    lap_ms = runner.lap_ms
+    if not lap_ms:
+        return 0
+    return lap_ms[-1] - (lap_ms[-2] if len(lap_ms) > 1 else 0)
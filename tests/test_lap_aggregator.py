@@ -0,0 +1,185 @@
+"""
+Lap aggregator over loopback
+
+Runs LapAggregator.serve() on 127.0.0.1 in a background event loop and
+sends laps from two AggregatorClient stations in the same process.
+
+Run with: python3 -m unittest discover tests   (or python3 -m pytest tests)
+"""
+
+import asyncio
+import json
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lap_aggregator import AggregatorClient, LapAggregator  # noqa: E402
+from race_clock import now_ns  # noqa: E402
+from race_engine import OK, RANGE, RaceEngine  # noqa: E402
+from race_store import LAP_MS_LIMIT, Runner  # noqa: E402
+
+REORDER_MS = 200
+TIMEOUT = 5.0
+
+
+class Station:
+    """An AggregatorClient whose messages are collected in a queue."""
+
+    def __init__(self, port, name):
+        self.messages = queue.Queue()
+        self.skipped = []
+        self.client = AggregatorClient('127.0.0.1', port, name, self.messages.put)
+
+    def next(self, kind):
+        """The next message of the given type; other messages are kept for later calls."""
+        for i, message in enumerate(self.skipped):
+            if message['type'] == kind:
+                return self.skipped.pop(i)
+        while True:
+            message = self.messages.get(timeout=TIMEOUT)
+            if message['type'] == kind:
+                return message
+            self.skipped.append(message)
+
+    def send_raw(self, line):
+        self.client.sock.sendall(line.encode('utf-8') + b'\n')
+
+
+class AggregatorLoopbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        runners = {n: Runner(n, 'Hall A', 'M') for n in ('101', '102', '103')}
+        self.engine = RaceEngine(runners, dedup_ms=10_000, backup_dir=os.path.join(self.tmp.name, 'backups'),
+                                 export_columns=False)
+        self.engine.start(3, 2.5, self.tmp.name)
+        self.aggregator = LapAggregator(self.engine, reorder_ms=REORDER_MS, report=lambda message: None)
+        self.loop = asyncio.new_event_loop()
+        self.task = None
+        self.port = None
+        started = threading.Event()
+
+        def ready(server):
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.task = self.loop.create_task(self.aggregator.serve('127.0.0.1', 0, ready))
+            try:
+                self.loop.run_until_complete(self.task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self.assertTrue(started.wait(TIMEOUT))
+        self.stations = []
+
+    def tearDown(self):
+        for station in self.stations:
+            station.client.close()
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(TIMEOUT)
+        self.engine.stop()
+        self.tmp.cleanup()
+
+    def connect(self, name):
+        station = Station(self.port, name)
+        self.stations.append(station)
+        welcome = station.next('welcome')
+        self.assertEqual(welcome['total_laps'], 3)
+        return station
+
+    def test_laps_from_two_stations(self):
+        north = self.connect('north')
+        south = self.connect('south')
+
+        # South's lap arrives second but was captured first: it is applied first
+        time.sleep(0.1)  # so both capture times are after the race start
+        t0 = now_ns()
+        north.client.send_lap('101', t0)
+        south.client.send_lap('102', t0 - 50_000_000)
+        recorded = [north.next('recorded'), north.next('recorded')]
+        self.assertEqual([m['bib'] for m in recorded], ['102', '101'])
+        self.assertEqual([m['station'] for m in recorded], ['south', 'north'])
+        self.assertLess(recorded[0]['elapsed_ms'], recorded[1]['elapsed_ms'])
+        self.assertEqual([m['bib'] for m in (south.next('recorded'), south.next('recorded'))], ['102', '101'])
+
+        ack = north.next('ack')
+        self.assertEqual((ack['seq'], ack['bib'], ack['status'], ack['lap']), (1, '101', OK, 1))
+        ack = south.next('ack')
+        self.assertEqual((ack['seq'], ack['bib'], ack['status'], ack['lap']), (1, '102', OK, 1))
+
+        # The same bib from the other station within the dedup window
+        south.client.send_lap('101')
+        ack = south.next('ack')
+        self.assertEqual((ack['seq'], ack['status'], ack['lap']), (2, 'duplicate', 1))
+
+        south.client.send_lap('999')
+        self.assertEqual(south.next('ack')['status'], 'unknown')
+
+        self.assertEqual(self.aggregator.counts, {OK: 2, 'duplicate': 1, 'unknown': 1})
+
+    def test_bad_input_is_rejected_and_server_keeps_running(self):
+        north = self.connect('north')
+        north.send_raw('not json')
+        self.assertEqual(north.next('ack')['status'], 'error')
+        north.send_raw('{"type": "lap", "seq": 7, "bib": "101"}')
+        self.assertEqual(north.next('ack'), {'type': 'ack', 'seq': 7, 'status': 'error', 'message': "'t_ns'"})
+        north.send_raw('{"type": "lap", "seq": 8, "bib": "101", "t_ns": Infinity}')
+        self.assertEqual(north.next('ack')['status'], 'error')
+        north.send_raw('{"type": "bye"}')
+        self.assertEqual(north.next('ack')['status'], 'error')
+
+        # Capture times before the race start, and far in the future
+        north.client.send_lap('101', 0)
+        ack = north.next('ack')
+        self.assertEqual((ack['seq'], ack['status']), (1, 'error'))
+        self.assertIn('outside the race', ack['message'])
+        north.client.send_lap('101', now_ns() + LAP_MS_LIMIT * 1_000_000)
+        self.assertEqual(north.next('ack')['status'], 'error')
+        north.client.send_lap('101', now_ns() + 60 * 1_000_000_000)
+        ack = north.next('ack')
+        self.assertEqual((ack['seq'], ack['status']), (3, 'error'))
+        self.assertIn('in the future', ack['message'])
+
+        # A connection that sends a lap before hello
+        with socket.create_connection(('127.0.0.1', self.port), timeout=TIMEOUT) as sock:
+            sock.sendall(b'{"type": "lap", "seq": 1, "bib": "101", "t_ns": 0}\n')
+            with sock.makefile('r', encoding='utf-8') as f:
+                ack = json.loads(f.readline())
+        self.assertEqual((ack['status'], ack['message']), ('error', 'lap before hello'))
+
+        north.client.send_lap('101')
+        ack = north.next('ack')
+        self.assertEqual((ack['seq'], ack['status'], ack['lap']), (4, OK, 1))
+        self.assertEqual(self.aggregator.counts, {OK: 1})
+
+
+class EngineRangeTest(unittest.TestCase):
+
+    def test_out_of_range_laps_are_not_recorded(self):
+        engine = RaceEngine({'101': Runner('101')})
+        engine.total_laps = 3
+        self.assertEqual(engine.check('101', -1), RANGE)
+        self.assertEqual(engine.check('101', LAP_MS_LIMIT), RANGE)
+        self.assertEqual(engine.check('101', 0), OK)
+        self.assertEqual(engine.check('101', LAP_MS_LIMIT - 1), OK)
+        result = engine.record('101', -1)
+        self.assertEqual((result.status, result.lap), (RANGE, 0))
+        self.assertEqual(engine.runners['101'].laps, 0)
+        self.assertIn('before the race start', engine.problem_text(result))
+
+
+if __name__ == '__main__':
+    unittest.main()
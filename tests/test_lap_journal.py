@@ -0,0 +1,55 @@
+"""
+Reopening a lap journal after a crash
+
+A record cut short by a crash is dropped when the journal is opened again,
+and a journal left empty by that gets its metadata line back.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lap_journal import LapJournal, read_journal  # noqa: E402
+
+META = {'start': '2026-02-05 18:26:02.578', 'total_laps': 3, 'lap_length': 2.5}
+
+
+class TornJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'race.journal')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reopen_and_append(self):
+        journal = LapJournal(self.path, meta=META, fsync_interval=None)
+        journal.append('102', 1, 2000, 'A', 'F')
+        journal.close()
+        return journal
+
+    def test_torn_record_is_dropped(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('#{"start": "2026-02-05 18:26:02.578", "total_laps": 3, "lap_length": 2.5}\n101,1,1000,A,M\n101,2,20')
+        journal = self.reopen_and_append()
+        self.assertFalse(journal.created)
+        meta, records = read_journal(self.path)
+        self.assertEqual(meta, META)
+        self.assertEqual(list(records), [('101', 1, 1000, 'A', 'M'), ('102', 1, 2000, 'A', 'F')])
+
+    def test_torn_metadata_is_written_again(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('#{"start": "2026-02-05 18:2')
+        journal = self.reopen_and_append()
+        self.assertTrue(journal.created)
+        meta, records = read_journal(self.path)
+        self.assertEqual(meta, META)
+        self.assertEqual(list(records), [('102', 1, 2000, 'A', 'F')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Lap time control without a display
+
+LapTimeControl.close_writer() runs on the Tk thread while the writer thread
+may still report messages. It must not block the Tk loop: like Tkinter, the
+Root below makes a call from another thread wait until the loop runs it.
+
+Burst mode must keep each race number's capture time with that number when
+the operator edits the line.
+"""
+
+import heapq
+import itertools
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lap_time_control import LapTimeControl  # noqa: E402
+from race_engine import RaceEngine  # noqa: E402
+from race_store import Runner  # noqa: E402
+
+TIMEOUT = 10.0
+CALL_TIMEOUT = 2.0
+
+
+class Root:
+    """The after() loop of a Tk root, run by run()."""
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.timers = []
+        self.order = itertools.count()
+        self.calls = queue.Queue()
+        self.blocked_calls = 0  # calls from other threads the loop did not run in time
+
+    def after(self, ms, func, *args):
+        if threading.get_ident() != self.thread:
+            done = threading.Event()
+            self.calls.put((lambda: self.after(ms, func, *args), done))
+            if not done.wait(CALL_TIMEOUT):
+                self.blocked_calls += 1
+            return
+        heapq.heappush(self.timers, (time.monotonic() + ms / 1000, next(self.order), func, args))
+
+    def run(self, until):
+        deadline = time.monotonic() + TIMEOUT
+        while not until() and time.monotonic() < deadline:
+            try:
+                call, done = self.calls.get(timeout=0.005)
+                call()
+                done.set()
+            except queue.Empty:
+                pass
+            while self.timers and self.timers[0][0] <= time.monotonic():
+                _, _, func, args = heapq.heappop(self.timers)
+                func(*args)
+
+
+class StatusBar:
+    def config(self, text):
+        self.text = text
+
+
+class Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class CloseWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Root()
+        self.logged = []
+        # Only the parts of the window that stopping the writer uses
+        self.app = LapTimeControl.__new__(LapTimeControl)
+        self.app.root = self.root
+        self.app.status_bar = StatusBar()
+        self.app.writer_messages = queue.Queue()
+        self.app.log_event = lambda message, color=None: self.logged.append((message, threading.get_ident()))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def start_engine(self, report):
+        runners = {n: Runner(n, 'Hall A', 'M') for n in ('101', '102')}
+        engine = RaceEngine(runners, report=report, backup_dir=os.path.join(self.tmp.name, 'backups'),
+                            export_columns=False)
+        engine.start(3, 2.5, self.tmp.name)
+        engine.record('101', 1000)
+        engine.record('102', 2000)
+        self.app.engine = engine
+
+    def stop(self):
+        """Stop the race like stop_race does, from the loop."""
+        done = []
+
+        def begin():
+            self.app.save_results_csv()
+            self.app.create_backup()
+            self.app.close_writer(lambda: done.append(True))
+
+        self.root.after(0, begin)
+        self.root.run(until=lambda: done)
+        self.assertEqual(done, [True])
+        self.assertEqual(self.root.blocked_calls, 0, "the loop was blocked while the writer stopped")
+        self.assertIsNone(self.app.engine.writer)
+        self.assertTrue(any(m.startswith('Backup created') for m, _ in self.logged))
+
+    def test_writer_messages_are_logged_on_the_loop(self):
+        self.start_engine(self.app._report_from_writer)
+        self.stop()
+        self.assertEqual({thread for _, thread in self.logged}, {self.root.thread})
+
+    def test_report_that_needs_the_loop(self):
+        self.start_engine(lambda message, color=None: self.root.after(0, self.app.log_event, message, color))
+        self.stop()
+
+
+class BurstStampTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = LapTimeControl.__new__(LapTimeControl)
+        self.app.burst_mode_var = Var(True)
+        self.app.race_number_var = Var('')
+        self.app.burst_stamps = []
+
+    def type_separator(self, text, captured_ns):
+        self.app.race_number_var.set(text)
+        self.app._stamp_burst_numbers(captured_ns)
+
+    def times(self, text, captured_ns):
+        self.app.race_number_var.set(text)
+        numbers = [n for n in text.replace(',', ' ').split() if n]
+        return self.app._burst_times(numbers, captured_ns)
+
+    def test_each_number_keeps_its_time(self):
+        self.type_separator('101', 1)
+        self.type_separator('101 102', 2)
+        self.assertEqual(self.times('101 102 103', 3), [1, 2, 3])
+
+    def test_deleting_an_earlier_number(self):
+        self.type_separator('101', 1)
+        self.type_separator('101 102', 2)
+        self.type_separator('101 102 103', 3)
+        # 101 is deleted: 102 and 103 keep their own times
+        self.assertEqual(self.times('102 103', 4), [2, 3])
+        self.type_separator('102 103', 4)
+        self.assertEqual(self.app.burst_stamps, [('102', 2), ('103', 3)])
+
+    def test_editing_an_earlier_number(self):
+        self.type_separator('101', 1)
+        self.type_separator('101 102', 2)
+        self.type_separator('101 102 103', 3)
+        # 102 is typed over as 112: it is timed now, the others keep theirs
+        self.type_separator('101 112 103 104', 4)
+        self.assertEqual(self.times('101 112 103 104', 5), [1, 4, 3, 4])
+
+    def test_repeated_number(self):
+        self.type_separator('101', 1)
+        self.type_separator('101 101', 2)
+        self.assertEqual(self.times('101', 3), [1])
+        self.assertEqual(self.times('101 101 101', 3), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
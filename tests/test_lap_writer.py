@@ -0,0 +1,82 @@
+"""
+Lap writer worker errors
+
+The worker thread must keep writing after an unexpected error, and
+producers must not block forever once it is gone.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lap_journal import read_journal  # noqa: E402
+from lap_writer import LapWriter  # noqa: E402
+
+
+class FailingBackup:
+    """SegmentBackup stand-in whose add() fails once."""
+
+    def __init__(self):
+        self.failed = False
+        self.laps = []
+
+    def add(self, laps):
+        if not self.failed:
+            self.failed = True
+            raise OverflowError("boom")
+        self.laps.extend(laps)
+
+    def seconds_until_due(self):
+        return None
+
+    def due(self):
+        return False
+
+    def write(self):
+        return None
+
+
+class LapWriterErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = os.path.join(self.tmp.name, 'race.journal')
+        self.csv = os.path.join(self.tmp.name, 'race.csv')
+        self.messages = []
+        self.meta = {'start': '2026-02-05 18:26:02.578', 'total_laps': 3, 'lap_length': 2.5}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def writer(self, **kwargs):
+        return LapWriter(self.journal, self.csv, self.meta, report=lambda m, color=None: self.messages.append(m),
+                         fsync_interval=None, backup_dir=os.path.join(self.tmp.name, 'backups'), **kwargs)
+
+    def test_worker_survives_an_error(self):
+        backup = FailingBackup()
+        writer = self.writer(segment_backup=backup)
+        writer.submit('101', 1, 1000, 'A', 'M')
+        writer.save_csv()
+        writer.submit('102', 1, 2000, 'A', 'F')
+        writer.close(timeout=5)
+        self.assertFalse(writer._thread.is_alive())
+        self.assertTrue(any('boom' in m for m in self.messages))
+        _, records = read_journal(self.journal)
+        self.assertEqual([r[0] for r in records], ['101', '102'])
+        with open(self.csv, encoding='utf-8') as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+
+    def test_submit_fails_fast_without_a_worker(self):
+        writer = self.writer(max_pending=1)
+        writer.close(timeout=5)
+        with self.assertRaises(RuntimeError):
+            writer.submit('101', 1, 1000)
+        with self.assertRaises(RuntimeError):
+            writer.submit_many([('101', 1, 1000, '', '')])
+
+
+if __name__ == '__main__':
+    unittest.main()
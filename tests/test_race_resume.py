@@ -0,0 +1,83 @@
+"""
+Resuming a race
+
+RaceEngine.resume() must keep at most total_laps laps per runner, and the
+incremental backups must not store the recovered laps a second time.
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lap_backup import list_segments, restore  # noqa: E402
+from race_engine import RaceEngine  # noqa: E402
+from race_recovery import load_race  # noqa: E402
+from race_store import Runner  # noqa: E402
+
+RACE_NAME = 'lap_times_20260205_182602'
+META = {'start': '2026-02-05 18:26:02.578', 'total_laps': 2, 'lap_length': 2.5}
+
+
+class RaceResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = os.path.join(self.tmp.name, RACE_NAME + '.journal')
+        self.backups = os.path.join(self.tmp.name, 'backups')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_journal(self, records):
+        with open(self.journal, 'w', newline='', encoding='utf-8') as f:
+            f.write('#' + json.dumps(META) + '\n')
+            csv.writer(f).writerows(records)
+
+    def engine(self):
+        runners = {n: Runner(n, 'Hall A', 'M') for n in ('101', '102')}
+        return RaceEngine(runners, backup_dir=self.backups, export_columns=False)
+
+    def resume(self):
+        engine = self.engine()
+        engine.resume(load_race(self.journal))
+        return engine
+
+    def test_laps_past_total_laps_are_dropped(self):
+        self.write_journal([('101', lap, lap * 1000, 'Hall A', 'M') for lap in range(1, 5)])
+        engine = self.resume()
+        self.assertEqual(list(engine.runners['101'].lap_ms), [1000, 2000])
+        engine.stop()
+        with open(os.path.join(self.tmp.name, RACE_NAME + '.csv'), newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r['race_number'] for r in rows], ['101'])
+        self.assertNotIn('lap3', rows[0])
+        _, records = restore(os.path.join(self.backups, RACE_NAME))
+        self.assertEqual([r[1] for r in records], [1, 2])
+
+    def test_backups_store_only_missing_laps(self):
+        self.write_journal([('101', 1, 1000, 'Hall A', 'M'), ('102', 1, 1500, 'Hall A', 'M')])
+        race_dir = os.path.join(self.backups, RACE_NAME)
+        self.resume().stop()
+        self.assertEqual(len(list_segments(race_dir)), 1)
+
+        # Nothing new since the last backup: resuming again writes no segment
+        self.resume().stop()
+        self.assertEqual(len(list_segments(race_dir)), 1)
+
+        # Only the lap missing from the backups goes into the next segment
+        with open(self.journal, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(('101', 2, 2000, 'Hall A', 'M'))
+        self.resume().stop()
+        segments = list_segments(race_dir)
+        self.assertEqual(len(segments), 2)
+        with open(segments[-1][1], newline='', encoding='utf-8') as f:
+            self.assertEqual(list(csv.reader(f)), [['101', '2', '2000', 'Hall A', 'M']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Elapsed Time Codec
+
+Converts between 'HH:MM:SS.mmm' strings and integer milliseconds. Shared by
+the lap time GUI, the lap journal tools and the stats calculator.
+
+The common layout is decoded at fixed character offsets. The 'HH:MM:SS'
+part is looked up in a cache of seconds that have already been seen, and
+the milliseconds in a table. No timedelta is built and no exception is
+raised on the normal path. Formatting reuses a cached 'HH:MM:SS.' prefix for
+each whole second.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+MISSING = -1
+
+_CACHE_LIMIT = 1 << 17  # distinct whole seconds kept per cache (~36 hours)
+
+_MS_TEXT = [f"{i:03}" for i in range(1000)]
+_MS_VALUE = {text: i for i, text in enumerate(_MS_TEXT)}
+_prefix_ms: Dict[str, int] = {}    # 'HH:MM:SS' -> ms
+_second_text: Dict[int, str] = {}  # whole seconds -> 'HH:MM:SS.'
+
+
+def _parse_slow(s: str) -> Optional[int]:
+    """Parse any 'H:M:S.mmm' layout (e.g. 3-digit hours or padding)."""
+    s = s.strip()
+    if not s:
+        return None
+    try:
+        hh, mm, rest = s.split(":")
+        ss, ms = rest.split(".")
+        return ((int(hh) * 60 + int(mm)) * 60 + int(ss)) * 1000 + int(ms)
+    except ValueError:
+        return None
+
+
+def parse_ms(s: Optional[str]) -> Optional[int]:
+    """Parse 'HH:MM:SS.mmm' to integer milliseconds. Returns None if blank/invalid."""
+    if not s:
+        return None
+    if len(s) == 12 and s[8] == '.':
+        base = _prefix_ms.get(s[:8])
+        if base is not None:
+            ms = _MS_VALUE.get(s[9:])
+            if ms is not None:
+                return base + ms
+        elif s[2] == ':' and s[5] == ':' and s[:2].isdecimal() and s[3:5].isdecimal() and s[6:8].isdecimal():
+            ms = _MS_VALUE.get(s[9:])
+            if ms is not None:
+                if len(_prefix_ms) >= _CACHE_LIMIT:
+                    _prefix_ms.clear()
+                base = _prefix_ms[s[:8]] = (int(s[:2]) * 60 + int(s[3:5])) * 60000 + int(s[6:8]) * 1000
+                return base + ms
+    return _parse_slow(s)
+
+
+def format_ms(total_ms: int) -> str:
+    """Format integer milliseconds as HH:MM:SS.mmm"""
+    seconds, ms = divmod(total_ms, 1000)
+    prefix = _second_text.get(seconds)
+    if prefix is None:
+        if len(_second_text) >= _CACHE_LIMIT:
+            _second_text.clear()
+        minutes, secs = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        prefix = _second_text[seconds] = f"{hours:02}:{minutes:02}:{secs:02}."
+    return prefix + _MS_TEXT[ms]
+
+
+def decode_column(cells: Iterable[Optional[str]]) -> array:
+    """Decode a column of cells to array('q') of ms, with MISSING (-1) for blanks."""
+    out = array('q')
+    append = out.append
+    parse = parse_ms
+    for cell in cells:
+        ms = parse(cell)
+        append(MISSING if ms is None else ms)
+    return out
+
+
+def encode_column(values: Iterable[int]) -> List[str]:
+    """Format a column of ms values; negative (MISSING) values become ''."""
+    fmt = format_ms
+    return [fmt(v) if v >= 0 else '' for v in values]